@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the hot paths of shotshaper. Run from the repository
+root with::
+
+    python -m benchmarks -o results.json
+
+and compare with the results of another commit with::
+
+    python -m benchmarks --compare results.json
+
+Each case reports the time per call, throws per second, right hand side
+evaluations per throw and the peak memory allocated during a call.
+"""
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+The benchmark cases. Each case is a setup function, registered with
+case, returning the function to time and the projectile whose right
+hand side evaluations are counted, or None.
+"""
+
+import os
+import subprocess
+import sys
+import numpy as np
+
+from shotshaper.projectile import _Particle, ShotPutBall, SoccerBall, DiscGolfDisc
+from shotshaper import transforms
+
+CASES = []
+
+DISC_LAUNCH = dict(speed=24, omega=116.8, pitch=15.5, position=(0, 0, 1.3),
+                   nose_angle=0, roll_angle=14.7)
+BALL_LAUNCH = dict(speed=13, pitch=38, position=(0, 0, 2.1))
+
+# Packages that shotshaper imports only where first used
+LAZY = ('matplotlib', 'yaml', 'scipy')
+
+
+def case(name, throws=None):
+    """
+    Register a benchmark case.
+
+    :param string name: Name of the case
+    :param int throws: Number of throws per call, None if the case does
+                       not throw
+    """
+    def register(setup):
+        CASES.append((name, throws, setup))
+        return setup
+    return register
+
+
+def bundled_discs():
+    """
+    Names of the disc definitions shipped with shotshaper.
+    """
+    import shotshaper
+    discs = os.path.join(os.path.dirname(shotshaper.__file__), 'discs')
+    return sorted(f[:-5] for f in os.listdir(discs) if f.endswith('.yaml'))
+
+
+@case('shoot/_Particle', throws=1)
+def particle():
+    p = _Particle()
+    return lambda: p.shoot(**BALL_LAUNCH).position, p
+
+
+@case('shoot/ShotPutBall', throws=1)
+def shot_put():
+    p = ShotPutBall('M')
+    return lambda: p.shoot(**BALL_LAUNCH).position, p
+
+
+@case('shoot/SoccerBall', throws=1)
+def soccer_ball():
+    p = SoccerBall()
+    spin = np.array((0, -10, 0))
+    return lambda: p.shoot(speed=25, pitch=20, spin=spin).position, p
+
+
+def _disc_shoot(name):
+    def setup():
+        d = DiscGolfDisc(name)
+        return lambda: d.shoot(**DISC_LAUNCH).position, d
+    return setup
+
+
+for _name in bundled_discs():
+    case('shoot/DiscGolfDisc/%s' % _name, throws=1)(_disc_shoot(_name))
+
+
+@case('shoot_batch/DiscGolfDisc/dd2', throws=100)
+def disc_batch():
+    d = DiscGolfDisc('dd2')
+    launch = dict(DISC_LAUNCH, roll_angle=np.linspace(-20, 40, 100),
+                  output='summary')
+    return lambda: d.shoot_batch(**launch), d
+
+
+@case('shoot_batch/ShotPutBall', throws=100)
+def shot_put_batch():
+    p = ShotPutBall('M')
+    launch = dict(BALL_LAUNCH, pitch=np.linspace(20, 50, 100), output='summary')
+    return lambda: p.shoot_batch(**launch), p
+
+
+@case('shoot_batch/SoccerBall', throws=100)
+def soccer_ball_batch():
+    p = SoccerBall()
+    launch = dict(speed=25, pitch=np.linspace(5, 35, 100), spin=(0, -10, 0),
+                  output='summary')
+    return lambda: p.shoot_batch(**launch), p
+
+
+@case('forces/DiscGolfDisc')
+def forces():
+    d = DiscGolfDisc('dd2')
+    x = np.array((10.0, 1.0, 5.0))
+    u = np.array((20.0, 1.0, 2.0))
+    a = np.radians((15.0, 5.0, 0.0))
+    return lambda: d.forces(x, u, a, 116.8), None
+
+
+@case('post_process/DiscGolfDisc')
+def post_process():
+    d = DiscGolfDisc('dd2')
+    s = d.shoot(**DISC_LAUNCH)
+    s.position
+    return lambda: d.post_process(s, DISC_LAUNCH['omega']), None
+
+
+@case('transforms/T_12')
+def t_12():
+    a = np.radians((15.0, 5.0, 30.0))
+    return lambda: transforms.T_12(a), None
+
+
+@case('transforms/T_14')
+def t_14():
+    a = np.radians((15.0, 5.0, 30.0))
+    vec = np.array((20.0, 1.0, 2.0))
+    return lambda: transforms.T_14(vec, a, 0.1, 0.2), None
+
+
+def _T_14_fused(vec, attitude, beta, alpha):
+    # T_14 built from the fused transforms, as in the force evaluation
+    return transforms.apply(transforms.rotate_y(transforms.rotate_z(
+        transforms.T_12(attitude), beta), alpha), vec)
+
+
+@case('transforms/T_14_fused')
+def t_14_fused():
+    a = np.radians((15.0, 5.0, 30.0))
+    vec = np.array((20.0, 1.0, 2.0))
+    return lambda: _T_14_fused(vec, a, 0.1, 0.2), None
+
+
+@case('transforms/T_14_fused/1000')
+def t_14_fused_batch():
+    rng = np.random.default_rng(0)
+    a = rng.random((3, 1000))
+    vec = rng.random((3, 1000))
+    beta = rng.random(1000)
+    alpha = rng.random(1000)
+    return lambda: _T_14_fused(vec, a, beta, alpha), None
+
+
+@case('load/DiscGolfDisc/cold')
+def load_cold():
+    def run():
+        DiscGolfDisc.clear_cache()
+        return DiscGolfDisc('dd2')
+    return run, None
+
+
+@case('load/DiscGolfDisc/warm')
+def load_warm():
+    return lambda: DiscGolfDisc('dd2'), None
+
+
+@case('load/DiscGolfDisc/with_mass')
+def with_mass():
+    d = DiscGolfDisc('dd2')
+    return lambda: d.with_mass(0.170), None
+
+
+@case('update/disc_comp', throws=len(bundled_discs()))
+def disc_comp_update():
+    """
+    The work of one slider move in disc_comp.py, for all bundled discs:
+    a throw with the interactive preset and the post processing of each.
+    """
+    discs = [DiscGolfDisc(name) for name in bundled_discs()]
+
+    def run():
+        out = []
+        for d in discs:
+            disc = d.with_mass(0.175)
+            omega = disc.empirical_spin(DISC_LAUNCH['speed'])
+            s = disc.shoot(**dict(DISC_LAUNCH, omega=omega), solver='interactive')
+            out.append((s.position, s.velocity, disc.post_process(s, omega)))
+        return out
+
+    # The throws go through the copies, so count on the class
+    return run, DiscGolfDisc
+
+
+def _import(module):
+    def setup():
+        """
+        Start of a fresh interpreter importing the module, as a batch
+        worker does, failing if any of LAZY gets imported with it.
+        """
+        code = ('import sys, {0}\n'
+                'lazy = sorted(m for m in sys.modules if m.split(".")[0] in {1!r})\n'
+                'sys.exit("{0} imports %s" % ", ".join(lazy) if lazy else None)'
+                ).format(module, LAZY)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return lambda: subprocess.run([sys.executable, '-c', code], cwd=root,
+                                      check=True), None
+    return setup
+
+
+for _module in ('shotshaper.projectile', 'shotshaper.batch'):
+    case('import/%s' % _module)(_import(_module))
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Timing, counting and reporting of the benchmark cases.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from statistics import median
+from time import perf_counter
+
+import numpy as np
+import scipy
+
+from .cases import CASES
+
+RIGHT_HAND_SIDES = ('advance', 'advance_batch')
+
+
+class RhsCounter:
+    """
+    Counts the right hand side evaluations of a projectile, or of all
+    projectiles of a class, while in a with block. A vectorized call
+    counts one evaluation per member.
+    """
+    def __init__(self, target):
+        self.target = target
+        self.evaluations = 0
+        self._saved = []
+
+    def _count(self, vec):
+        self.evaluations += vec.shape[1] if np.ndim(vec) > 1 else 1
+
+    def __enter__(self):
+        is_class = isinstance(self.target, type)
+        for name in RIGHT_HAND_SIDES:
+            original = getattr(self.target, name, None)
+            if original is None:
+                continue
+            if is_class:
+                def wrapped(obj, t, vec, *args, _f=original, **kwargs):
+                    self._count(vec)
+                    return _f(obj, t, vec, *args, **kwargs)
+            else:
+                def wrapped(t, vec, *args, _f=original, **kwargs):
+                    self._count(vec)
+                    return _f(t, vec, *args, **kwargs)
+            self._saved.append((name, self.target.__dict__.get(name)))
+            setattr(self.target, name, wrapped)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._saved:
+            if original is None:
+                delattr(self.target, name)
+            else:
+                setattr(self.target, name, original)
+        self._saved = []
+
+
+def measure(run, counted, throws, min_time=0.5, min_repeat=3):
+    """
+    Time a case and count its right hand side evaluations and peak
+    memory.
+
+    :param callable run: Function to time
+    :param counted: Projectile or class whose right hand sides are
+                    counted, or None
+    :param int throws: Throws per call, or None
+    :param float min_time: Least total time spent timing (s)
+    :param int min_repeat: Least number of timed calls
+    :return: Results of the case
+    :rtype: dict
+    """
+    # Warm up caches and lazy imports
+    run()
+
+    times = []
+    start = perf_counter()
+    while len(times) < min_repeat or perf_counter() - start < min_time:
+        t0 = perf_counter()
+        run()
+        times.append(perf_counter() - t0)
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = dict(repeat=len(times), median=median(times), best=min(times),
+                  peak_mb=peak/1e6)
+    if throws:
+        result['throws_per_sec'] = throws/result['median']
+        if counted is not None:
+            with RhsCounter(counted) as counter:
+                run()
+            result['rhs_per_throw'] = counter.evaluations/throws
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(pattern=None, min_time=0.5):
+    """
+    Run the cases whose name contains pattern, printing each result.
+
+    :return: Description of the run and the results by case
+    :rtype: dict
+    """
+    meta = dict(commit=_commit(), time=datetime.now().isoformat(timespec='seconds'),
+                python=platform.python_version(), numpy=np.__version__,
+                scipy=scipy.__version__, machine=platform.machine())
+    results = {}
+    print('%-34s %10s %10s %10s %9s' % ('case', 'ms/call', 'throws/s',
+                                        'rhs/throw', 'peak MB'))
+    for name, throws, setup in CASES:
+        if pattern and pattern not in name:
+            continue
+        run, counted = setup()
+        r = measure(run, counted, throws, min_time)
+        results[name] = r
+        print('%-34s %10.3f %10s %10s %9.2f' % (
+            name, 1e3*r['median'],
+            '%.1f' % r['throws_per_sec'] if 'throws_per_sec' in r else '-',
+            '%.0f' % r['rhs_per_throw'] if 'rhs_per_throw' in r else '-',
+            r['peak_mb']))
+    return dict(meta=meta, results=results)
+
+
+def compare(new, old, threshold=0.1):
+    """
+    Print the change in median time per case between two runs, marking
+    cases that got slower by more than the threshold.
+
+    :return: Names of the cases that got slower
+    :rtype: list
+    """
+    slower = []
+    print('\nagainst %s (%s)' % (old['meta'].get('commit'), old['meta'].get('time')))
+    print('%-34s %10s %10s %8s' % ('case', 'old ms', 'new ms', 'ratio'))
+    for name, r in new['results'].items():
+        if name not in old['results']:
+            continue
+        ratio = r['median']/old['results'][name]['median']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = ' slower'
+            slower.append(name)
+        print('%-34s %10.3f %10.3f %8.2f%s' % (
+            name, 1e3*old['results'][name]['median'], 1e3*r['median'], ratio, flag))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark shotshaper")
+    parser.add_argument('-o', '--output', help="write the results to a JSON file")
+    parser.add_argument('-k', '--filter', help="only run cases containing this")
+    parser.add_argument('--compare', help="JSON file of an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown reported by --compare")
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help="least time spent timing each case (s)")
+    args = parser.parse_args(argv)
+
+    res = run_all(args.filter, args.min_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(res, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(res, old, args.threshold):
+            sys.exit(1)
@@ -14,6 +14,9 @@ Open Items to correct:
 """
 
 from shotshaper.projectile import DiscGolfDisc
+from shotshaper.cache import ShotCache
+from shotshaper.blitting import Blitter
+from shotshaper import plotting
 import matplotlib.pyplot as pl
 from mpl_toolkits import mplot3d
 from mpl_toolkits.mplot3d import Axes3D
@@ -21,8 +24,9 @@ from matplotlib.widgets import Slider, Button, TextBox
 import numpy as np
 from shotshaper.transforms import T_21
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-import sys
 import argparse
+import threading
+import time
 
 #create Parser
 parser = argparse.ArgumentParser(description="Launch Shotshaper with specified disc data files and units.")
@@ -42,12 +46,9 @@ unit_system = args.units
 disc_names = []
 disc_names = args.discs
 
-# Limit the number of discs to 6
-# This limit can be increased, but the plots will become overly crowded
+# Any number of discs can be compared, see shotshaper.plotting
 num_discs = len(disc_names)
-if len(disc_names) > 6:
-    print("Over max allowable, terminating")
-    sys.exit(1)
+legend_columns = plotting.legend_columns(num_discs)
 
 
 def disc_vertices(attitude):
@@ -87,6 +88,9 @@ N2ozf_factor = 3.59694 if unit_system == 'imperial' else 1
 Nm2inlb_factor = 8.85075 if unit_system == 'imperial' else 1
 rad2deg_factor = 57.2958 if unit_system == 'imperial' else 1
 
+# Slider positions that are revisited are taken from the cache
+cache = ShotCache()
+
 #Array to hold disc objects
 discs = []
 for disc in disc_names:
@@ -100,7 +104,7 @@ for disc in discs:
 # Array to hold shot data
 shots = []
 for i, (disc, omega) in enumerate(zip(discs, omegas)):
-    shots.append(disc.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw))
+    shots.append(cache.shoot(disc, speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw, solver="interactive"))
     
 # Array to hold position data
 positions = []
@@ -116,9 +120,7 @@ post_arrays = []
 velocity_arrays = []
 
 for disc, shot, omega in zip(discs, shots, omegas):
-    post = disc.post_process(shot, omega)
-    post_array = np.array(post)
-    post_arrays.append(post_array)
+    post_arrays.append(disc.post_process(shot, omega))
     velocity_arrays.append(shot.velocity)
 
 # Function to close all figures if one is closed
@@ -192,20 +194,20 @@ lines = []
 
 for i, ((x, y, z), disc_name) in enumerate(zip(positions, disc_names)):
     # Plotting on ax1: x vs. y
-    line, = ax1.plot(x, y, lw=2, label=disc_name)
+    line, = ax1.plot(x, y, lw=2, label=disc_name, **plotting.line_style(i))
     lines.append(line)  # Store the line object if needed for later
     
     # Plotting on ax2: x vs. z
-    line, = ax2.plot(x, z, lw=2, label=disc_name)
+    line, = ax2.plot(x, z, lw=2, label=disc_name, **plotting.line_style(i))
     lines.append(line)  # Store the line object if needed for later
     
     # Plotting on ax3: y vs. z
-    line, = ax3.plot(y, z, lw=2, label=disc_name)
+    line, = ax3.plot(y, z, lw=2, label=disc_name, **plotting.line_style(i))
     lines.append(line)  # Store the line object if needed for later
 
-ax1.legend()
-ax2.legend()
-ax3.legend()
+ax1.legend(ncol=legend_columns)
+ax2.legend(ncol=legend_columns)
+ax3.legend(ncol=legend_columns)
 
 # Alignment parameters for sliders
 left_alignment = 0.25  # Adjust this value to center the sliders
@@ -250,39 +252,39 @@ lines_arc = []
 
 
 for i, (post_array, velocities) in enumerate(zip(post_arrays, velocity_arrays)):
-    arc = post_array[0] * m2ft_factor
-    lifts = post_array[3] * N2ozf_factor
-    drags = post_array[4] * N2ozf_factor
-    moms = post_array[5] * Nm2inlb_factor
-    alphas = post_array[1]
-    rolls = post_array[6] * rad2deg_factor
-    betas = post_array[2]
+    arc = post_array.arc_length * m2ft_factor
+    lifts = post_array.lift * N2ozf_factor
+    drags = post_array.drag * N2ozf_factor
+    moms = post_array.moment * Nm2inlb_factor
+    alphas = post_array.alpha
+    rolls = post_array.roll_rate * rad2deg_factor
+    betas = post_array.beta
     
     velocities_u = velocities[0, :]  # Assuming the first row is 'u' velocities
 
   
-    line, = axes[0, 0].plot(arc, lifts, label=disc_names[i])
+    line, = axes[0, 0].plot(arc, lifts, label=disc_names[i], **plotting.line_style(i))
     lines_lifts.append(line)
 
-    line, = axes[0, 1].plot(arc, drags, label=disc_names[i])
+    line, = axes[0, 1].plot(arc, drags, label=disc_names[i], **plotting.line_style(i))
     lines_drags.append(line)
 
-    line, = axes[0, 2].plot(arc, moms, label=disc_names[i])
+    line, = axes[0, 2].plot(arc, moms, label=disc_names[i], **plotting.line_style(i))
     lines_moms.append(line)
 
-    line, = axes[1, 0].plot(arc, alphas, label=disc_names[i])
+    line, = axes[1, 0].plot(arc, alphas, label=disc_names[i], **plotting.line_style(i))
     lines_alphas.append(line)
 
-    line, = axes[1, 1].plot(arc, velocities_u, label=disc_names[i])
+    line, = axes[1, 1].plot(arc, velocities_u, label=disc_names[i], **plotting.line_style(i))
     lines_velocities_u.append(line)
 
-    line, = axes[1, 2].plot(arc, rolls, label=disc_names[i])
+    line, = axes[1, 2].plot(arc, rolls, label=disc_names[i], **plotting.line_style(i))
     lines_rolls.append(line)
    
 
 # After creating all line objects, ensure legends are displayed
 for ax in axes.flat:
-    ax.legend()
+    ax.legend(ncol=legend_columns)
 
 
 # Set labels and legends
@@ -318,91 +320,148 @@ if unit_system == 'metric':
 
 pl.tight_layout()
 
-def update(x):
-    speed = s1.val / mph_factor
-    roll = s2.val
-    pitch = s3.val
-    nose = s5.val
-    spin = s6.val
-    mass = s7.val / 1000
-    
-    global discs
-    discs = [DiscGolfDisc(disc_name, mass=mass) for disc_name in disc_names]
-    
-    global omegas
-    omegas = [disc.empirical_spin(speed) for disc in discs]
-    
-    global shots
-    shots = [disc.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw) for disc, omega in zip(discs, omegas)]
-    
-    global positions
-    positions = [(x * m2ft_factor, y * m2ft_factor, z * m2ft_factor) for shot in shots for x, y, z in [shot.position]]
-
-    #Post Processed Data
-    
-    post_arrays = []
-    velocity_arrays = []
-
-    for disc, shot, omega in zip(discs, shots, omegas):
-        post = disc.post_process(shot, omega)
-        post_array = np.array(post)
-        post_arrays.append(post_array)
-        velocity_arrays.append(shot.velocity)
-    
-    global lines
-    
-    for i, (x, y, z) in enumerate(positions):
+# Only the lines are redrawn on updates, over a cached image of the rest
+# of each figure, and only in the figures where they changed
+blit3 = Blitter(fig3, lines[0::3])
+blit2 = Blitter(fig2, lines[1::3])
+blit1 = Blitter(fig1, lines[2::3])
+blit4 = Blitter(fig4, lines_lifts + lines_drags + lines_moms + lines_alphas + lines_velocities_u + lines_rolls)
+
+# Slider events are coalesced, a frame is computed for the latest values
+# once the sliders have rested for DEBOUNCE seconds, and at the latest
+# MAX_WAIT seconds after the first change, so that dragging still updates
+DEBOUNCE = 0.03
+MAX_WAIT = 0.2
+
+def slider_values():
+    return dict(speed=s1.val / mph_factor, roll=s2.val, pitch=s3.val,
+                nose=s5.val, spin=s6.val, mass=s7.val / 1000)
+
+def compute_disc(disc, values):
+    """
+    Shot of one disc for a set of slider values, with the data plotted.
+    """
+    disc = disc.with_mass(values['mass'])
+    omega = values['spin']*disc.empirical_spin(values['speed'])
+    shot = cache.shoot(disc, speed=values['speed'], omega=omega, pitch=values['pitch'], position=pos, nose_angle=values['nose'], roll_angle=values['roll'], yaw=yaw, solver="interactive")
+    x, y, z = shot.position * m2ft_factor
+    return (x, y, z), shot.velocity, disc.post_process(shot, omega)
+
+class FrameWorker:
+    """
+    Computes frames, the shots of all discs for a set of slider values,
+    in a background thread, so the sliders stay responsive. The discs of
+    a frame are computed one after the other, as the GIL would serialize
+    them anyway. Only the latest slider values are computed, and a frame
+    that newer values have made stale by the time it completes is
+    dropped, unless nothing has been drawn for MAX_WAIT.
+    """
+    def __init__(self, discs):
+        self.discs = discs
+        self.cond = threading.Condition()
+        self.generation = 0
+        self.request = None
+        self.first_change = None
+        self.last_change = None
+        self.frame = None
+        self.last_draw = time.monotonic()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, values):
+        with self.cond:
+            now = time.monotonic()
+            self.generation += 1
+            self.request = (self.generation, values)
+            self.last_change = now
+            if self.first_change is None:
+                self.first_change = now
+            self.cond.notify()
+
+    def next_request(self):
+        # Wait for the sliders to rest, then take the latest values
+        with self.cond:
+            while True:
+                if self.request is None:
+                    self.cond.wait()
+                    continue
+                due = min(self.last_change + DEBOUNCE, self.first_change + MAX_WAIT)
+                now = time.monotonic()
+                if now >= due:
+                    request, self.request, self.first_change = self.request, None, None
+                    return request
+                self.cond.wait(due - now)
+
+    def run(self):
+        while True:
+            generation, values = self.next_request()
+            results = [compute_disc(disc, values) for disc in self.discs]
+            with self.cond:
+                self.frame = (generation, results)
+
+    def take(self):
+        """
+        The latest completed frame, if it is to be drawn, else None.
+        """
+        with self.cond:
+            if self.frame is None:
+                return None
+            generation, results = self.frame
+            self.frame = None
+            now = time.monotonic()
+            if generation < self.generation and now - self.last_draw < MAX_WAIT:
+                return None
+            self.last_draw = now
+            return results
+
+def draw_frame(results):
+    for i, ((x, y, z), velocities, post_array) in enumerate(results):
         # Assuming every 3 lines correspond to the same disc but different plots
-        lines[3*i].set_xdata(x)
-        lines[3*i].set_ydata(y)
-        
-        lines[3*i + 1].set_xdata(x)
-        lines[3*i + 1].set_ydata(z)
+        blit3.set_data(lines[3*i], x, y)
+        blit2.set_data(lines[3*i + 1], x, z)
+        blit1.set_data(lines[3*i + 2], y, z)
         
-        lines[3*i + 2].set_xdata(y)
-        lines[3*i + 2].set_ydata(z)
-        
-  
-    for i, (post_array, velocities) in enumerate(zip(post_arrays, velocity_arrays)):
-        arc = post_array[0] * m2ft_factor
-        lifts = post_array[3] * N2ozf_factor
-        drags = post_array[4] * N2ozf_factor
-        moms = post_array[5] * Nm2inlb_factor
-        alphas = post_array[1]
-        rolls = post_array[6] * rad2deg_factor
-        betas = post_array[2]
+        arc = post_array.arc_length * m2ft_factor
+        lifts = post_array.lift * N2ozf_factor
+        drags = post_array.drag * N2ozf_factor
+        moms = post_array.moment * Nm2inlb_factor
+        alphas = post_array.alpha
+        rolls = post_array.roll_rate * rad2deg_factor
         
         velocities_u = velocities[0, :]  # Assuming the first row is 'u' velocities
         
-        
-        lines_lifts[i].set_xdata(arc)
-        lines_lifts[i].set_ydata(lifts)
-        
-        lines_drags[i].set_xdata(arc)
-        lines_drags[i].set_ydata(drags)
-        
-        lines_moms[i].set_xdata(arc)
-        lines_moms[i].set_ydata(moms)
-        
-        lines_alphas[i].set_xdata(arc)
-        lines_alphas[i].set_ydata(alphas)
-        
-        lines_velocities_u[i].set_xdata(arc)
-        lines_velocities_u[i].set_ydata(velocities_u)
-        
-        lines_rolls[i].set_xdata(arc)
-        lines_rolls[i].set_ydata(rolls)
+        blit4.set_data(lines_lifts[i], arc, lifts)
+        blit4.set_data(lines_drags[i], arc, drags)
+        blit4.set_data(lines_moms[i], arc, moms)
+        blit4.set_data(lines_alphas[i], arc, alphas)
+        blit4.set_data(lines_velocities_u[i], arc, velocities_u)
+        blit4.set_data(lines_rolls[i], arc, rolls)
 
-    
     # if adjust_axes:
     #     ax1.axis((min(x1),max(x1),min(y1),max(y1)))
     #     ax2.axis((min(x1),max(x1),min(z1),max(z1)))
     #     ax3.axis((min(y1),max(y1),min(z1),max(z1)))
         
-    fig1.canvas.draw_idle()
-    fig3.canvas.draw_idle()
-    fig2.canvas.draw_idle()
-    fig4.canvas.draw_idle()
+    # One redraw per completed frame, of the figures that changed
+    blit1.update()
+    blit3.update()
+    blit2.update()
+    blit4.update()
+
+worker = FrameWorker(discs)
+
+def update(x):
+    # Only queue the values, the worker computes the frame
+    worker.submit(slider_values())
+
+def poll_frames():
+    results = worker.take()
+    if results is not None:
+        draw_frame(results)
+
+# Completed frames are picked up in the GUI thread, which owns the plots
+frame_timer = fig_sliders.canvas.new_timer(interval=20)
+frame_timer.add_callback(poll_frames)
+frame_timer.start()
 
 
 s1.on_changed(update)
@@ -6,6 +6,8 @@ Created on Wed Jan 12 15:53:30 2022
 """
 
 from shotshaper.projectile import DiscGolfDisc
+from shotshaper.cache import ShotCache
+from shotshaper.blitting import Blitter
 import matplotlib.pyplot as pl
 from mpl_toolkits import mplot3d
 from mpl_toolkits.mplot3d import Axes3D
@@ -50,6 +52,8 @@ def disc_vertices(attitude):
 mass = 0.175
 
 d = DiscGolfDisc(name, mass=mass)
+# Slider positions that are revisited are taken from the cache
+cache = ShotCache()
 speed = 24
 omega = d.empirical_spin(speed)
 z0 = 1.3
@@ -60,7 +64,7 @@ roll = 15.0
 yaw = 0
 adjust_axes = False
 
-s = d.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw)
+s = d.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw, solver="interactive")
 
 x,y,z = s.position
 
@@ -103,6 +107,14 @@ s3 = Slider(ax=ax6, label='Pitch (deg)', valmin=-10,   valmax=50, valinit=pitch)
 s5 = Slider(ax=ax8, label='Nose (deg)',   valmin=-5, valmax=5, valinit=nose)
 s7 = Slider(ax=ax9, label='Mass (kg)',   valmin=0.140, valmax=0.200, valinit=mass)
 s6 = Slider(ax=ax11, label='Spin (-)',   valmin=0, valmax=2, valinit=1.0)
+sliders = (s1, s2, s3, s5, s6, s7)
+
+# The sliders share the figure with the plots, so they are redrawn with 
+# the lines over a cached image of the rest of the figure, instead of 
+# each drawing the whole figure
+for slider in sliders:
+    slider.drawon = False
+blit = Blitter(fig, [l1, l2, l3] + [slider.ax for slider in sliders])
 
 def update(x):
     speed = s1.val
@@ -111,25 +123,24 @@ def update(x):
     nose = s5.val
     spin = s6.val
     mass = s7.val 
-    d = DiscGolfDisc(name,mass=mass)
+    disc = d.with_mass(mass)
     
-    omega = spin*d.empirical_spin(speed)
-    s = d.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll)
+    omega = spin*disc.empirical_spin(speed)
+    s = cache.shoot(disc, speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll, solver="interactive")
     x,y,z = s.position
     
-    l1.set_xdata(x)
-    l1.set_ydata(y)
-    l2.set_xdata(x)
-    l2.set_ydata(z)
-    l3.set_xdata(y)
-    l3.set_ydata(z)
+    blit.set_data(l1, x, y)
+    blit.set_data(l2, x, z)
+    blit.set_data(l3, y, z)
     
     if adjust_axes:
         ax1.axis((min(x),max(x),min(y),max(y)))
         ax2.axis((min(x),max(x),min(z),max(z)))
         ax3.axis((min(y),max(y),min(z),max(z)))
-        
-    fig.canvas.draw_idle()
+        fig.canvas.draw_idle()
+    else:
+        # The moved slider is always redrawn
+        blit.update(force=True)
 
 s1.on_changed(update)
 s2.on_changed(update)
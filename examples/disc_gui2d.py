@@ -8,11 +8,14 @@ import numpy as np
 import matplotlib.pyplot as pl
 from matplotlib.widgets import Slider, TextBox
 from shotshaper.projectile import DiscGolfDisc
+from shotshaper.cache import ShotCache
 
 name = 'dd2'
 mass = 0.175
 
 d = DiscGolfDisc(name, mass=mass)
+# Slider positions that are revisited are taken from the cache
+cache = ShotCache()
 speed = 24
 omega = d.empirical_spin(speed)
 z0 = 1.3
@@ -23,7 +26,7 @@ roll = 15.0
 yaw = 0
 adjust_axes = False
      
-s = d.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw)
+s = d.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll,yaw=yaw, solver="interactive")
 
 x,y,z = s.position
 
@@ -74,10 +77,10 @@ def update(x):
     nose = s5.val
     spin = s6.val
     mass = s7.val 
-    d = DiscGolfDisc(name,mass=mass)
+    disc = d.with_mass(mass)
     
-    omega = spin*d.empirical_spin(speed)
-    s = d.shoot(speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll)
+    omega = spin*disc.empirical_spin(speed)
+    s = cache.shoot(disc, speed=speed, omega=omega, pitch=pitch, position=pos, nose_angle=nose, roll_angle=roll, solver="interactive")
     x,y,z = s.position
     
     l1.set_xdata(x)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the fixed step RK4 engine with the adaptive RK45 engine for
+a set of disc throws. The landing points are compared with a reference
+solution at tight tolerances, and the wall time is measured for single
+shots and for the whole set shot as one batch.
+"""
+
+from shotshaper.projectile import DiscGolfDisc
+from time import perf_counter
+import numpy as np
+
+discs = ('dd2', 'cd1', 'cd5', 'fd2')
+speed = np.array((24.0, 20.0, 28.0, 15.0))
+omega = np.array((116.8, 80.0, 140.0, 60.0))
+pitch = np.array((15.5, 10.0, 8.0, 20.0))
+roll = np.array((14.7, -20.0, 30.0, 0.0))
+position = (0, 0, 1.5)
+
+solvers = (('RK45', dict(solver='standard')),
+           ('RK4 0.05 s', dict(method='RK4', max_step=0.05)),
+           ('RK4 0.1 s', dict(method='RK4', max_step=0.1)),
+           ('RK4 0.2 s', dict(method='RK4', max_step=0.2)))
+
+def landing(shots):
+    return np.array([s.landing for s in shots])
+
+print('%-6s %-12s %12s %12s %12s' % ('disc', 'solver', 'error (m)',
+                                      'single (ms)', 'batch (ms)'))
+for name in discs:
+    d = DiscGolfDisc(name)
+    launch = dict(speed=speed, omega=omega, pitch=pitch, roll_angle=roll,
+                  nose_angle=0, position=position, output='summary')
+    ref = landing(d.shoot_batch(solver='reference', **launch))
+
+    for label, options in solvers:
+        t0 = perf_counter()
+        single = [d.shoot(speed=speed[i], omega=omega[i], pitch=pitch[i],
+                          roll_angle=roll[i], nose_angle=0, position=position,
+                          output='summary', **options)
+                  for i in range(len(speed))]
+        t1 = perf_counter()
+        batch = d.shoot_batch(**launch, **options)
+        t2 = perf_counter()
+
+        error = max(abs(landing(single) - ref).max(),
+                    abs(landing(batch) - ref).max())
+        print('%-6s %-12s %12.2e %12.1f %12.1f' % (name, label, error,
+              1e3*(t1 - t0)/len(speed), 1e3*(t2 - t1)))
@@ -2,6 +2,9 @@ from setuptools import setup, find_packages
 setup(
     name="shotshaper",
     version="0.1.0",
-    packages=find_packages(),
-    include_package_data=True
+    packages=find_packages(exclude=('benchmarks',)),
+    include_package_data=True,
+    entry_points={
+        'console_scripts': ['shotshaper-batch = shotshaper.batch:main'],
+    },
 )
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+"""
+Headless batch runs of disc throws from a table, for machines without a
+display::
+
+    shotshaper-batch throws.csv results.csv --workers 8
+
+or python -m shotshaper.batch with the same arguments. The throws are
+read from CSV, with a header row, or JSON lines, one object per throw,
+with the columns
+
+    disc      Name of the disc definition, or --disc for all throws
+    mass      Mass (kg), default 0.175
+    speed     Release speed (m/s)
+    pitch     Launch angle (deg)
+    roll      Roll angle (deg), default 0, or roll_angle
+    nose      Nose angle (deg), default 0, or nose_angle
+    spin      Spin rate (rad/s), or omega, default the empirical spin
+    yaw       Yaw angle (deg), default 0
+    wind      Wind speed at the reference height of 1.5 m (m/s), default 0
+    wind_dir  Direction the wind blows towards, counterclockwise from the
+              throw (deg), default 0, a tail wind
+    height    Release height (m), default --height
+
+Empty cells take the defaults. The throws are shot in chunks, spread
+over worker processes, and the results are written in input order as
+the chunks finish, to CSV, JSON lines or .npz depending on the suffix
+of the output. Only the chunks in flight are held in memory. Each row
+of the results repeats the throw, with the spin that was used, followed
+by the flight time, landing point, apex, right hand side evaluations and
+what ended the flight.
+
+After every chunk, the number of finished throws is saved to a
+checkpoint next to the output, so an interrupted run continues where it
+stopped with --resume. The checkpoint is removed when the run completes.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import zipfile
+from itertools import islice
+from time import perf_counter
+import numpy as np
+
+from . import sweep
+from .environment import Environment
+from .projectile import DiscGolfDisc, ENDINGS
+
+# Columns of the throws with their defaults, None where required
+THROW = dict(disc=None, mass=0.175, speed=None, pitch=None, roll=0.0,
+             nose=0.0, spin=None, yaw=0.0, wind=0.0, wind_dir=0.0,
+             height=None)
+ALIASES = dict(roll_angle='roll', nose_angle='nose', omega='spin')
+
+# Columns of the results and their types in .npz output
+RESULTS = (('row', 'i8'), ('disc', 'U64'), ('mass', 'f8'), ('speed', 'f8'),
+           ('pitch', 'f8'), ('roll', 'f8'), ('nose', 'f8'), ('spin', 'f8'),
+           ('yaw', 'f8'), ('wind', 'f8'), ('wind_dir', 'f8'),
+           ('height', 'f8'), ('flight_time', 'f8'), ('landing_x', 'f8'),
+           ('landing_y', 'f8'), ('landing_z', 'f8'), ('apex_x', 'f8'),
+           ('apex_y', 'f8'), ('apex_z', 'f8'), ('nfev', 'i8'),
+           ('ending', 'U10'))
+
+FORMATS = ('.csv', '.jsonl', '.npz')
+
+
+class _Discs:
+    """
+    Projectile for sweep.stream that shoots throws of any disc and mass.
+    Each chunk is shot as one batch per disc and mass.
+    """
+    def __init__(self):
+        self._discs = {}
+
+    def _disc(self, name, mass):
+        if name not in self._discs:
+            self._discs[name] = DiscGolfDisc(name)
+        return self._discs[name].with_mass(mass)
+
+    def shoot_batch(self, output='summary', disc=(), mass=(), speed=(),
+                    pitch=(), roll=(), nose=(), spin=(), yaw=(), wind=(),
+                    wind_dir=(), height=(), **options):
+        n = len(disc)
+        direction = np.radians(wind_dir)
+        env = Environment(Uref=np.asarray(wind, dtype=float),
+                          winddir=np.array((np.cos(direction), np.sin(direction),
+                                            np.zeros(n))))
+        position = np.column_stack((np.zeros(n), np.zeros(n), height))
+
+        groups = {}
+        for i, key in enumerate(zip(disc, mass)):
+            groups.setdefault(key, []).append(i)
+
+        shots = [None]*n
+        for (name, m), idx in groups.items():
+            idx = np.array(idx)
+            res = self._disc(name, m).shoot_batch(
+                output=output, speed=speed[idx], pitch=pitch[idx],
+                roll_angle=roll[idx], nose_angle=nose[idx], omega=spin[idx],
+                yaw=yaw[idx], position=position[idx], env=env[..., idx], **options)
+            for i, s in zip(idx, res):
+                shots[i] = s
+        return shots
+
+
+def _format(path, formats=FORMATS):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == '.json':
+        suffix = '.jsonl'
+    if suffix not in formats:
+        raise ValueError("%s: expected a file ending in %s"
+                         % (path, ", ".join(formats)))
+    return suffix
+
+
+def _records(path):
+    """
+    Raw records of the throws file with their line numbers.
+    """
+    with open(path, newline='') as f:
+        if _format(path, FORMATS[:2]) == '.csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_num, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_num, json.loads(line)
+
+
+def count(path):
+    """
+    Number of throws in a throws file, without parsing them.
+    """
+    with open(path, newline='') as f:
+        if _format(path, FORMATS[:2]) == '.csv':
+            return max(sum(1 for row in csv.reader(f) if row) - 1, 0)
+        return sum(1 for line in f if line.strip())
+
+
+def read_throws(path, disc=None, height=1.5):
+    """
+    Read throws, one at a time, filling in the defaults.
+
+    :param string path: CSV or JSON lines file of throws
+    :param string disc: Disc of throws without one
+    :param float height: Release height of throws without one (m)
+    :return: Throws, dicts with the columns of THROW
+    :rtype: generator
+    """
+    defaults = dict(THROW, disc=disc, height=height)
+    discs = {}
+    for line_num, record in _records(path):
+        throw = {}
+        for key, value in record.items():
+            name = ALIASES.get(key, key)
+            if name not in THROW:
+                raise ValueError("%s:%d: unknown column %r" % (path, line_num, key))
+            if value is None or value == '':
+                continue
+            try:
+                throw[name] = str(value) if name == 'disc' else float(value)
+            except ValueError:
+                raise ValueError("%s:%d: %s is not a number: %r"
+                                 % (path, line_num, key, value)) from None
+        throw = dict(defaults, **throw)
+        missing = [name for name in THROW
+                   if throw[name] is None and name != 'spin']
+        if missing:
+            raise ValueError("%s:%d: missing %s" % (path, line_num, ", ".join(missing)))
+
+        if throw['spin'] is None:
+            name = throw['disc']
+            if name not in discs:
+                discs[name] = DiscGolfDisc(name)
+            throw['spin'] = float(discs[name].empirical_spin(throw['speed']))
+        yield throw
+
+
+def _columns(throws, start, landing, apex, flight_time, stats):
+    """
+    Results of a chunk of throws as one array per column of RESULTS.
+    """
+    n = len(throws)
+    ending = np.array([ENDINGS[e] if e >= 0 else '' for e in stats['ending']],
+                      dtype='U10')
+    columns = dict(row=np.arange(start, start + n),
+                   flight_time=flight_time, nfev=stats['nfev'], ending=ending)
+    for name in THROW:
+        columns[name] = np.array([t[name] for t in throws])
+    for i, axis in enumerate('xyz'):
+        columns['landing_' + axis] = landing[:, i]
+        columns['apex_' + axis] = apex[:, i]
+    return {name: np.asarray(columns[name], dtype=dtype) for name, dtype in RESULTS}
+
+
+class _TextWriter:
+    """
+    Results as CSV or JSON lines. The checkpoint keeps the size of the
+    file, so that a partly written chunk is cut off on resume.
+    """
+    def __init__(self, path, fmt, offset=None):
+        self.path = path
+        self.csv = fmt == '.csv'
+        if offset is None:
+            self.f = open(path, 'wb')
+            if self.csv:
+                self._write_rows([[name for name, _ in RESULTS]])
+        else:
+            self.f = open(path, 'r+b')
+            self.f.truncate(offset)
+            self.f.seek(offset)
+
+    def _write_rows(self, rows):
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator='\n').writerows(rows)
+        self.f.write(buf.getvalue().encode())
+
+    def write(self, columns):
+        names = [name for name, _ in RESULTS]
+        rows = zip(*[columns[name].tolist() for name in names])
+        if self.csv:
+            self._write_rows(rows)
+        else:
+            self.f.write(''.join(json.dumps(dict(zip(names, row))) + '\n'
+                                 for row in rows).encode())
+
+    def flush(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return self.f.tell()
+
+    def close(self, complete=False):
+        self.f.close()
+
+
+class _NpzWriter:
+    """
+    Results as .npz. The columns are appended to raw files in a
+    directory next to the output while running, and packed into the
+    archive one column at a time at the end.
+    """
+    def __init__(self, path, fmt, offset=None):
+        self.path = path
+        self.parts = path + '.parts'
+        if offset is None and os.path.isdir(self.parts):
+            shutil.rmtree(self.parts)
+        os.makedirs(self.parts, exist_ok=True)
+        self.rows = offset or 0
+        self.files = {}
+        for name, dtype in RESULTS:
+            part = os.path.join(self.parts, name)
+            f = open(part, 'r+b' if offset is not None else 'wb')
+            f.truncate(self.rows*np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            self.files[name] = f
+
+    def write(self, columns):
+        for name, _ in RESULTS:
+            self.files[name].write(columns[name].tobytes())
+        self.rows += len(columns['row'])
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        return self.rows
+
+    def close(self, complete=False):
+        for f in self.files.values():
+            f.close()
+        if not complete:
+            return
+        tmp = self.path + '.tmp'
+        with zipfile.ZipFile(tmp, 'w', allowZip64=True) as zf:
+            for name, dtype in RESULTS:
+                header = dict(descr=np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                              fortran_order=False, shape=(self.rows,))
+                with zf.open(name + '.npy', 'w', force_zip64=True) as out, \
+                        open(os.path.join(self.parts, name), 'rb') as f:
+                    np.lib.format.write_array_header_1_0(out, header)
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp, self.path)
+        shutil.rmtree(self.parts)
+
+
+def _checkpoint_path(output):
+    return output + '.checkpoint'
+
+
+def _save_checkpoint(output, state):
+    path = _checkpoint_path(output)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def _duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return '%dh%02dm' % (seconds//3600, seconds%3600//60)
+    if seconds >= 60:
+        return '%dm%02ds' % (seconds//60, seconds%60)
+    return '%ds' % seconds
+
+
+class _Progress:
+    """
+    Reports the progress to stderr, at most every interval seconds.
+    """
+    def __init__(self, done, total, interval):
+        self.start = perf_counter()
+        self.first = done
+        self.done = done
+        self.total = total
+        self.interval = interval
+        self.last = self.start
+
+    def update(self, n, final=False):
+        self.done += n
+        now = perf_counter()
+        if self.interval is None:
+            return
+        due = now - self.last >= self.interval and self.done < self.total
+        if not (final or due):
+            return
+        self.last = now
+        rate = (self.done - self.first)/max(now - self.start, 1e-9)
+        line = '%d/%d throws (%.1f%%), %.1f throws/s' % (
+            self.done, self.total, 100.0*self.done/max(self.total, 1), rate)
+        if final:
+            line += ', done in %s' % _duration(now - self.start)
+        elif rate > 0:
+            line += ', %s left' % _duration((self.total - self.done)/rate)
+        print(line, file=sys.stderr, flush=True)
+
+
+def run(throws, output, disc=None, height=1.5, workers=None, chunksize=256,
+        solver='standard', resume=False, progress=5.0):
+    """
+    Shoot the throws of a file and write the results as the chunks
+    finish, see the module documentation.
+
+    :param string throws: CSV or JSON lines file of throws
+    :param string output: CSV, JSON lines or .npz file of the results
+    :param string disc: Disc of throws without one
+    :param float height: Release height of throws without one (m)
+    :param int workers: Number of worker processes, None for one per CPU
+    :param int chunksize: Number of throws per batch
+    :param string solver: Solver preset of the throws
+    :param bool resume: Continue an interrupted run from its checkpoint
+    :param float progress: Seconds between progress reports, None for quiet
+    :return: Number of throws written
+    :rtype: int
+    """
+    fmt = _format(output)
+    options = dict(throws=os.path.abspath(throws), disc=disc, height=height,
+                   solver=solver, format=fmt)
+    checkpoint = _checkpoint_path(output)
+
+    done, offset = 0, None
+    if os.path.exists(checkpoint):
+        if not resume:
+            raise RuntimeError("%s holds an interrupted run, continue it with "
+                               "--resume or remove it" % checkpoint)
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state['options'] != options:
+            raise RuntimeError("%s is from a run with other options: %s"
+                               % (checkpoint, state['options']))
+        done, offset = state['done'], state['offset']
+
+    Writer = _NpzWriter if fmt == '.npz' else _TextWriter
+    writer = Writer(output, fmt, offset)
+    report = _Progress(done, count(throws), progress)
+
+    # Throws are kept from when they are read until their chunk is written
+    pending = []
+    def remaining():
+        for throw in islice(read_throws(throws, disc, height), done, None):
+            pending.append(throw)
+            yield throw
+
+    complete = False
+    try:
+        for start, stop, landing, apex, flight_time, _, stats in sweep.stream(
+                _Discs, remaining(), dict(solver=solver), workers, chunksize):
+            chunk = pending[:stop - start]
+            del pending[:stop - start]
+            writer.write(_columns(chunk, done, landing, apex, flight_time, stats))
+            done += stop - start
+            _save_checkpoint(output, dict(options=options, done=done,
+                                          offset=writer.flush()))
+            report.update(stop - start)
+        complete = True
+    finally:
+        writer.close(complete)
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    report.update(0, final=True)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='shotshaper-batch',
+        description="Shoot a table of disc throws without a display",
+        epilog="See shotshaper.batch for the columns of the throws.")
+    parser.add_argument('throws', help="CSV or JSON lines file of throws")
+    parser.add_argument('output', help="results, .csv, .jsonl or .npz")
+    parser.add_argument('--disc', help="disc of throws without one")
+    parser.add_argument('--height', type=float, default=1.5,
+                        help="release height of throws without one (m)")
+    parser.add_argument('--workers', type=int, help="number of processes, "
+                        "default one per CPU")
+    parser.add_argument('--chunksize', type=int, default=256,
+                        help="throws per batch")
+    parser.add_argument('--solver', default='standard',
+                        help="solver preset of the throws")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run")
+    parser.add_argument('--progress', type=float, default=5.0,
+                        help="seconds between progress reports")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="no progress reports")
+    args = parser.parse_args(argv)
+
+    try:
+        run(args.throws, args.output, args.disc, args.height, args.workers,
+            args.chunksize, args.solver, args.resume,
+            None if args.quiet else args.progress)
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.exit(1, "shotshaper-batch: %s\n" % e)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Redrawing of interactive plots by blitting. The artists that change are
+animated, so a full draw of the figure leaves them out and is kept as
+the background. An update then pastes the background and draws only the
+animated artists on top, instead of drawing the axes, ticks, labels and
+legends again::
+
+    line, = ax.plot(x, y)
+    blit = Blitter(fig, [line])
+    ...
+    blit.set_data(line, x, y)
+    blit.update()
+
+The figure is drawn in full as usual whenever the canvas asks for it,
+e.g. on resize, pan or zoom, and figures on canvases without blitting
+support are always drawn in full. Animated artists are left out of
+saved figures.
+"""
+
+import numpy as np
+
+
+class Blitter:
+    """
+    Redraws the animated artists of a figure over a cached background.
+
+    :param figure: Matplotlib figure
+    :param list artists: Artists that change between draws, e.g. lines,
+                         or the axes of sliders. They are set animated.
+    """
+    def __init__(self, figure, artists):
+        self.figure = figure
+        self.canvas = figure.canvas
+        self.artists = list(artists)
+        self.background = None
+        self.stale = False
+        # Without blitting support, the artists are drawn with the figure
+        self.supported = self.canvas.supports_blit
+        for artist in self.artists:
+            artist.set_animated(self.supported)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # A full draw, without the animated artists, is the new background
+        if self.supported:
+            self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+            self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.figure.draw_artist(artist)
+        self.stale = False
+
+    def set_data(self, line, x, y):
+        """
+        Set the data of a line, marking the figure for redraw if it
+        changed.
+        """
+        old_x, old_y = line.get_data(orig=True)
+        if not (np.array_equal(old_x, x) and np.array_equal(old_y, y)):
+            line.set_data(x, y)
+            self.stale = True
+
+    def update(self, force=False):
+        """
+        Redraw the animated artists, if any line changed since the last
+        redraw or if forced. Until the figure has been drawn once, and
+        without blitting support, it is drawn in full.
+        """
+        if not (self.stale or force):
+            return
+        if self.background is None:
+            self.stale = False
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_artists()
+        self.canvas.blit(self.figure.bbox)
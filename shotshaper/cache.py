@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Memoized shots, for interactive sessions and optimizers that ask for the
+same launches over and over again.
+
+Shots are keyed on the launch parameters, rounded to a resolution, the
+properties of the projectile, including the content of the disc
+definition, the solver settings and the state of the environment. The
+launch is shot with the rounded parameters, so that a cached shot only
+depends on its key. Recent shots are kept in memory, and optionally in
+a directory of .npz files that persists between sessions::
+
+    from shotshaper.cache import ShotCache
+    from shotshaper.projectile import DiscGolfDisc
+
+    cache = ShotCache(directory='shots')
+    d = DiscGolfDisc('dd2')
+    s = cache.shoot(d, speed=24, omega=116.8, pitch=15.5,
+                    position=(0, 0, 1.3), nose_angle=0, roll_angle=14.7)
+
+Shots from memory keep the continuous solution, while shots read from
+disk are sampled at the points of the stored trajectory. Shots in an
+environment whose wind model has no _key, see shotshaper.wind, are not
+cached, as they could not be told apart between sessions.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from .environment import Environment
+from .projectile import Shot, ShotSummary, SOLVER_OPTIONS
+
+INDEX = 'index.jsonl'
+
+
+def _quantize(value, resolution):
+    """
+    Round a launch parameter to the resolution, returning the key and
+    the rounded value. Values other than numbers are used as they are.
+    """
+    if isinstance(value, str):
+        return value, value
+    q = np.round(np.asarray(value, dtype=float)/resolution).astype(np.int64)
+    return tuple(q.ravel().tolist()), q*resolution
+
+
+def _copy(result):
+    """
+    Copy of a cached result, so that changes to it do not reach the cache.
+    """
+    if isinstance(result, ShotSummary):
+        return ShotSummary(result.flight_time, result.launch.copy(),
+                           result.landing.copy(), result.apex.copy())
+    if result._sol is not None:
+        return Shot(sol=result._sol, t_end=result.t_end, n_step=result.n_step)
+    s = result._states
+    return Shot(result.time.copy(), s[0:3].copy(), s[3:6].copy(),
+                s[6:9].copy() if len(s) > 6 else None)
+
+
+def _member(kwargs, i, n):
+    """
+    Launch parameters of member i of a batch. Positions and spins are
+    given either once or per member, other parameters as scalars or
+    one value per member.
+    """
+    kw = {}
+    for name, value in kwargs.items():
+        if isinstance(value, str):
+            kw[name] = value
+            continue
+        if name == 'env':
+            kw[name] = value if value is None or isinstance(value, Environment) \
+                       else value[i]
+            continue
+        value = np.asarray(value, dtype=float)
+        if name in ('position', 'spin'):
+            kw[name] = value if value.ndim == 1 else value[i]
+        else:
+            kw[name] = np.broadcast_to(value, (n,))[i] if value.ndim else value
+    return kw
+
+
+class ShotCache:
+    """
+    Cache of shots with a bounded in-memory store and an optional
+    store on disk.
+
+    :param int maxsize: Number of shots kept in memory
+    :param string directory: Directory of the disk store, None for
+                             memory only. Created if missing.
+    :param resolution: Resolution of the launch parameters, either one
+                       value or a dict from parameter name to value,
+                       with 'default' for the remaining parameters
+    """
+    def __init__(self, maxsize=256, directory=None, resolution=1e-6):
+        self.maxsize = maxsize
+        self.directory = directory
+        if isinstance(resolution, dict):
+            self.resolution = dict(resolution)
+        else:
+            self.resolution = {'default': resolution}
+        self.resolution.setdefault('default', 1e-6)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._index = {}
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._read_index()
+
+    def _read_index(self):
+        path = os.path.join(self.directory, INDEX)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interrupted write
+                    continue
+                self._index[entry['key']] = entry['file']
+
+    def _key(self, projectile, kwargs):
+        """
+        Digest of a launch, and the launch parameters to shoot it with.
+        The digest is None for a wind model without a stable key, whose
+        shots are not cached.
+        """
+        params = []
+        launch = {}
+        solver = projectile.solver_options(**kwargs)
+        # The module defaults apply when no environment is given
+        env = kwargs.get('env')
+        if env is None:
+            env = Environment()
+        for name in sorted(kwargs):
+            if name in SOLVER_OPTIONS or name in ('solver', 'env'):
+                continue
+            res = self.resolution.get(name, self.resolution['default'])
+            q, launch[name] = _quantize(kwargs[name], res)
+            params.append((name, q))
+        launch.update(solver)
+        launch['env'] = env
+
+        try:
+            env_key = env._key()
+        except TypeError:
+            return None, launch
+        key = (projectile._cache_key(), tuple(params),
+               tuple(sorted(solver.items())), env_key)
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return digest, launch
+
+    def _get(self, digest):
+        if digest is None:
+            return None
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                self.hits += 1
+                return self._memory[digest]
+            filename = self._index.get(digest)
+
+        if filename is None:
+            return None
+        try:
+            result = self._load(os.path.join(self.directory, filename))
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(digest, result)
+        return result
+
+    def _remember(self, digest, result):
+        with self._lock:
+            self._memory[digest] = result
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _put(self, digest, result):
+        with self._lock:
+            self.misses += 1
+        if digest is None:
+            return
+        self._remember(digest, result)
+        if self.directory is None:
+            return
+
+        filename = digest + '.npz'
+        path = os.path.join(self.directory, filename)
+        # Written under another name first, so readers never see
+        # a partial file
+        tmp = path + '.%d.tmp' % os.getpid()
+        with open(tmp, 'wb') as f:
+            if isinstance(result, ShotSummary):
+                np.savez(f, flight_time=result.flight_time,
+                         launch=result.launch, landing=result.landing,
+                         apex=result.apex)
+            else:
+                np.savez(f, time=result.time, state=result._states)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._index[digest] = filename
+            with open(os.path.join(self.directory, INDEX), 'a') as f:
+                f.write(json.dumps({'key': digest, 'file': filename}) + '\n')
+
+    @staticmethod
+    def _load(path):
+        with np.load(path) as data:
+            if 'flight_time' in data:
+                return ShotSummary(float(data['flight_time']), data['launch'],
+                                   data['landing'], data['apex'])
+            s = data['state']
+            return Shot(data['time'], s[0:3], s[3:6],
+                        s[6:9] if len(s) > 6 else None)
+
+    def shoot(self, projectile, **kwargs):
+        """
+        Shoot a projectile, or return the shot from the cache. Takes the
+        same arguments as the shoot method of the projectile.
+
+        :param projectile: Disc or ball to shoot
+        :return: Shot, or ShotSummary with output='summary'
+        """
+        digest, launch = self._key(projectile, kwargs)
+        result = self._get(digest)
+        if result is None:
+            result = projectile.shoot(**launch)
+            self._put(digest, result)
+        return _copy(result)
+
+    def shoot_batch(self, projectile, **kwargs):
+        """
+        Shoot several projectiles at once, taking cached members from
+        the cache and shooting the rest in one batch. Takes the same
+        arguments as the shoot_batch method of the projectile.
+
+        :param projectile: Disc or ball to shoot
+        :return: One shot or summary per member
+        :rtype: list
+        """
+        sizes = [np.size(v) for k, v in kwargs.items()
+                 if k not in ('position', 'spin') and not isinstance(v, str)]
+        for name in ('position', 'spin'):
+            if name in kwargs and np.ndim(kwargs[name]) > 1:
+                sizes.append(len(kwargs[name]))
+        n = max(sizes + [1])
+
+        members = [self._key(projectile, _member(kwargs, i, n))
+                   for i in range(n)]
+        results = [self._get(digest) for digest, launch in members]
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            launches = [members[i][1] for i in missing]
+            batch = {}
+            for name in launches[0]:
+                values = [kw[name] for kw in launches]
+                if name == 'env':
+                    batch[name] = values
+                elif isinstance(values[0], str) or name in SOLVER_OPTIONS:
+                    batch[name] = values[0]
+                else:
+                    batch[name] = np.array(values)
+            shots = projectile.shoot_batch(**batch)
+            for i, shot in zip(missing, shots):
+                self._put(members[i][0], shot)
+                results[i] = shot
+
+        return [_copy(r) for r in results]
+
+    def clear(self, disk=False):
+        """
+        Empty the memory store, and optionally the disk store.
+
+        :param bool disk: Also remove the stored shots from disk
+        """
+        with self._lock:
+            self._memory.clear()
+            if disk and self.directory is not None:
+                for filename in self._index.values():
+                    path = os.path.join(self.directory, filename)
+                    if os.path.exists(path):
+                        os.remove(path)
+                index = os.path.join(self.directory, INDEX)
+                if os.path.exists(index):
+                    os.remove(index)
+                self._index.clear()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled disc definitions. Reading a definition parses the YAML and
+expands the coefficients to the full circle, and each disc resamples
+them to its lookup table. The result is stored in DIRECTORY, by default
+in the user cache directory, so that later processes, e.g. the workers
+of a sweep, skip all of it. A compiled definition is named after the
+disc and the digest of the YAML it was made from, so it is not used
+once the YAML changes. Set DIRECTORY to None to compile nothing.
+
+The .npz is uncompressed, with the data of each array aligned, and its
+arrays are memory-mapped rather than read. Processes loading the same
+discs share the pages, and only the pages that are used are read. It
+can still be read with numpy.load.
+"""
+
+import io
+import json
+import mmap
+import os
+import struct
+import zipfile
+import numpy as np
+
+def user_cache():
+    """
+    Directory of the files shotshaper makes for later use, SHOTSHAPER_CACHE
+    if set, else shotshaper in the user cache directory.
+
+    :rtype: string
+    """
+    if os.environ.get('SHOTSHAPER_CACHE'):
+        return os.environ['SHOTSHAPER_CACHE']
+    root = (os.environ.get('XDG_CACHE_HOME') or
+            os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(root, 'shotshaper')
+
+# Directory of the compiled definitions
+DIRECTORY = os.path.join(user_cache(), 'compiled')
+
+# Format of the compiled definitions, older ones are compiled again
+VERSION = 1
+
+# Alignment of the array data in the file (bytes)
+ALIGN = 64
+
+# Id of the extra field padding the local file headers
+PADDING = 0x4e50
+
+INFO = 'info.json'
+
+
+def path(name, digest):
+    """
+    Path of the compiled definition for a disc definition.
+
+    :param string name: Name of the disc
+    :param string digest: Digest of the YAML definition
+    :return: The path, or None if DIRECTORY is None
+    :rtype: string
+    """
+    if DIRECTORY is None:
+        return None
+    return os.path.join(DIRECTORY, '%s.%s.npz' % (name, digest))
+
+
+def save(filename, digest, info, arrays):
+    """
+    Write a compiled definition. It is written to a temporary file and
+    moved in place, so that processes never see part of it. Nothing is
+    written where the directory cannot be written.
+
+    :param string filename: Path of the compiled definition, or None
+    :param string digest: Digest of the YAML definition
+    :param dict info: Values stored as JSON
+    :param dict arrays: Arrays by name
+    """
+    if filename is None:
+        return
+    tmp = '%s.%d.tmp' % (filename, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(tmp, 'wb') as f:
+            with zipfile.ZipFile(f, 'w', zipfile.ZIP_STORED) as z:
+                z.writestr(INFO, json.dumps(dict(info, version=VERSION,
+                                                 digest=digest)))
+                for name, a in arrays.items():
+                    buf = io.BytesIO()
+                    np.lib.format.write_array(buf, np.ascontiguousarray(a),
+                                              allow_pickle=False)
+                    # The .npy header fills a multiple of ALIGN bytes, so
+                    # pad the local header to align the start of the member
+                    member = zipfile.ZipInfo(name + '.npy')
+                    n = (-(f.tell() + 30 + len(member.filename) + 4)) % ALIGN
+                    member.extra = struct.pack('<HH', PADDING, n) + bytes(n)
+                    z.writestr(member, buf.getvalue())
+        os.replace(tmp, filename)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _map(f, member, buf):
+    # The data follows the local header, whose extra field is not the
+    # one of the central directory
+    f.seek(member.header_offset)
+    header = f.read(30)
+    if header[:4] != b'PK\x03\x04' or member.compress_type != zipfile.ZIP_STORED:
+        raise ValueError("%s is not stored" % member.filename)
+    n, m = struct.unpack('<HH', header[26:30])
+    f.seek(member.header_offset + 30 + n + m)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    count = int(np.prod(shape))
+    a = np.frombuffer(buf, dtype=dtype, count=count, offset=f.tell())
+    return a.reshape(shape, order='F' if fortran else 'C')
+
+
+def load(filename, digest):
+    """
+    Read a compiled definition, with its arrays memory-mapped and
+    read-only.
+
+    :param string filename: Path of the compiled definition, or None
+    :param string digest: Digest of the YAML definition
+    :return: The info and the arrays by name, or None if there is no
+             compiled definition of this format for the digest
+    :rtype: tuple
+    """
+    if filename is None:
+        return None
+    try:
+        with open(filename, 'rb') as f, zipfile.ZipFile(f) as z:
+            info = json.loads(z.read(INFO))
+            if info.get('version') != VERSION or info.get('digest') != digest:
+                return None
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            arrays = {m.filename[:-4]: _map(f, m, buf) for m in z.infolist()
+                      if m.filename.endswith('.npy')}
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    return info, arrays
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo dispersion of landing points, for the spread of a thrower's
+release. Launch parameters are drawn around a nominal launch, shot in
+chunks with shoot_batch, optionally spread over worker processes, and
+the landing points are reduced to running statistics as they come in,
+so memory does not grow with the number of samples::
+
+    from shotshaper.projectile import DiscGolfDisc
+    from shotshaper import dispersion
+
+    d = DiscGolfDisc('dd2')
+    launch = dict(speed=24, omega=116.8, pitch=15.5, position=(0, 0, 1.5),
+                  nose_angle=0, roll_angle=14.7, solver='interactive')
+    spread = dict(speed=1.0, roll_angle=3.0, nose_angle=2.0)
+    stats = dispersion.run(d, launch, spread, n=100000, seed=1)
+    print(stats.mean, stats.cov)
+    x, y = stats.ellipse(0.9)
+
+A spread given as a number is the standard deviation of a normal
+distribution around the nominal value, see Normal and Uniform for
+other distributions.
+"""
+
+from functools import partial
+import numpy as np
+
+from . import sweep
+
+
+class Normal:
+    """
+    Normally distributed deviation from the nominal value.
+
+    :param float sd: Standard deviation
+    """
+    def __init__(self, sd):
+        self.sd = sd
+
+    def sample(self, rng, n):
+        return self.sd*rng.standard_normal(n)
+
+
+class Uniform:
+    """
+    Uniformly distributed deviation from the nominal value.
+
+    :param float half_width: Largest deviation
+    """
+    def __init__(self, half_width):
+        self.half_width = half_width
+
+    def sample(self, rng, n):
+        return self.half_width*rng.uniform(-1.0, 1.0, n)
+
+
+def _distribution(spread):
+    return spread if hasattr(spread, 'sample') else Normal(spread)
+
+
+class LandingStats:
+    """
+    Running statistics of landing points in the ground plane: the mean,
+    the covariance and a histogram on a fixed grid. Points are added in
+    chunks with update, and chunks are merged exactly, so the result does
+    not depend on the chunk size.
+
+    Without a range, the histogram covers six standard deviations around
+    the mean of the first chunk along each axis. Points outside the range
+    are counted in outside.
+
+    :param int bins: Number of bins along each axis
+    :param array range: Bounds of the histogram, ((xmin, xmax), (ymin, ymax))
+    """
+    def __init__(self, bins=100, range=None):
+        self.bins = bins
+        self.range = None if range is None else np.asarray(range, dtype=float)
+        self.n = 0
+        self.mean = np.zeros(2)
+        # Sum of the outer products of the deviations from the mean
+        self._m2 = np.zeros((2, 2))
+        self.histogram = np.zeros((bins, bins), dtype=np.int64)
+        self.outside = 0
+
+    @property
+    def cov(self):
+        """
+        Sample covariance of the landing points.
+        """
+        return self._m2/max(self.n - 1, 1)
+
+    @property
+    def edges(self):
+        """
+        Bin edges of the histogram along x and y.
+        """
+        return [np.linspace(lo, hi, self.bins + 1) for lo, hi in self.range]
+
+    def update(self, points):
+        """
+        Add landing points.
+
+        :param array points: Landing points, shape (n, 2) or (n, 3)
+        """
+        p = np.asarray(points, dtype=float)[:, :2]
+        n = len(p)
+        if n == 0:
+            return
+        mean = p.mean(axis=0)
+        d = p - mean
+        m2 = d.T @ d
+
+        # Merge with the statistics so far, Chan et al.
+        total = self.n + n
+        delta = mean - self.mean
+        self._m2 += m2 + np.outer(delta, delta)*self.n*n/total
+        self.mean += delta*n/total
+        self.n = total
+
+        if self.range is None:
+            sd = np.sqrt(np.diag(m2)/max(n - 1, 1))
+            half = np.maximum(6*sd, 1.0)
+            self.range = np.array([mean - half, mean + half]).T
+
+        h, _, _ = np.histogram2d(p[:, 0], p[:, 1], bins=self.bins,
+                                 range=self.range)
+        h = h.astype(np.int64)
+        self.histogram += h
+        self.outside += n - h.sum()
+
+    def _scale(self, p):
+        """
+        Mahalanobis radius of the ellipse holding the fraction p of the
+        points, estimated from the histogram.
+        """
+        x, y = [0.5*(e[1:] + e[:-1]) for e in self.edges]
+        X, Y = np.meshgrid(x, y, indexing='ij')
+        d = np.array([X.ravel() - self.mean[0], Y.ravel() - self.mean[1]])
+        r2 = np.einsum('in,ij,jn->n', d, np.linalg.inv(self.cov), d)
+
+        order = np.argsort(r2)
+        count = np.cumsum(self.histogram.ravel()[order])
+        k = np.searchsorted(count, p*self.n)
+        if k >= len(count):
+            raise ValueError("the histogram holds less than %g of the points, "
+                             "widen its range" % p)
+        return np.sqrt(r2[order[k]])
+
+    def ellipse_axes(self, p):
+        """
+        Percentile ellipse, with the shape of the covariance and scaled
+        so that it holds the fraction p of the landing points. The
+        fraction is counted in the histogram, so the size is resolved
+        to about a bin.
+
+        :param float p: Fraction of the points, e.g. 0.5 or 0.9
+        :return: Semi-major and semi-minor axis (m) and the angle of the
+                 major axis from the x-axis (radians)
+        :rtype: tuple
+        """
+        scale = self._scale(p)
+        val, vec = np.linalg.eigh(self.cov)
+        a, b = scale*np.sqrt(val[::-1])
+        angle = np.arctan2(vec[1, 1], vec[0, 1])
+        return a, b, angle
+
+    def ellipse(self, p, n=100):
+        """
+        Outline of a percentile ellipse, see ellipse_axes.
+
+        :param float p: Fraction of the points
+        :param int n: Number of points of the outline
+        :return: x and y of the outline
+        :rtype: tuple
+        """
+        a, b, angle = self.ellipse_axes(p)
+        t = np.linspace(0, 2*np.pi, n)
+        u, v = a*np.cos(t), b*np.sin(t)
+        c, s = np.cos(angle), np.sin(angle)
+        return self.mean[0] + c*u - s*v, self.mean[1] + s*u + c*v
+
+
+def sample(launch, spread, n, seed=None, chunksize=4096):
+    """
+    Draw launches around a nominal launch, block by block, so that any
+    number of launches can be drawn in bounded memory. Each parameter is
+    drawn from its own stream, so the same seed gives the same launches
+    for any chunk size.
+
+    :param dict launch: Nominal launch, keyword arguments for shoot
+    :param dict spread: Distribution of each varied launch parameter,
+                        a number for a normal distribution with that
+                        standard deviation or e.g. Uniform(2.0)
+    :param int n: Number of launches
+    :param int seed: Seed of the random number generators
+    :param int chunksize: Number of launches drawn at once
+    :return: Launch keyword arguments
+    :rtype: generator
+    """
+    names = sorted(spread)
+    dists = [_distribution(spread[name]) for name in names]
+    rngs = [np.random.default_rng(s)
+            for s in np.random.SeedSequence(seed).spawn(len(names))]
+    for start in range(0, n, chunksize):
+        m = min(chunksize, n - start)
+        values = [launch[name] + dist.sample(rng, m)
+                  for name, dist, rng in zip(names, dists, rngs)]
+        for v in zip(*values):
+            yield dict(zip(names, v))
+
+
+def _same(projectile):
+    return projectile
+
+
+def run(projectile, launch, spread, n=100000, seed=None, workers=1,
+        chunksize=4096, bins=100, range=None):
+    """
+    Shoot launches drawn around a nominal launch and collect the
+    statistics of the landing points.
+
+    :param projectile: Disc or ball to shoot, or a picklable factory
+                       returning one, see sweep.stream
+    :param dict launch: Nominal launch, keyword arguments for shoot
+    :param dict spread: Distribution of each varied launch parameter,
+                        see sample
+    :param int n: Number of launches
+    :param int seed: Seed of the random number generators
+    :param int workers: Number of worker processes, None for one per CPU
+    :param int chunksize: Number of launches per shoot_batch
+    :param int bins: Number of histogram bins along each axis
+    :param array range: Bounds of the histogram, see LandingStats
+    :return: Statistics of the landing points
+    :rtype: LandingStats
+    """
+    if hasattr(projectile, 'shoot_batch'):
+        projectile = partial(_same, projectile)
+    fixed = {k: v for k, v in launch.items() if k not in spread}
+    launches = sample(launch, spread, n, seed, chunksize)
+
+    stats = LandingStats(bins, range)
+    for start, stop, landing, apex, flight_time, trajectory, _ in sweep.stream(
+            projectile, launches, fixed, workers, chunksize):
+        stats.update(landing)
+    return stats
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 """
+Gravity, air properties and wind. The module level values are the
+defaults for shots without an explicit Environment.
 """
 import numpy as np
 
+from .wind import LogLaw, Calm
+
 g = -9.81
 # Air
 rho = 1.225
@@ -13,15 +17,159 @@ z0 = 0.1
 Uref = 0.0
 zref = 1.5
 kappa = 0.41
+# Wind model replacing the log law, e.g. a WindField
+wind = None
+
+FIELDS = ('g', 'rho', 'mu', 'winddir', 'z0', 'Uref', 'zref', 'kappa')
+
+class Environment:
+    """
+    Conditions for a shot. Values that are not given are taken from the
+    module level defaults at the time of creation, so an environment is
+    not affected by later changes to the defaults.
+
+    For batched shots, each value may also be an array with one value
+    per member, with winddir of shape (3, n), see stack. Indexing such
+    an environment with members of the batch gives the environment of
+    those members, while an environment with single values applies to
+    all members.
+
+    :param float g: Gravitational acceleration, along the z-axis (m/s^2)
+    :param float rho: Density of air (kg/m^3)
+    :param float mu: Dynamic viscosity of air (Pa s)
+    :param array winddir: Direction of the wind
+    :param float z0: Roughness length of the ground (m)
+    :param float Uref: Wind speed at the reference height (m/s)
+    :param float zref: Reference height (m)
+    :param float kappa: von Karman constant
+    :param callable wind: Wind model taking positions and times, such as
+                          a WindProfile or WindField, instead of the log
+                          law given by the values above
+    """
+    def __init__(self, g=None, rho=None, mu=None, winddir=None, z0=None,
+                 Uref=None, zref=None, kappa=None, wind=None):
+        values = dict(g=g, rho=rho, mu=mu, winddir=winddir, z0=z0,
+                      Uref=Uref, zref=zref, kappa=kappa)
+        defaults = globals()
+        for name in FIELDS:
+            value = values[name]
+            setattr(self, name, defaults[name] if value is None else value)
+        self.winddir = np.asarray(self.winddir, dtype=float)
+        self.wind = defaults['wind'] if wind is None else wind
+
+    def __setattr__(self, name, value):
+        # The wind model is prepared from the values on first use, and
+        # prepared again after any of them is replaced
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_model', None)
+
+    @classmethod
+    def stack(cls, environments):
+        """
+        Combine environments into one with a value per member.
+
+        :param list environments: One environment per member, all with
+                                  the same wind model
+        :return: Environment of the batch
+        :rtype: Environment
+        """
+        wind = environments[0].wind
+        if any(e.wind is not wind for e in environments):
+            raise ValueError("environments of a batch must share the wind model")
+        
+        values = {}
+        for name in FIELDS:
+            shape = (3,) if name == 'winddir' else ()
+            values[name] = np.array([np.broadcast_to(getattr(e, name), shape)
+                                     for e in environments], dtype=float)
+        values['winddir'] = values['winddir'].T
+        return cls(wind=wind, **values)
+
+    def _batched(self, name):
+        value = getattr(self, name)
+        return np.ndim(value) > (1 if name == 'winddir' else 0)
+
+    @property
+    def batched(self):
+        """
+        True if any value is given per member of a batch.
+        """
+        return any(self._batched(name) for name in FIELDS)
+
+    def __getitem__(self, idx):
+        if not self.batched:
+            return self
+        values = {}
+        for name in FIELDS:
+            value = getattr(self, name)
+            values[name] = np.asarray(value)[idx] if self._batched(name) else value
+        return Environment(wind=self.wind, **values)
+
+    def _key(self):
+        """
+        Values of the environment as a hashable key, the same in every
+        process. Raises TypeError for a wind model without a _key, whose
+        values are unknown.
+        """
+        key = tuple((name, tuple(np.ravel(getattr(self, name)).tolist()))
+                    for name in FIELDS)
+        if self.wind is not None:
+            if not hasattr(self.wind, '_key'):
+                raise TypeError("wind model %s has no _key"
+                                % type(self.wind).__name__)
+            key += (('wind', self.wind._key()),)
+        return key
+
+    def wind_abl(self, z):
+        """
+        Wind velocity in the atmospheric boundary layer, following a
+        logarithmic profile through Uref at the height zref.
+
+        :param z: Height, a single height or an array of heights
+        :return: Wind velocity, column-wise for an array of heights
+        :rtype: array
+        """
+        # For a constant wind:
+        # return Uref*winddir
+        z = np.maximum(z, 0.0)
+
+        ustar = self.Uref*self.kappa/(np.log((self.zref+self.z0)/self.z0))
+        u = ustar/self.kappa*np.log((z+self.z0)/self.z0)
+
+        if self.winddir.ndim > 1:
+            # One direction per member
+            return self.winddir*u
+        return np.multiply.outer(self.winddir, u)
+
+    def _wind_model(self):
+        if self.wind is not None:
+            return self.wind
+        if np.all(np.asarray(self.Uref) == 0):
+            return Calm()
+        return LogLaw(self.Uref, self.zref, self.z0, self.winddir)
+
+    def wind_velocity(self, x, t=None):
+        """
+        Wind velocity at given positions and times, from the wind model
+        if any, otherwise from the log law. The constants of the log law
+        are computed once, so values should be replaced rather than
+        modified in place.
+
+        :param array x: Position, shape (3,) or (3, n)
+        :param t: Time, a single time or one per position
+        :return: Wind velocity in the layout of x
+        :rtype: array
+        """
+        model = self._model
+        if model is None:
+            model = self._wind_model()
+            object.__setattr__(self, '_model', model)
+        return model(x, t)
+
+def wind_abl(z, env=None):
+    # Works for a single height or an array of heights, in which
+    # case the velocities are returned column-wise
+    if env is None:
+        env = Environment()
 
-def wind_abl(z):
-    # For a constant wind:
-    # return Uref*winddir
-
-    if z < 0.0:
-        z = 0.0
-    
-    ustar = Uref*kappa/(np.log((zref+z0)/z0))
-    u = ustar/kappa*np.log((z+z0)/z0)
-    
-    return u*winddir
+    return env.wind_abl(z)
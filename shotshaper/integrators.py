@@ -0,0 +1,597 @@
+# -*- coding: utf-8 -*-
+"""
+Integration engines operating on an ensemble of independent states.
+
+The ensemble is stored column-wise, i.e. a state array of shape (n, N)
+holds N members with n state variables each. The right hand side is
+called with the time and state of the members that are still flying,
+``fun(t, y, *args)`` with ``t`` of shape (m,) and ``y`` of shape (n, m),
+and must return the derivatives in the same layout. Extra arguments
+whose last axis runs over the members are sliced accordingly, as are
+other objects that support indexing with ``a[..., idx]``.
+
+The adaptive engine reproduces the embedded pairs and step size control
+of scipy's RK45 (Dormand-Prince 5(4)) and RK23 (Bogacki-Shampine 3(2)),
+but each member has its own time, step size and error norm, so every
+member follows the same steps it would take in a scalar ``solve_ivp``
+call. A single problem with the fixed step scheme is integrated by
+solve_fixed, which takes the same steps at a fraction of the overhead.
+"""
+
+from collections import namedtuple
+import numpy as np
+
+# Dormand-Prince 5(4) coefficients, identical to scipy.integrate.RK45
+C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+A = np.array([
+    [0, 0, 0, 0, 0],
+    [1/5, 0, 0, 0, 0],
+    [3/40, 9/40, 0, 0, 0],
+    [44/45, -56/15, 32/9, 0, 0],
+    [19372/6561, -25360/2187, 64448/6561, -212/729, 0],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]
+])
+B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525,
+              1/40])
+# Coefficients of the quartic dense output
+P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608,
+     -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933,
+     87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304,
+     -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408,
+     701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+N_STAGES = 6
+ERROR_EXPONENT = -1/5
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10
+
+# Embedded pair of an adaptive method. The error exponent is -1/(q + 1)
+# for an error estimator of order q, and the dense output polynomial has
+# degree P.shape[1].
+Tableau = namedtuple('Tableau', ['C', 'A', 'B', 'E', 'P', 'n_stages',
+                                 'error_exponent'])
+
+# Bogacki-Shampine 3(2) coefficients, identical to scipy.integrate.RK23
+RK23 = Tableau(
+    C=np.array([0, 1/2, 3/4]),
+    A=np.array([
+        [0, 0, 0],
+        [1/2, 0, 0],
+        [0, 3/4, 0]
+    ]),
+    B=np.array([2/9, 1/3, 4/9]),
+    E=np.array([5/72, -1/12, -1/9, 1/8]),
+    P=np.array([[1, -4/3, 5/9],
+                [0, 1, -2/3],
+                [0, 4/3, -8/9],
+                [0, -1, 1]]),
+    n_stages=3,
+    error_exponent=-1/3)
+
+RK45 = Tableau(C, A, B, E, P, N_STAGES, ERROR_EXPONENT)
+
+# Classical fourth order scheme, taken with a fixed step. There is no
+# error estimate, and the dense output is the cubic Hermite interpolant
+# between the end points of each step.
+RK4 = Tableau(
+    C=np.array([0, 1/2, 1/2, 1]),
+    A=np.array([
+        [0, 0, 0],
+        [1/2, 0, 0],
+        [0, 1/2, 0],
+        [0, 0, 1]
+    ]),
+    B=np.array([1/6, 1/3, 1/3, 1/6]),
+    E=None,
+    P=None,
+    n_stages=4,
+    error_exponent=None)
+
+TABLEAUS = {'RK23': RK23, 'RK45': RK45, 'RK4': RK4}
+
+# Step of the fixed step schemes unless a finite max_step is given
+FIXED_STEP = 0.1
+
+EPS = np.finfo(float).eps
+
+
+def _norm(x):
+    """
+    Root mean square over the state variables, one value per member.
+    """
+    return np.sqrt(np.mean(x**2, axis=0))
+
+
+def _members(args, idx):
+    return [a[..., idx] for a in args]
+
+
+def _evaluate_events(events, t, y, args):
+    g = [np.broadcast_to(event(t, y, *args), t.shape) for event in events]
+    return np.array(g).reshape(len(events), t.size)
+
+
+def _initial_step(fun, t0, y0, f0, t_end, max_step, rtol, atol, args,
+                  error_exponent):
+    """
+    Empirical initial step for each member, as in scipy.
+    """
+    interval = t_end - t0
+    scale = atol + np.abs(y0)*rtol
+    d0 = _norm(y0/scale)
+    d1 = _norm(f0/scale)
+    small = (d0 < 1e-5) | (d1 < 1e-5)
+    h0 = np.where(small, 1e-6, 0.01*d0/np.where(small, 1.0, d1))
+    h0 = np.minimum(h0, interval)
+    y1 = y0 + h0*f0
+    f1 = fun(t0 + h0, y1, *args)
+    d2 = _norm((f1 - f0)/scale)/h0
+
+    flat = (d1 <= 1e-15) & (d2 <= 1e-15)
+    dmax = np.where(flat, 1.0, np.maximum(d1, d2))
+    h1 = np.where(flat, np.maximum(1e-6, h0*1e-3),
+                  (0.01/dmax)**-error_exponent)
+
+    return np.minimum(np.minimum(100*h0, h1), np.minimum(interval, max_step))
+
+
+def _hermite(y_old, y_new, f_old, f_new, h):
+    """
+    Coefficients of the cubic Hermite interpolant of a step, in the
+    layout of the dense output of the embedded pairs.
+    """
+    d = (y_new - y_old)/h
+    return np.stack((f_old, 3*d - 2*f_old - f_new, f_old + f_new - 2*d),
+                    axis=1)
+
+
+def _dense(t_old, h, y_old, Q, t):
+    """
+    Evaluate the interpolant of a step, one time per member.
+    """
+    x = (t - t_old)/h
+    p = np.cumprod(np.tile(x, (Q.shape[1], 1)), axis=0)
+    return y_old + h*np.einsum('nkm,km->nm', Q, p)
+
+
+def _locate_events(event, sign, t_old, h, y_old, Q, t_new, args):
+    """
+    Bisect for the root of ``event`` inside the last step of each member.
+    The root is bracketed by the step end points, where ``sign`` times
+    the event function is positive at the start and negative at the end.
+    """
+    lo = t_old.copy()
+    hi = t_new.copy()
+    for _ in range(100):
+        mid = 0.5*(lo + hi)
+        g = sign*event(mid, _dense(t_old, h, y_old, Q, mid), *args)
+        above = g > 0
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+        if np.all(hi - lo <= 4*EPS*(1 + np.abs(hi))):
+            break
+    return hi
+
+
+class MemberSolution:
+    """
+    Continuous solution of a single ensemble member, made up of the
+    interpolants of its accepted steps.
+
+    :param array t_old: Start time of each step
+    :param array h: Size of each step
+    :param array y_old: State at the start of each step, shape (n, steps)
+    :param array Q: Interpolation coefficients, shape (n, degree, steps)
+    """
+    def __init__(self, t_old, h, y_old, Q):
+        self.t_old = t_old
+        self.h = h
+        self.y_old = y_old
+        self.Q = Q
+
+    def __call__(self, t):
+        t = np.asarray(t, dtype=float)
+        scalar = t.ndim == 0
+        t = np.atleast_1d(t)
+        i = np.searchsorted(self.t_old, t, side='left') - 1
+        i = np.clip(i, 0, len(self.t_old) - 1)
+        y = _dense(self.t_old[i], self.h[i], self.y_old[:, i],
+                   self.Q[:, :, i], t)
+        if scalar:
+            return y[:, 0]
+        return y
+
+
+class EnsembleResult:
+    """
+    Outcome of an ensemble integration.
+
+    :param array t: Final time of each member
+    :param array y: Final state of each member, shape (n, N)
+    :param array event: Index of the terminal event that ended each
+                        member, -1 if it reached the end time and -2 if
+                        the step size became too small
+    :param array nfev: Number of right hand side evaluations per member
+    :param array naccept: Number of accepted steps per member
+    :param array nreject: Number of rejected steps per member
+    :param list sol: Continuous solution per member, None unless dense
+                     output was requested
+    :param list i_events: For each event, the member of each occurrence
+    :param list t_events: For each event, the time of each occurrence
+    :param list y_events: For each event, the state of each occurrence,
+                          shape (n, occurrences)
+    """
+    def __init__(self, t, y, event, nfev, naccept, nreject, sol=None,
+                 i_events=None, t_events=None, y_events=None):
+        self.t = t
+        self.y = y
+        self.event = event
+        self.nfev = nfev
+        self.naccept = naccept
+        self.nreject = nreject
+        self.sol = sol
+        self.i_events = i_events
+        self.t_events = t_events
+        self.y_events = y_events
+
+
+def solve_ensemble(fun, y0, t_end, events=(), args=(), rtol=1e-3, atol=1e-6,
+                   max_step=np.inf, dense_output=True, method='RK45'):
+    """
+    Integrate N independent initial value problems simultaneously with
+    an explicit Runge-Kutta scheme, either an adaptive embedded pair or
+    the classical fourth order scheme with a fixed step. The fixed step
+    costs exactly four right hand side evaluations per step, so the
+    cost of a shot is known in advance.
+
+    Each member keeps its own time and step size, and stops on the first
+    of its terminal events. Events follow the ``solve_ivp`` conventions,
+    i.e. callables ``event(t, y, *args)`` with optional ``terminal`` and
+    ``direction`` attributes, evaluated on the ensemble layout. All
+    occurrences of each event up to the end of each member are recorded.
+
+    :param callable fun: Right hand side, ``fun(t, y, *args)``
+    :param array y0: Initial states, shape (n, N)
+    :param float t_end: Time at which integration stops for all members
+    :param tuple events: Event functions
+    :param tuple args: Extra arguments, last axis running over members
+    :param float rtol: Relative tolerance
+    :param float atol: Absolute tolerance
+    :param float max_step: Maximum step size, or the step of RK4.
+                           An infinite step gives RK4 steps of FIXED_STEP.
+    :param bool dense_output: Keep the interpolants of all steps
+    :param string method: Embedded pair, 'RK45' or 'RK23', or 'RK4'
+                          for the fixed step scheme
+    :return: Final states, statistics and optionally continuous solutions
+    :rtype: EnsembleResult
+    """
+    if method not in TABLEAUS:
+        raise ValueError("method must be one of %s, got %r"
+                         % (", ".join(TABLEAUS), method))
+    C, A, B, E, P, n_stages, error_exponent = TABLEAUS[method]
+    adaptive = E is not None
+
+    y0 = np.asarray(y0, dtype=float)
+    n, N = y0.shape
+    args = [a if hasattr(a, '__getitem__') and not isinstance(a, (list, tuple))
+            else np.asarray(a) for a in args]
+
+    terminal = np.array([getattr(e, 'terminal', False) for e in events],
+                        dtype=bool)
+    direction = np.array([getattr(e, 'direction', 0) for e in events],
+                         dtype=float)
+    occurrences = [[] for _ in events]
+
+    t = np.zeros(N)
+    y = y0.copy()
+    f = fun(t, y, *args)
+    if adaptive:
+        h_abs = _initial_step(fun, t, y, f, t_end, max_step, rtol, atol,
+                              args, error_exponent)
+        nfev = np.full(N, 2)
+    else:
+        if not np.isfinite(max_step):
+            max_step = FIXED_STEP
+        h_abs = np.full(N, float(max_step))
+        nfev = np.full(N, 1)
+    naccept = np.zeros(N, dtype=int)
+    nreject = np.zeros(N, dtype=int)
+    rejected = np.zeros(N, dtype=bool)
+    event = np.full(N, -1)
+    g = _evaluate_events(events, t, y, args)
+
+    # Stage derivatives of the active members are kept in one buffer
+    records = []
+    active = np.arange(N)
+    K = np.empty((n_stages + 1, n, N))
+
+    while active.size > 0:
+        m = active.size
+        ta = t[active]
+        ya = y[:, active]
+        fa = f[:, active]
+        argsa = _members(args, active)
+        Ka = K[:, :, :m]
+
+        # A fresh step starts from the suggested size within the bounds,
+        # a retry after a rejection fails if the step has become too small
+        min_step = 10*np.abs(np.nextafter(ta, np.inf) - ta)
+        retry = rejected[active]
+        h = np.where(retry, h_abs[active],
+                     np.clip(h_abs[active], min_step, max_step))
+        failed = retry & (h < min_step)
+        if np.any(failed):
+            event[active[failed]] = -2
+            active = active[~failed]
+            continue
+
+        t_new = np.minimum(ta + h, t_end)
+        h = t_new - ta
+
+        Ka[0] = fa
+        for s in range(1, n_stages):
+            dy = np.tensordot(A[s, :s], Ka[:s], axes=1)*h
+            Ka[s] = fun(ta + C[s]*h, ya + dy, *argsa)
+        y_new = ya + h*np.tensordot(B, Ka[:n_stages], axes=1)
+        f_new = fun(t_new, y_new, *argsa)
+        Ka[-1] = f_new
+        nfev[active] += n_stages
+
+        if adaptive:
+            scale = atol + np.maximum(np.abs(ya), np.abs(y_new))*rtol
+            error = _norm(np.tensordot(E, Ka, axes=1)*h/scale)
+            accept = error < 1
+            with np.errstate(divide='ignore'):
+                factor = SAFETY*error**error_exponent
+
+            # Rejected members retry with a smaller step
+            shrink = ~accept
+            h_abs[active[shrink]] = h[shrink]*np.maximum(MIN_FACTOR,
+                                                         factor[shrink])
+            nreject[active[shrink]] += 1
+            rejected[active[shrink]] = True
+
+            grow = np.where(error == 0, MAX_FACTOR,
+                            np.minimum(MAX_FACTOR, factor))
+            grow = np.where(rejected[active], np.minimum(1, grow), grow)
+            h_abs[active[accept]] = h[accept]*grow[accept]
+        else:
+            accept = np.ones(m, dtype=bool)
+        idx = active[accept]
+        rejected[idx] = False
+        naccept[idx] += 1
+
+        if idx.size == 0:
+            continue
+
+        t_old = ta[accept]
+        y_old = ya[:, accept]
+        h_acc = h[accept]
+        if adaptive:
+            Q = np.einsum('snm,sk->nkm', Ka[:, :, accept], P)
+        else:
+            Q = _hermite(ya, y_new, fa, f_new, h)
+        t[idx] = t_new[accept]
+        y[:, idx] = y_new[:, accept]
+        f[:, idx] = f_new[:, accept]
+        if dense_output:
+            records.append((idx, t_old, h_acc, y_old, Q))
+
+        # Terminal events, the earliest root in the step ends the member
+        argsi = _members(args, idx)
+        g_new = _evaluate_events(events, t[idx], y[:, idx], argsi)
+        g_old = g[:, idx]
+        up = (g_old <= 0) & (g_new >= 0)
+        down = (g_old >= 0) & (g_new <= 0)
+        d = direction[:, None]
+        hit = (up & (d > 0)) | (down & (d < 0)) | ((up | down) & (d == 0))
+        g[:, idx] = g_new
+
+        t_stop = np.full(idx.size, np.inf)
+        which = np.full(idx.size, -1)
+        found = []
+        for k in range(len(events)):
+            j = np.nonzero(hit[k])[0]
+            if j.size == 0:
+                continue
+            sign = np.where(g_old[k, j] > g_new[k, j], 1.0, -1.0)
+            root = _locate_events(events[k], sign, t_old[j],
+                                  h_acc[j], y_old[:, j], Q[:, :, j],
+                                  t_new[accept][j], _members(argsi, j))
+            found.append((k, j, root))
+            if terminal[k]:
+                earlier = root < t_stop[j]
+                t_stop[j[earlier]] = root[earlier]
+                which[j[earlier]] = k
+
+        # Occurrences after a terminal event in the same step are dropped
+        for k, j, root in found:
+            keep = root <= t_stop[j]
+            j, root = j[keep], root[keep]
+            y_root = _dense(t_old[j], h_acc[j], y_old[:, j], Q[:, :, j], root)
+            occurrences[k].append((idx[j], root, y_root))
+
+        j = np.nonzero(which >= 0)[0]
+        if j.size > 0:
+            t[idx[j]] = t_stop[j]
+            y[:, idx[j]] = _dense(t_old[j], h_acc[j], y_old[:, j],
+                                  Q[:, :, j], t_stop[j])
+            event[idx[j]] = which[j]
+
+        finished = (which >= 0) | (t[idx] >= t_end)
+        active = np.setdiff1d(active, idx[finished], assume_unique=True)
+
+    sol = None
+    if dense_output:
+        sol = _member_solutions(records, N, n)
+
+    i_events, t_events, y_events = [], [], []
+    for occ in occurrences:
+        i_events.append(np.concatenate([o[0] for o in occ] + [[]]).astype(int))
+        t_events.append(np.concatenate([o[1] for o in occ] + [[]]))
+        y_events.append(np.concatenate([o[2] for o in occ] + [np.empty((n, 0))],
+                                       axis=1))
+
+    return EnsembleResult(t, y, event, nfev, naccept, nreject, sol,
+                          i_events, t_events, y_events)
+
+
+def solve_fixed(fun, y0, t_end, events=(), args=(), step=np.inf,
+                dense_output=True):
+    """
+    Integrate a single initial value problem with the classical fourth
+    order scheme and a fixed step. It takes the same steps as a member
+    of solve_ensemble with method 'RK4', without the bookkeeping of an
+    ensemble: the right hand side and events take a single state, the
+    stages go to a preallocated buffer and the steps to preallocated
+    arrays, and events are only located inside the steps where they
+    change sign.
+
+    :param callable fun: Right hand side, ``fun(t, y, *args)``
+    :param array y0: Initial state, shape (n,)
+    :param float t_end: Time at which integration stops
+    :param tuple events: Event functions of a single state
+    :param tuple args: Extra arguments
+    :param float step: Step size, FIXED_STEP if infinite
+    :param bool dense_output: Keep the interpolants of all steps
+    :return: Final state, statistics and optionally the continuous
+             solution, as an ensemble of one member
+    :rtype: EnsembleResult
+    """
+    C, A, B, _, _, n_stages, _ = RK4
+    if not np.isfinite(step):
+        step = FIXED_STEP
+    step = float(step)
+
+    y0 = np.asarray(y0, dtype=float)
+    n = y0.size
+    terminal = [getattr(e, 'terminal', False) for e in events]
+    direction = [getattr(e, 'direction', 0) for e in events]
+    occurrences = [[] for _ in events]
+
+    # The time runs up by the step, as in solve_ensemble, and one more
+    # step is allowed for the rounding of the sum
+    size = int(np.ceil(t_end/step)) + 2
+    ts = np.empty(size)
+    ys = np.empty((size, n))
+    fs = np.empty((size, n))
+    K = np.empty((n_stages, n))
+
+    t = 0.0
+    ts[0] = t
+    ys[0] = y0
+    fs[0] = fun(t, y0, *args)
+    g = [event(t, y0, *args) for event in events]
+    event = -1
+    i = 0
+    while t < t_end:
+        y = ys[i]
+        t_new = min(t + step, t_end)
+        h = t_new - t
+
+        K[0] = fs[i]
+        for s in range(1, n_stages):
+            K[s] = fun(t + C[s]*h, y + np.dot(A[s, :s], K[:s])*h, *args)
+        ys[i + 1] = y + h*np.dot(B, K)
+        fs[i + 1] = fun(t_new, ys[i + 1], *args)
+        ts[i + 1] = t_new
+        i += 1
+
+        g_new = [e(t_new, ys[i], *args) for e in events]
+        hit = [k for k in range(len(events))
+               if _crossed(g[k], g_new[k], direction[k])]
+        if hit:
+            # Events are located on the interpolant of this step only
+            t_old = np.array([t])
+            y_old = ys[i - 1][:, None]
+            Q = _hermite(y_old, ys[i][:, None], fs[i - 1][:, None],
+                         fs[i][:, None], h)
+            t_stop = np.inf
+            found = []
+            for k in hit:
+                sign = 1.0 if g[k] > g_new[k] else -1.0
+                root = _locate_events(_single(events[k], args), sign, t_old,
+                                      h, y_old, Q, np.array([t_new]), ())
+                found.append((k, root))
+                if terminal[k] and root[0] < t_stop:
+                    t_stop = root[0]
+                    event = k
+            for k, root in found:
+                if root[0] <= t_stop:
+                    occurrences[k].append((root,
+                                           _dense(t_old, h, y_old, Q, root)))
+            if event >= 0:
+                t = t_stop
+                y_end = _dense(t_old, h, y_old, Q, np.array([t_stop]))[:, 0]
+                break
+        g = g_new
+        t = t_new
+    else:
+        y_end = ys[i].copy()
+
+    sol = None
+    if dense_output:
+        h = np.diff(ts[:i + 1])
+        Q = _hermite(ys[:i].T, ys[1:i + 1].T, fs[:i].T, fs[1:i + 1].T, h)
+        sol = [MemberSolution(ts[:i].copy(), h, ys[:i].T.copy(), Q)]
+
+    t_events = [np.concatenate([o[0] for o in occ] + [[]]) for occ in occurrences]
+    y_events = [np.concatenate([o[1] for o in occ] + [np.empty((n, 0))], axis=1)
+                for occ in occurrences]
+    i_events = [np.zeros(len(te), dtype=int) for te in t_events]
+
+    return EnsembleResult(np.array([t]), y_end[:, None], np.array([event]),
+                          np.array([1 + n_stages*i]), np.array([i]),
+                          np.zeros(1, dtype=int), sol, i_events, t_events,
+                          y_events)
+
+
+def _crossed(g_old, g_new, direction):
+    """
+    Whether an event changed sign in the given direction over a step.
+    """
+    up = g_old <= 0 and g_new >= 0
+    down = g_old >= 0 and g_new <= 0
+    return (up and direction >= 0) or (down and direction <= 0)
+
+
+def _single(event, args):
+    """
+    Event of a single state, evaluated on an ensemble of one member.
+    """
+    def g(t, y):
+        return event(t[0], y[:, 0], *args)
+    return g
+
+
+def _member_solutions(records, N, n):
+    """
+    Regroup the step records, which are stored per iteration, into one
+    continuous solution per member.
+    """
+    if not records:
+        return [None]*N
+    member = np.concatenate([r[0] for r in records])
+    t_old = np.concatenate([r[1] for r in records])
+    h = np.concatenate([r[2] for r in records])
+    y_old = np.concatenate([r[3] for r in records], axis=1)
+    Q = np.concatenate([r[4] for r in records], axis=2)
+
+    # Records are in time order per member, a stable sort keeps it so
+    order = np.argsort(member, kind='stable')
+    bounds = np.searchsorted(member[order], np.arange(N + 1))
+
+    sol = []
+    for i in range(N):
+        k = order[bounds[i]:bounds[i + 1]]
+        sol.append(MemberSolution(t_old[k], h[k], y_old[:, k], Q[:, :, k]))
+    return sol
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Multilinear interpolation on regular grids, shared by the wind fields
+and the surrogate flight tables.
+"""
+
+from itertools import product
+import numpy as np
+
+
+class RegularGrid:
+    """
+    Values on a regular grid, interpolated linearly along each axis. The
+    grid lines need not be equidistant. Points outside the grid get the
+    values at the nearest boundary.
+
+    The values may be a memory-mapped array, only the corners of the
+    cells holding the points are read.
+
+    :param list axes: Grid lines of each axis, increasing
+    :param array values: Values at the grid nodes, shape
+                         (len(axes[0]), ..., len(axes[-1]), m)
+    """
+    def __init__(self, axes, values):
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        shape = tuple(len(a) for a in self.axes)
+        if values.shape[:-1] != shape:
+            raise ValueError("values must have shape %s + (m,), got %s"
+                             % (shape, values.shape))
+        if any(len(a) < 2 for a in self.axes):
+            raise ValueError("the grid needs at least two lines per axis")
+        self.values = values
+
+        # Offsets of the 2**ndim corners of a cell in the flattened grid
+        ndim = len(shape)
+        self._corners = np.array(list(product((0, 1), repeat=ndim)))
+        self._strides = np.array([int(np.prod(shape[k + 1:]))
+                                  for k in range(ndim)])
+        self._offsets = self._corners @ self._strides
+        # A plain view, as indexing a memory map is slower
+        self._flat = np.asarray(values).reshape(-1, values.shape[-1])
+
+        # Grid lines of all axes in one array, for bracketing the points
+        # along every axis at once
+        self._lines = np.concatenate(self.axes)
+        self._start = np.cumsum([0] + list(shape[:-1]))
+        self._last = np.array(shape) - 2
+
+        # Bounds of the grid along each axis
+        self.lower = np.array([a[0] for a in self.axes])
+        self.upper = np.array([a[-1] for a in self.axes])
+
+    def __call__(self, points):
+        """
+        Interpolated values at given points.
+
+        :param array points: Points, shape (ndim,) or (ndim, n)
+        :return: Values, shape (m,) or (m, n)
+        :rtype: array
+        """
+        p = np.asarray(points, dtype=float)
+        extra = (1,)*(p.ndim - 1)
+
+        # Cell of each point along each axis and the relative position
+        # within it, clamped to the grid
+        i = np.array([a.searchsorted(q, side='right')
+                      for a, q in zip(self.axes, p)])
+        i = np.minimum(np.maximum(i - 1, 0), self._last.reshape((-1,) + extra))
+        j = i + self._start.reshape((-1,) + extra)
+        lo = self._lines[j]
+        w = (p - lo)/(self._lines[j + 1] - lo)
+        w = np.minimum(np.maximum(w, 0.0), 1.0)
+
+        # Gather the corners of the cells from the flattened grid and sum
+        # them with the products of the weights along each axis
+        flat = self._offsets.reshape((-1,) + extra) + self._strides @ i
+        corners = self._corners.reshape(self._corners.shape + extra)
+        weight = np.where(corners, w, 1.0 - w).prod(axis=1)
+        u = np.einsum('c...,c...m->m...', weight, self._flat[flat])
+        return u
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Styles of plots comparing any number of discs. Past the 10 colors of
+the color cycle, the line style changes, and the legends get more
+columns.
+"""
+
+
+def line_style(i):
+    """
+    Color and line style of the i-th line.
+
+    :param int i: Index of the line
+    :rtype: dict
+    """
+    return dict(color='C%d' % (i % 10), linestyle=('-', '--', ':', '-.')[i // 10 % 4])
+
+
+def legend_columns(n):
+    """
+    Number of legend columns for n lines, one per 10 lines.
+
+    :param int n: Number of lines
+    :rtype: int
+    """
+    return 1 + (n - 1) // 10
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in timing of the force model, to see where the time of a shot goes.
+While in a with block, calls to the right hand sides, the forces, the
+coefficient lookups, the wind and the transforms are timed per call::
+
+    from shotshaper.profiling import Profiler
+    from shotshaper.projectile import DiscGolfDisc
+
+    d = DiscGolfDisc('dd2')
+    with Profiler() as prof:
+        d.shoot(speed=24, omega=116.8, pitch=15.5, position=(0, 0, 1.3),
+                nose_angle=0, roll_angle=14.7)
+    print(prof.report())
+
+The functions are replaced for all projectiles in the process, so the
+profiler is not meant for use from several threads at once. Times are
+inclusive, e.g. the time of DiscGolfDisc._forces holds that of the
+coefficient lookups and transforms it calls, and each timed call adds
+a fraction of a microsecond of overhead.
+"""
+
+from functools import wraps
+from time import perf_counter
+
+from . import projectile
+from .environment import Environment
+
+# Methods timed on the classes that define them
+METHODS = ('advance', 'advance_batch', '_forces', 'coefficients',
+           'gravity_force', 'air_resistance_force', 'spin_force',
+           'drag_coefficient', 'lift_coefficient', 'wind_velocity')
+
+# Transforms timed where the projectile module calls them
+TRANSFORMS = ('T_12', 'rotate_z', 'rotate_y', 'apply', 'apply_inverse')
+
+
+def _classes():
+    classes = [c for c in vars(projectile).values()
+               if isinstance(c, type) and issubclass(c, projectile._Projectile)]
+    return classes + [Environment]
+
+
+class Profiler:
+    """
+    Times calls to the force model while in a with block.
+
+    :param dict timings: Number of calls and total time (s) by name,
+                         accumulated over all with blocks
+    """
+    def __init__(self):
+        self.timings = {}
+        self._saved = []
+
+    def _wrap(self, name, function):
+        counter = self.timings.setdefault(name, [0, 0.0])
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                counter[0] += 1
+                counter[1] += perf_counter() - start
+        return timed
+
+    def __enter__(self):
+        for cls in _classes():
+            for name in METHODS:
+                if name in vars(cls):
+                    original = vars(cls)[name]
+                    self._saved.append((cls, name, original))
+                    setattr(cls, name, self._wrap('%s.%s' % (cls.__name__, name),
+                                                  original))
+        for name in TRANSFORMS:
+            original = getattr(projectile, name)
+            self._saved.append((projectile, name, original))
+            setattr(projectile, name, self._wrap('transforms.' + name, original))
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, original in reversed(self._saved):
+            setattr(owner, name, original)
+        self._saved = []
+
+    def report(self):
+        """
+        Table of the number of calls, total time and time per call of
+        each timed function that was called, slowest first.
+
+        :rtype: string
+        """
+        lines = ['%-54s %9s %10s %10s' % ('function', 'calls', 'total ms',
+                                          'us/call')]
+        for name, (calls, total) in sorted(self.timings.items(),
+                                           key=lambda item: -item[1][1]):
+            if calls:
+                lines.append('%-54s %9d %10.2f %10.2f' % (name, calls, 1e3*total,
+                                                          1e6*total/calls))
+        return '\n'.join(lines)
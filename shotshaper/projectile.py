@@ -12,63 +12,655 @@ TODO:
 """
 
 from abc import ABC, abstractmethod
-from scipy.integrate import solve_ivp
-from scipy.interpolate import interp1d
-from .transforms import T_12, T_23, T_34, T_14, T_41, T_31
-import matplotlib.pyplot as pl
-from numpy import exp,matmul,pi,sqrt,arctan2,radians,degrees,sin,cos,array,concatenate,linspace,zeros_like,cross,zeros,argmin
+from .transforms import T_12, rotate_z, rotate_y, apply, apply_inverse
+from .integrators import solve_ensemble, solve_fixed
+from numpy import exp,matmul,pi,sqrt,arctan2,radians,degrees,sin,cos,array,concatenate,linspace,zeros_like,cross,zeros,argmin,ceil,einsum,arange,lexsort,searchsorted,interp,maximum,where,nan,inf,argmax,broadcast_arrays,atleast_1d,asarray,power,ndim
 from numpy.linalg import norm
 from . import environment
+from . import compiled
+from .environment import Environment
 import os
-import yaml
+from collections import namedtuple
+from functools import lru_cache
+from copy import copy
+from time import perf_counter
+import hashlib
+
+# scipy.integrate, scipy.interpolate, yaml and matplotlib are imported 
+# where first needed. Importing this module loads only NumPy, which
+# keeps short-lived batch workers quick to start.
 
 T_END = 60
 N_STEP = 200
 
+# Default lookup table of the discs, the one compiled with the definition
+TABLE_STEP = 2.0
+TABLE_TOL = 1e-6
+
+# Named solver settings. The errors are the deviation of the landing
+# point from a DOP853 reference with rtol = atol = 1e-12, over a grid of
+# 2016 throws of dd2, cd1, cd5 and fd2 at 15-28 m/s, pitch 8-20 deg,
+# roll -20 to 30 deg, no nose angle and 0.9 or 1 times the empirical
+# spin, released at 1.5 m. Nine throws in ten are within the typical
+# error. The worst case is the largest error on the grid, each time for
+# a fast, high throw of dd2, so it is no bound between the grid points.
+# The relative cost is the mean number of right hand side evaluations.
+#
+#                                               typical   worst   cost
+#   interactive   RK23, rtol 1e-2, atol 1e-4    0.19 m    1.8 m   ~0.5x
+#   standard      RK45, rtol 1e-3, atol 1e-6    0.06 m    1.1 m    1x
+#   reference     RK45, rtol 1e-9, atol 1e-9    9e-6 m    8e-5 m  ~9x
+#
+# The interactive preset suits GUIs and large sweeps, the reference
+# preset validation. Standard is scipy's default and used unless
+# another preset or option is given.
+SOLVER_PRESETS = {
+    'interactive': dict(method='RK23', rtol=1e-2, atol=1e-4, max_step=inf),
+    'standard': dict(method='RK45', rtol=1e-3, atol=1e-6, max_step=inf),
+    'reference': dict(method='RK45', rtol=1e-9, atol=1e-9, max_step=inf),
+}
+SOLVER_OPTIONS = ('method', 'rtol', 'atol', 'max_step', 't_end')
+
 def hit_ground(t, y, *args): 
     return y[2]
 
 def stopped(t, y, *args):
-    U = norm(y[3:6])
+    U = norm(y[3:6], axis=0)
     return U - 1e-4
 
+def apex(t, y, *args):
+    return y[5]
+
+# What ended a flight, see SolverStats. Failed means the solver gave up,
+# e.g. when the step size became too small.
+ENDINGS = ('hit_ground', 'stopped', 'T_END', 'failed')
+
+# Stages per step of the explicit Runge-Kutta methods of solve_ivp, and
+# the extra evaluations of DOP853 for the interpolant of a step, which is
+# built for each step of a trajectory, but else only where events are
+_RK_STAGES = {'RK23': (3, 0), 'RK45': (6, 0), 'DOP853': (12, 3)}
+
+FlightData = namedtuple('FlightData', ['arc_length', 'alpha', 'beta', 'lift',
+                                       'drag', 'moment', 'roll_rate'])
+
+class SolverStats:
+    """
+    Diagnostics of the integration of a shot. Members of a batch are
+    integrated together, so their times are those of the whole batch,
+    while the counts are per member.
+
+    :param int nfev: Number of right hand side evaluations
+    :param int naccept: Number of accepted steps
+    :param int nreject: Number of rejected steps, None if the method
+                        does not tell
+    :param string ending: What ended the flight, one of ENDINGS
+    :param float setup_time: Wall time from the call to shoot until
+                             the solver starts (s)
+    :param float integration_time: Wall time in the solver (s)
+    :param int batch: Number of members integrated together
+    """
+    def __init__(self, nfev, naccept, nreject, ending, setup_time,
+                 integration_time, batch=1):
+        self.nfev = nfev
+        self.naccept = naccept
+        self.nreject = nreject
+        self.ending = ending
+        self.setup_time = setup_time
+        self.integration_time = integration_time
+        self.batch = batch
+        # Wall time sampling the trajectory (s), set when first sampled
+        self.sampling_time = None
+    
+    def __repr__(self):
+        return ('SolverStats(nfev=%d, naccept=%d, nreject=%s, ending=%r, '
+                'setup_time=%.3g, integration_time=%.3g, sampling_time=%s, '
+                'batch=%d)' % (self.nfev, self.naccept, self.nreject, 
+                               self.ending, self.setup_time, 
+                               self.integration_time, 
+                               None if self.sampling_time is None 
+                               else '%.3g' % self.sampling_time, self.batch))
+
 class Shot:
-    def __init__(self,t,x,v,att=None):
-        self.time = t
-        self.position = x
-        self.velocity = v
-        if att is not None:
-            self.attitude = att
+    """
+    Trajectory of a shot, with positions, velocities and, for discs,
+    attitudes stored column-wise.
+
+    A shot is either created from sampled arrays, or from the continuous
+    solution of the solver. In the latter case, the arrays are sampled at
+    n_step points over the flight when first accessed, and the solution
+    can be queried at any time or distance.
+
+    :param array t: Sample times
+    :param array x: Positions, shape (3, len(t))
+    :param array v: Velocities, shape (3, len(t))
+    :param array att: Attitudes, shape (3, len(t)), if any
+    :param callable sol: Continuous solution, returning states for times
+    :param float t_end: End of the flight, when given a solution
+    :param int n_step: Number of samples, when given a solution
+    :param SolverStats stats: Diagnostics of the solver, if any
+    """
+    def __init__(self,t=None,x=None,v=None,att=None,sol=None,t_end=None,n_step=N_STEP,stats=None):
+        self._sol = sol
+        self.stats = stats
+        if sol is None:
+            self._time = asarray(t)
+            self._state = concatenate((x, v)) if att is None else concatenate((x, v, att))
+            self.t_end = self._time[-1]
+            self.n_step = len(self._time)
+        else:
+            self._time = None
+            self._state = None
+            self.t_end = t_end
+            self.n_step = n_step
+    
+    @property
+    def time(self):
+        if self._time is None:
+            self._time = linspace(0,self.t_end,self.n_step)
+        return self._time
+    
+    @property
+    def _states(self):
+        if self._state is None:
+            start = perf_counter()
+            self._state = self._sol(self.time)
+            if self.stats is not None:
+                self.stats.sampling_time = perf_counter() - start
+        return self._state
+    
+    @property
+    def position(self):
+        return self._states[0:3]
+    
+    @position.setter
+    def position(self, x):
+        self._states[0:3] = x
+    
+    @property
+    def velocity(self):
+        return self._states[3:6]
+    
+    @velocity.setter
+    def velocity(self, v):
+        self._states[3:6] = v
+    
+    @property
+    def attitude(self):
+        if len(self._states) <= 6:
+            raise AttributeError("'Shot' object has no attribute 'attitude'")
+        return self._states[6:9]
+    
+    @attitude.setter
+    def attitude(self, att):
+        self._states[6:9] = att
+    
+    def _evaluate(self, t):
+        if self._sol is not None:
+            return self._sol(t)
+        # Sampled shots are interpolated linearly
+        return array([interp(t, self._time, f) for f in self._state])
+    
+    def at(self, t):
+        """
+        Sample the shot at given times within the flight.
+
+        :param array t: Times (s)
+        :return: Shot sampled at the given times
+        :rtype: Shot
+        """
+        t = atleast_1d(asarray(t, dtype=float))
+        f = self._evaluate(t)
+        
+        return Shot(t, f[0:3], f[3:6], f[6:9] if len(f) > 6 else None)
+    
+    def at_distance(self, x):
+        """
+        Sample the shot where it first reaches given distances along the
+        x-axis. Distances that are never reached give NaN.
+
+        :param array x: Distances (m)
+        :return: Shot sampled at the given distances
+        :rtype: Shot
+        """
+        x = atleast_1d(asarray(x, dtype=float))
+        
+        # Bracket the first crossing on a coarse sampling, then bisect
+        tc = linspace(0,self.t_end,N_STEP)
+        xc = self._evaluate(tc)[0]
+        reached = xc[None,:] >= x[:,None]
+        k = argmax(reached, axis=1)
+        found = reached[arange(len(x)),k]
+        lo = tc[maximum(k - 1, 0)]
+        hi = tc[k]
+        for i in range(50):
+            mid = 0.5*(lo + hi)
+            beyond = self._evaluate(mid)[0] >= x
+            lo = where(beyond, lo, mid)
+            hi = where(beyond, mid, hi)
+        
+        t = where(found, hi, 0.0)
+        f = self._evaluate(t)
+        f[:,~found] = nan
+        t[~found] = nan
+        
+        return Shot(t, f[0:3], f[3:6], f[6:9] if len(f) > 6 else None)
+    
+    def resample(self, n):
+        """
+        Sample the shot at n equidistant times over the flight.
+
+        :param int n: Number of samples
+        :return: Resampled shot
+        :rtype: Shot
+        """
+        if self._sol is not None:
+            stats = None if self.stats is None else copy(self.stats)
+            if stats is not None:
+                stats.sampling_time = None
+            return Shot(sol=self._sol, t_end=self.t_end, n_step=n, stats=stats)
+        
+        return self.at(linspace(0,self.t_end,n))
+
+class ShotSummary:
+    """
+    Key figures of a shot, for when the trajectory itself is not needed.
+
+    :param float flight_time: Time until the flight ended
+    :param array launch: Launch position
+    :param array landing: Position where the flight ended
+    :param array apex: Position at the highest point of the flight
+    :param SolverStats stats: Diagnostics of the solver, if any
+    """
+    def __init__(self, flight_time, launch, landing, apex, stats=None):
+        self.flight_time = flight_time
+        self.stats = stats
+        self.launch = launch
+        self.landing = landing
+        self.apex = apex
+        self.max_height = apex[2]
+        self.distance = landing[0] - launch[0]
+        self.drift = landing[1] - launch[1]
+
+def _summarize(y0, t_end, y_end, i_apex, y_apex, stats):
+    """
+    Summaries of an ensemble of shots. The apex is taken as the highest
+    of the launch point, the landing point and the tops of the trajectory
+    found by the apex event, which may occur several times per member.
+    """
+    n = y0.shape[1]
+    member = concatenate((arange(n), arange(n), i_apex))
+    cand = concatenate((y0[0:3], y_end[0:3], y_apex[0:3]), axis=1)
+    order = lexsort((cand[2], member))
+    last = searchsorted(member[order], arange(n), side='right') - 1
+    top = cand[:,order[last]]
+    
+    return [ShotSummary(t_end[i], y0[0:3,i], y_end[0:3,i], top[:,i], stats[i]) 
+            for i in range(n)]
+
+def _sample_shot(sol, t_end, stats):
+    """
+    Shot from a continuous solution, sampled at N_STEP points between 
+    launch and the end of the flight when first accessed.
+    """
+    return Shot(sol=sol, t_end=t_end, n_step=N_STEP, stats=stats)
+
+def _scalar_stats(sol, method, start, solved, finished, dense):
+    """
+    Diagnostics of a solve_ivp shot. Rejected steps are only known for 
+    the explicit Runge-Kutta methods, which take a fixed number of 
+    evaluations per attempted step, after two for the initial step, 
+    and for each interpolant built.
+    """
+    naccept = len(sol.t) - 1
+    nreject = None
+    if method in _RK_STAGES:
+        stages, extra = _RK_STAGES[method]
+        if dense:
+            ninterp = naccept
+        else:
+            # The steps in which an event was found
+            t_events = concatenate([asarray(t, dtype=float) for t in sol.t_events])
+            ninterp = len(set(searchsorted(sol.t, t_events)))
+        nreject = (sol.nfev - 2 - stages*naccept - extra*ninterp)//stages
+    if sol.status == 0:
+        ending = 'T_END'
+    elif sol.status == 1:
+        ending = ENDINGS[0] if len(sol.t_events[0]) else ENDINGS[1]
+    else:
+        ending = 'failed'
+    return SolverStats(sol.nfev, naccept, nreject, ending, solved - start,
+                       finished - solved)
+
+def _ensemble_stats(res, start, solved, finished):
+    """
+    Diagnostics of each member of a solve_ensemble or solve_fixed result.
+    """
+    n = len(res.t)
+    endings = [ENDINGS[e] if e >= 0 else 'T_END' if e == -1 else 'failed' 
+               for e in res.event]
+    return [SolverStats(int(res.nfev[i]), int(res.naccept[i]), 
+                        int(res.nreject[i]), endings[i], solved - start, 
+                        finished - solved, n) for i in range(n)]
+
+def _ensemble_shots(res, y0, summary, start, solved):
+    """
+    Shots or summaries of the members of an ensemble result.
+    """
+    stats = _ensemble_stats(res, start, solved, perf_counter())
+    
+    if summary:
+        return _summarize(y0, res.t, res.y, res.i_events[2], res.y_events[2],
+                          stats)
+    
+    return [_sample_shot(sol, t, st) for sol, t, st in zip(res.sol, res.t, stats)]
+
+def _check_output(output):
+    """
+    Validate the requested output of a shot, returning True for a summary.
+    """
+    if output not in ('trajectory', 'summary'):
+        raise ValueError("output must be 'trajectory' or 'summary', got %r" % (output,))
+    return output == 'summary'
+
+def _solver_preset(name):
+    if name not in SOLVER_PRESETS:
+        raise ValueError("solver must be one of %s, got %r" 
+                         % (", ".join(SOLVER_PRESETS), name))
+    return SOLVER_PRESETS[name]
+
+def _select(condition, a, b):
+    """
+    Elementwise choice between a and b, as where, but a plain branch for
+    scalars, where the overhead of where dominates.
+    """
+    if ndim(condition) == 0:
+        return a if condition else b
+    return where(condition, a, b)
+
+_DiscDefinition = namedtuple('_DiscDefinition', ['diameter', 'J_xy', 'J_z', 
+                                                 'alpha', 'Cl', 'Cd', 'Cm', 
+                                                 'interpolants', 'tables',
+                                                 'digest'])
+
+@lru_cache(maxsize=None)
+def _read_definition(name, path, mtime):
+    """
+    Read a disc definition and expand the coefficients to the full 
+    circle, from the compiled definition if it was made from the same
+    content. The result is shared by all discs made from the same file
+    for the lifetime of the process, so its arrays are read-only.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha1(content).hexdigest()
+    
+    stored = compiled.load(compiled.path(name, digest), digest)
+    if stored is not None:
+        info, arrays = stored
+        table = (info['table_step'], arrays['table'], info['table_error'])
+        return _DiscDefinition(info['diameter'], info['J_xy'], info['J_z'],
+                               arrays['alpha'], arrays['Cl'], arrays['Cd'],
+                               arrays['Cm'], {}, {tuple(info['table_key']): table},
+                               digest)
+    
+    import yaml
+    data = yaml.load(content, Loader=yaml.FullLoader)
+    
+    coeffs = DiscGolfDisc._flip(array(data['alpha']), array(data['Cl']),
+                                array(data['Cd']), array(data['Cm']))
+    for c in coeffs:
+        c.flags.writeable = False
+    alpha, cl, cd, cm = coeffs
+    
+    # The interp1d of each coefficient is made on first use, and the
+    # lookup tables by the first disc using them
+    return _DiscDefinition(data['diameter'], data['J_xy'], data['J_z'],
+                           alpha, cl, cd, cm, {}, {}, digest)
+
+def _compile_definition(name, definition):
+    """
+    Store a disc definition with its default lookup table, see compiled.
+    """
+    key = (TABLE_STEP, TABLE_TOL)
+    table_step, table, table_error = definition.tables[key]
+    info = dict(diameter=definition.diameter, J_xy=definition.J_xy,
+                J_z=definition.J_z, table_key=key, table_step=table_step,
+                table_error=float(table_error))
+    arrays = dict(alpha=definition.alpha, Cl=definition.Cl, Cd=definition.Cd,
+                  Cm=definition.Cm, table=table)
+    compiled.save(compiled.path(name, definition.digest), definition.digest,
+                  info, arrays)
+
+def _environment(kwargs):
+    """
+    Environment of a shot, the module defaults unless given as env.
+    """
+    env = kwargs.get("env")
+    return Environment() if env is None else env
+
+def _batch_environment(kwargs, n):
+    """
+    Environment of a batch, given as a single environment for all
+    members or as a sequence with one environment per member.
+    """
+    env = kwargs.get("env")
+    if env is None or isinstance(env, Environment):
+        return _environment(kwargs)
+    if len(env) != n:
+        raise ValueError("expected one environment per member, %d, got %d" % (n, len(env)))
+    return Environment.stack(env)
+
+def _batch_arrays(kwargs, *values):
+    """
+    Broadcast scalar or array launch parameters to a common 1D shape.
+    A sequence of environments, or positions or spins given per member,
+    also count towards the number of members.
+    """
+    members = []
+    env = kwargs.get("env")
+    if env is not None and not isinstance(env, Environment):
+        members.append(zeros(len(env)))
+    for name in ("position", "spin"):
+        if name in kwargs and ndim(kwargs[name]) > 1:
+            members.append(zeros(len(kwargs[name])))
+    try:
+        arrays = broadcast_arrays(*[atleast_1d(asarray(v, dtype=float)) for v in values], 
+                                  *members)
+    except ValueError:
+        sizes = [len(a) for a in [atleast_1d(v) for v in values] + members]
+        raise ValueError("launch parameters of a batch have different numbers "
+                         "of members, %s" % sorted(set(sizes) - {1}))
+    return arrays[:len(values)]
+
+def _batch_position(kwargs, n):
+    """
+    Launch positions for a batch, given as a single (3,) position
+    or one position per member with shape (n, 3). Returned column-wise.
+    """
+    if "position" not in kwargs:
+        return zeros((3,n))
+    
+    pos = asarray(kwargs["position"], dtype=float)
+    if pos.ndim == 1:
+        return pos[:,None].repeat(n, axis=1)
+    return pos.T.copy()
         
 
 class _Projectile(ABC):
+    # Solver settings of this projectile, see set_solver
+    _solver = {}
+    
     def __init__(self):
         pass
+    
+    def set_solver(self, preset='standard', **options):
+        """
+        Set the default solver settings for the shots of this projectile,
+        as a named preset from SOLVER_PRESETS optionally overridden by 
+        individual options. 
+        
+        :param string preset: 'interactive', 'standard' or 'reference'
+        :param string method: Integration method, any solve_ivp method
+                              or 'RK4' for shoot, 'RK45', 'RK23' or 
+                              'RK4' for shoot_batch. RK4 takes fixed 
+                              steps of max_step.
+        :param float rtol: Relative tolerance
+        :param float atol: Absolute tolerance
+        :param float max_step: Maximum step size (s)
+        :param float t_end: Time at which the flight is stopped (s)
+        """
+        self._solver = dict(_solver_preset(preset), **self._check_solver(options))
+    
+    @staticmethod
+    def _check_solver(options):
+        unknown = set(options) - set(SOLVER_OPTIONS)
+        if unknown:
+            raise TypeError("unknown solver options: %s" % ", ".join(sorted(unknown)))
+        return options
+    
+    def _cache_key(self):
+        """
+        Properties of the projectile that its shots depend on, as a 
+        hashable key for cached shots.
+        """
+        props = sorted((k, v if isinstance(v, str) else float(v)) 
+                       for k, v in vars(self).items() 
+                       if isinstance(v, (int, float, str)))
+        return (type(self).__name__,) + tuple(props)
+    
+    def solver_options(self, **kwargs):
+        """
+        Solver settings for a shot. The defaults of the standard preset
+        are overridden in turn by the settings of the projectile, a 
+        preset given as solver and individual options in kwargs. Other
+        entries of kwargs, such as launch parameters, are ignored. The
+        shoot methods take the same keywords, e.g. 
+        shoot(speed=24, ..., solver='reference', max_step=0.01).
+        
+        :return: method, rtol, atol, max_step and t_end
+        :rtype: dict
+        """
+        options = dict(_solver_preset('standard'), t_end=T_END)
+        options.update(self._solver)
+        if kwargs.get("solver") is not None:
+            options.update(_solver_preset(kwargs["solver"]))
+        options.update((k, kwargs[k]) for k in SOLVER_OPTIONS if k in kwargs)
+        return options
+    
+    def _shot_options(self, kwargs, start=None):
+        """
+        Keyword arguments for _shoot and _shoot_batch from shoot kwargs.
+        The start is the time shoot was called, for the setup time.
+        """
+        return dict(self.solver_options(**kwargs), 
+                    output=kwargs.get("output", "trajectory"), start=start)
    
-    def _shoot(self, advance_function, y0, *args):
+    def _shoot(self, advance_function, y0, *args, output='trajectory',
+               method='RK45', rtol=1e-3, atol=1e-6, max_step=inf, t_end=T_END,
+               start=None):
+        if start is None:
+            start = perf_counter()
         hit_ground.terminal = True
         hit_ground.direction = -1
         stopped.terminal = True
         stopped.direction = -1
+        apex.direction = -1
+        
+        summary = _check_output(output)
+        
+        # The fixed step scheme has its own loop for a single shot
+        if method == 'RK4':
+            solved = perf_counter()
+            res = solve_fixed(advance_function, y0, t_end,
+                              events=(hit_ground,stopped,apex), args=args,
+                              step=max_step, dense_output=not summary)
+            return _ensemble_shots(res, y0[:,None], summary, start, solved)[0]
+        
+        from scipy.integrate import solve_ivp
+        
+        # A summary takes the apex and landing from the events, 
+        # so no interpolant is needed
+        solved = perf_counter()
+        sol = solve_ivp(advance_function,[0,t_end],y0,
+                        dense_output=not summary,args=args,
+                        method=method,rtol=rtol,atol=atol,max_step=max_step,
+                        events=(hit_ground,stopped,apex))
+        stats = _scalar_stats(sol, method, start, solved, perf_counter(),
+                              not summary)
+        
+        if summary:
+            i_apex = zeros(len(sol.t_events[2]), dtype=int)
+            return _summarize(y0[:,None], sol.t[-1:], sol.y[:,-1:], 
+                              i_apex, sol.y_events[2].T.reshape(len(y0), -1),
+                              [stats])[0]
+        
+        return _sample_shot(sol.sol, sol.t[-1], stats)
+    
+    def _shoot_batch(self, advance_function, y0, *args, output='trajectory',
+                     method='RK45', rtol=1e-3, atol=1e-6, max_step=inf, t_end=T_END,
+                     start=None):
+        """
+        Integrate an ensemble of shots simultaneously. Each member
+        terminates on its own when hitting the ground.
+
+        :param callable advance_function: Vectorized right hand side
+        :param array y0: Initial states, one column per member
+        :param args: Extra arguments, last axis running over the members
+        :param string output: 'trajectory' for shots, 'summary' for summaries
+        :param string method: 'RK45', 'RK23' or 'RK4'
+        :param float rtol: Relative tolerance
+        :param float atol: Absolute tolerance
+        :param float max_step: Maximum step size (s)
+        :param float t_end: Time at which the flight is stopped (s)
+        :param float start: Time shoot_batch was called, for the setup time
+        :return: One shot or summary per member
+        :rtype: list
+        """
+        if start is None:
+            start = perf_counter()
+        hit_ground.terminal = True
+        hit_ground.direction = -1
+        stopped.terminal = True
+        stopped.direction = -1
+        apex.direction = -1
         
-        sol = solve_ivp(advance_function,[0,T_END],y0,
-                        dense_output=True,args=args,
-                        method='RK45',
-                        events=(hit_ground,stopped))
-        
-        t = linspace(0,sol.t[-1],N_STEP)
-        
-        f = sol.sol(t)
-        pos = array([f[0],f[1],f[2]])
-        vel = array([f[3],f[4],f[5]])
-        
-        if len(f) <= 6:
-            shot = Shot(t, pos, vel)
-        else:    
-            att = array([f[6],f[7],f[8]])
-            shot = Shot(t, pos, vel, att)
+        summary = _check_output(output)
         
-        return shot
+        solved = perf_counter()
+        res = solve_ensemble(advance_function, y0, t_end,
+                             events=(hit_ground,stopped,apex), args=args,
+                             rtol=rtol, atol=atol, max_step=max_step,
+                             dense_output=not summary, method=method)
+        return _ensemble_shots(res, y0, summary, start, solved)
+    
+    def aim(self, target, free, bounds=None, tol=0.5, **launch):
+        """
+        Launch that lands at a target, searching over the free launch
+        parameters with the others fixed, see shotshaper.targeting.aim.
+        For example, the pitch and yaw of a ball thrown at 10 m/s:
+        aim((12, 3), ('pitch', 'yaw'), speed=10, position=(0, 0, 2)).
+
+        :param array target: Target, (x, y) on the ground (m)
+        :param tuple free: Names of the free launch parameters
+        :param dict bounds: Range of each free parameter, (lower, upper)
+        :param float tol: Allowed distance from the target (m)
+        :return: The launch and where it lands
+        :rtype: Aim
+        """
+        from . import targeting
+        return targeting.aim(self, target, free, launch, bounds, tol)
+
+    @abstractmethod
+    def shoot_batch(self, **kwargs):
+        """
+        Shoot several projectiles at once. Takes the same arguments as
+        shoot, where each launch parameter may be given as an array
+        with one value per member. With output='summary', a ShotSummary
+        is returned per member instead of the sampled trajectory.
+
+        :return: One shot per member
+        :rtype: list
+        """
          
     @abstractmethod
     def advance(self,t,vec,*args):
@@ -81,11 +673,6 @@ class _Projectile(ABC):
         """
         
 class _Particle(_Projectile):
-    def __init__(self):
-        super().__init__()
-        
-        self.g = environment.g
-        
     def initialize_shot(self, **kwargs):
         kwargs.setdefault('yaw', 0.0) 
         
@@ -108,28 +695,63 @@ class _Particle(_Projectile):
             
     def shoot(self, **kwargs):
 
+        start = perf_counter()
         y0 = self.initialize_shot(**kwargs)
-        shot = self._shoot(self.advance, y0)
+        env = _environment(kwargs)
+        shot = self._shoot(self.advance, y0, env, **self._shot_options(kwargs, start))
         
         return shot
+    
+    def initialize_shot_batch(self, **kwargs):
+        kwargs.setdefault('yaw', 0.0) 
         
-    def gravity_force(self, x=None):
+        U, pitch, yaw = _batch_arrays(kwargs, kwargs["speed"],
+                                      radians(kwargs["pitch"]),
+                                      radians(kwargs["yaw"]))
+        xy = cos(pitch)
+        u = U*xy*cos(yaw)
+        w = U*sin(pitch)
+        v = U*xy*sin(-yaw)
+        x,y,z = _batch_position(kwargs, len(U))
+        
+        y0 = array((x,y,z,u,v,w))
+        return y0
+    
+    def shoot_batch(self, **kwargs):
+        
+        start = perf_counter()
+        y0 = self.initialize_shot_batch(**kwargs)
+        env = _batch_environment(kwargs, y0.shape[1])
+        shots = self._shoot_batch(self.advance_batch, y0, env, **self._shot_options(kwargs, start))
+        
+        return shots
+        
+    def gravity_force(self, x=None, env=None):
+        """
+        Gravitational acceleration, a single vector, or one vector per
+        column of x in the layout of x.
+        """
+        if env is None:
+            env = Environment()
         if x is None:
-            return array((0,0,environment.g))
-        else:
-            # Messy way to return g array...
-            f = zeros_like(x)
-            f[0,:] = 0
-            f[1,:] = 0
-            f[2,:] = environment.g
-            return f
-        
-    def advance(self, t, vec, *args):
+            return array((0,0,env.g))
+        f = zeros_like(x, dtype=float)
+        f[2] = env.g
+        return f
+        
+    def advance(self, t, vec, env=None):
         # x, y, z, u, v, w = vec
         x = vec[0:3]
         u = vec[3:6]
         
-        f = self.gravity_force()
+        f = self.gravity_force(env=env)
+        
+        return concatenate((u,f))
+    
+    def advance_batch(self, t, vec, env=None):
+        u = vec[3:6]
+        
+        f = self.gravity_force(u, env)
         
         return concatenate((u,f))
         
@@ -145,39 +767,57 @@ class _SphericalParticleAirResistance(_Particle):
         self.volume = 4./3.*pi*self.radius**3
         
     
-    def air_resistance_force(self, U, Cd):
+    def air_resistance_force(self, U, Cd, env=None):
+        if env is None:
+            env = Environment()
         
-        f = -0.5*environment.rho*self.area*Cd*norm(U)*U/self.mass
-        #f = -0.5*environment.rho*self.area*Cd*Umag*U/self.mass
+        f = -0.5*env.rho*self.area*Cd*norm(U, axis=0)*U/self.mass
+        #f = -0.5*env.rho*self.area*Cd*Umag*U/self.mass
         
         return f
     
-    def advance(self, t, vec, *args):
+    def advance(self, t, vec, env=None):
         x = vec[0:3]
         u = vec[3:6]
         
-        Cd = self.drag_coefficient(norm(u))
+        Cd = self.drag_coefficient(norm(u), env=env)
+        
+        f = self.air_resistance_force(u, Cd, env) \
+          + self.gravity_force(env=env)
+        
+        return concatenate((u,f))
+    
+    def advance_batch(self, t, vec, env=None):
+        u = vec[3:6]
+        
+        # The coefficients take the speeds of all members at once
+        if env is None:
+            env = Environment()
+        Cd = self.drag_coefficient(norm(u, axis=0), env=env)
         
-        f = self.air_resistance_force(u, Cd) \
-          + self.gravity_force()
+        f = self.air_resistance_force(u, Cd, env) \
+          + self.gravity_force(u, env)
         
         return concatenate((u,f))
        
         
-    def reynolds_number(self, velocity):
+    def reynolds_number(self, velocity, env=None):
         """
         Reynolds number, non-dimensional number giving the 
         ratio of inertial forces to viscous forces. Used
         for calculating the drag coefficient.
         
         :param float velocity: Velocity seen by particle
+        :param Environment env: Air properties, defaults if None
         :return: Reynolds number
         :rtype: float
         
         """
-        return environment.rho*velocity*self.diameter/environment.mu
+        if env is None:
+            env = Environment()
+        return env.rho*velocity*self.diameter/env.mu
     
-    def drag_coefficient(self, velocity):
+    def drag_coefficient(self, velocity, env=None):
         """
         Drag coefficient for sphere, empirical curve fit
         taken from:
@@ -193,26 +833,30 @@ class _SphericalParticleAirResistance(_Particle):
             f = \\frac{B}{2}\\frac{R-r}{r\\sin\\phi}
 
 
-        :param float velocity: Velocity seen by particle
-        :return: Drag coefficient
+        :param float velocity: Velocity seen by particle, or an array
+        :param Environment env: Air properties, defaults if None
+        :return: Drag coefficient, of the shape of velocity
         :rtype: float
         """
     
-        Re = self.reynolds_number(velocity)
-        
-        if Re <= 0:
-            return 1e30
-        
+        Re = self.reynolds_number(velocity, env)
+        
+        # A particle at rest gets a huge drag coefficient, evaluate the
+        # fit at a harmless Reynolds number there. Powers go through the
+        # ufunc also for scalars, which may round differently from the
+        # scalar **, so that a single velocity and an array agree exactly.
+        moving = Re > 0
+        Re = _select(moving, Re, 1.0)
         tmp1 = Re/5.0
         tmp2 = Re/2.63e5
         tmp3 = Re/1e6
         
         Cd = 24.0/Re \
-           + 2.6*tmp1/(1 + tmp1**1.52) \
-           + 0.411*tmp2**-7.94/(1 + tmp2**-8) \
+           + 2.6*tmp1/(1 + power(tmp1, 1.52)) \
+           + 0.411*power(tmp2, -7.94)/(1 + power(tmp2, -8)) \
            + 0.25*tmp3/(1 + tmp3) 
            
-        return Cd
+        return _select(moving, Cd, 1e30)
     
 
 class _SphericalParticleAirResistanceSpin(_SphericalParticleAirResistance):
@@ -226,39 +870,65 @@ class _SphericalParticleAirResistanceSpin(_SphericalParticleAirResistance):
         return 0.9
         
     def shoot(self, **kwargs):
+        start = perf_counter()
         y0 = self.initialize_shot(**kwargs)
         spin = array((kwargs["spin"]))
+        env = _environment(kwargs)
         
-        shot = self._shoot(self.advance, y0, spin)
+        shot = self._shoot(self.advance, y0, spin, env, **self._shot_options(kwargs, start))
         
         return shot        
     
-    def spin_force(self,U,spin):
+    def shoot_batch(self, **kwargs):
+        start = perf_counter()
+        y0 = self.initialize_shot_batch(**kwargs)
+        spin = asarray(kwargs["spin"], dtype=float)
+        if spin.ndim == 1:
+            spin = spin[:,None].repeat(y0.shape[1], axis=1)
+        else:
+            spin = spin.T
+        env = _batch_environment(kwargs, y0.shape[1])
         
-        Umag = norm(U)
-        omega = norm(spin)
+        shots = self._shoot_batch(self.advance_batch, y0, spin, env, **self._shot_options(kwargs, start))
         
-        Cl = self.lift_coefficient(Umag, omega)
+        return shots
+    
+    def spin_force(self,U,spin,env=None):
+        if env is None:
+            env = Environment()
         
-        if U.ndim == 1:
-            f = Cl*pi*self.radius**3*environment.rho*cross(spin, U)/self.mass
-        else:
-            # Messy way to return spin array for post-processing
-            f = zeros_like(U)
-            for i in range(U.shape[1]):
-                f[:,i] = Cl*pi*self.radius**3*environment.rho*cross(spin, U[:,i])/self.mass
+        Umag = norm(U, axis=0)
+        omega = norm(spin, axis=0)
         
-        return f
+        Cl = self.lift_coefficient(Umag, omega)
+        
+        # Either may be a single vector or one vector per column, 
+        # as in batched shots and post-processing
+        return Cl*pi*self.radius**3*env.rho*cross(spin, U, axis=0)/self.mass
     
-    def advance(self, t, vec, spin):
+    def advance(self, t, vec, spin, env=None):
         x = vec[0:3]
         u = vec[3:6]
         
-        Cd = self.drag_coefficient(norm(u), norm(spin))
+        Cd = self.drag_coefficient(norm(u), norm(spin), env=env)
         
-        f = self.air_resistance_force(u, Cd) \
-          + self.gravity_force() \
-          + self.spin_force(u,spin)
+        f = self.air_resistance_force(u, Cd, env) \
+          + self.gravity_force(env=env) \
+          + self.spin_force(u,spin,env)
+        
+        return concatenate((u,f))
+    
+    def advance_batch(self, t, vec, spin, env=None):
+        u = vec[3:6]
+        
+        # The coefficients take the speeds of all members at once
+        if env is None:
+            env = Environment()
+        Cd = self.drag_coefficient(norm(u, axis=0), norm(spin, axis=0), env=env)
+        
+        f = self.air_resistance_force(u, Cd, env) \
+          + self.gravity_force(u, env) \
+          + self.spin_force(u,spin,env)
         
         return concatenate((u,f))
 
@@ -278,6 +948,21 @@ class ShotPutBall(_SphericalParticleAirResistance):
             diameter = 0.095
             
         super().__init__(mass, diameter)
+
+    def optimal_angle(self, speed, tol=0.01, **launch):
+        """
+        Release angle giving the longest put for a release speed, with
+        air resistance, and the release height given by the position,
+        see shotshaper.targeting.longest.
+
+        :param float speed: Release speed (m/s)
+        :param float tol: Resolution of the angle (degrees)
+        :return: The launch, with the angle as pitch, and where it lands
+        :rtype: Longest
+        """
+        from . import targeting
+        return targeting.longest(self, 'pitch', dict(launch, speed=speed),
+                                 (0.0, 60.0), tol)
         
         
 class SoccerBall(_SphericalParticleAirResistanceSpin):
@@ -289,7 +974,7 @@ class SoccerBall(_SphericalParticleAirResistanceSpin):
                     
         super(SoccerBall, self).__init__(mass, diameter)
     
-    def drag_coefficient(self, velocity, omega):
+    def drag_coefficient(self, velocity, omega, env=None):
         # Texture, sewing pattern and spin will alter
         # the drag coefficient.
         # Here, use correlation from
@@ -302,13 +987,11 @@ class SoccerBall(_SphericalParticleAirResistanceSpin):
         vc = 12.19
         vs = 1.309
         
-        S = omega*self.radius/velocity;
-        if S > 0.05 and velocity > vc:
-            Cd = 0.4127*S**0.3056;
-        else:
-            Cd = 0.155 + 0.346 / (1 + exp((velocity - vc)/vs))
+        S = omega*self.radius/velocity
+        spinning = (S > 0.05) & (velocity > vc)
         
-        return Cd
+        return _select(spinning, 0.4127*power(S, 0.3056),
+                       0.155 + 0.346 / (1 + exp((velocity - vc)/vs)))
     
     def lift_coefficient(self, Umag, omega):
         # TODO - complex dependency on Re and spin, skin texture etc
@@ -327,35 +1010,164 @@ class TableTennisBall(SoccerBall):
         
         
 class DiscGolfDisc(_Projectile):
-    def __init__(self, name, mass=0.175):
+    """
+    Disc golf disc, with aerodynamic coefficients read from the 
+    disc definition in the discs directory. Definitions are read once
+    per process and shared between discs, unless the file changes. 
+    The first time a definition is read, it is compiled along with the
+    default lookup table, so that other processes load it at once, see
+    shotshaper.compiled. Use with_mass for the same disc with another 
+    mass.
+
+    The coefficients are looked up in a uniform table covering -180 to
+    180 degrees, resampled from the linear interpolation of the data.
+    Starting from table_step, the step is halved until the table 
+    reproduces the linear interpolation within table_tol.
+
+    :param string name: Name of the disc definition
+    :param float mass: Mass of the disc (kg)
+    :param float table_step: Largest step of the lookup table (degrees)
+    :param float table_tol: Allowed deviation from linear interpolation,
+                            None to use table_step as given
+    """
+    def __init__(self, name, mass=0.175, table_step=TABLE_STEP, table_tol=TABLE_TOL):
         this_dir = os.path.dirname(os.path.abspath(__file__))
         path = os.path.join(this_dir, 'discs', name + '.yaml')
     
         self.name = name
         
-        with open(path, 'r') as f:
-            data = yaml.load(f, Loader=yaml.FullLoader)
-            
-            self.diameter = data['diameter']
-            self.mass = mass
-            self.weight = environment.g*mass
-            self.area = pi*self.diameter**2/4.0
-            self.I_xy = mass*data['J_xy']
-            self.I_z = mass*data['J_z']
+        # The modification time makes an edited definition be read again
+        self._definition = _read_definition(name, path, os.stat(path).st_mtime_ns)
+        
+        self.diameter = self._definition.diameter
+        self.area = pi*self.diameter**2/4.0
+        self._set_mass(mass)
+        
+        self._alpha = self._definition.alpha
+        self._Cl = self._definition.Cl
+        self._Cd = self._definition.Cd
+        self._Cm = self._definition.Cm
+        
+        # Tables are shared like the definition. The default table is
+        # compiled with the definition, unless it was loaded from there
+        key = (table_step, table_tol)
+        tables = self._definition.tables
+        if key not in tables:
+            self._build_table(table_step, table_tol)
+            self._table.flags.writeable = False
+            tables[key] = (self._table_step, self._table, self.table_error)
+            if key == (TABLE_STEP, TABLE_TOL):
+                _compile_definition(name, self._definition)
+        self._table_step, self._table, self.table_error = tables[key]
+    
+    def _interpolant(self, name):
+        functions = self._definition.interpolants
+        if name not in functions:
+            from scipy.interpolate import interp1d
+            functions[name] = interp1d(self._alpha, getattr(self._definition, name), 
+                                       kind='linear')
+        return functions[name]
+    
+    @property
+    def Cl_func(self):
+        """
+        Linear interpolation of the lift coefficient, angle in degrees.
+        """
+        return self._interpolant('Cl')
+    
+    @property
+    def Cd_func(self):
+        """
+        Linear interpolation of the drag coefficient, angle in degrees.
+        """
+        return self._interpolant('Cd')
+    
+    @property
+    def Cm_func(self):
+        """
+        Linear interpolation of the moment coefficient, angle in degrees.
+        """
+        return self._interpolant('Cm')
+    
+    @staticmethod
+    def clear_cache():
+        """
+        Forget all disc definitions read so far in this process.
+        """
+        _read_definition.cache_clear()
+        
+    def _set_mass(self, mass):
+        self.mass = mass
+        self.weight = environment.g*mass
+        self.I_xy = mass*self._definition.J_xy
+        self.I_z = mass*self._definition.J_z
+        
+    def _cache_key(self):
+        # The content of the definition, rather than its name
+        return super()._cache_key() + (self._definition.digest,)
+        
+    def with_mass(self, mass):
+        """
+        Copy of the disc with another mass, where the weight and moments
+        of inertia follow the mass. Coefficients and lookup tables are
+        shared with this disc, so nothing is read or rebuilt.
+
+        :param float mass: Mass of the disc (kg)
+        :return: Disc with the given mass
+        :rtype: DiscGolfDisc
+        """
+        disc = copy(self)
+        disc._set_mass(mass)
+        return disc
+        
+    def _build_table(self, step, tol):
+        """
+        Resample the coefficients to a uniform table, refining the step
+        until the deviation at the data points is within the tolerance.
+        """
+        # Only the data points can deviate, the table is exact at its nodes.
+        # The lookup wraps 180 degrees to -180 degrees, so leave it out.
+        inside = (self._alpha >= -180) & (self._alpha < 180)
+        a = self._alpha[inside]
+        exact = array([self._Cl[inside], self._Cd[inside], self._Cm[inside]])
+        
+        n = int(ceil(360.0/step))
+        while True:
+            self._table_step = 360.0/n
+            grid = linspace(-180, 180, n + 1)
+            table = array([interp(grid, self._alpha, c) 
+                           for c in (self._Cl, self._Cd, self._Cm)])
+            # One extra node beyond 180 degrees guards the upper index
+            self._table = concatenate((table, table[:,1:2]), axis=1)
             
-            a = array(data['alpha'])
-            cl = array(data['Cl'])
-            cd = array(data['Cd'])
-            cm = array(data['Cm'])
+            c = array(self.coefficients(radians(a)))
+            self.table_error = abs(c - exact).max()
             
+            if tol is None or self.table_error <= tol or self._table_step < 1e-3:
+                break
+            n *= 2
+    
+    def coefficients(self, alpha):
+        """
+        Provide lift, drag and moment coefficients for a given angle of
+        attack, using the precomputed table.
+
+        :param float alpha: Angle in radians, scalar or array
+        :return: Lift, drag and moment coefficients
+        :rtype: tuple
+        """
+        # NB! The stored data uses degrees for the angle
+        x = ((degrees(alpha) + 180.0) % 360.0)/self._table_step
+        i = asarray(x).astype(int)
+        w = x - i
+        
+        c = self._table[:,i]
+        c = c + w*(self._table[:,i+1] - c)
         
-        self._alpha,self._Cl,self._Cd,self._Cm = self._flip(a,cl,cd,cm)
-        kind = 'linear'
-        self.Cl_func = interp1d(self._alpha, self._Cl, kind=kind)
-        self.Cd_func = interp1d(self._alpha, self._Cd, kind=kind)
-        self.Cm_func = interp1d(self._alpha, self._Cm, kind=kind)
+        return c[0], c[1], c[2]
         
-    def _flip(self,a,cl,cd,cm):
+    @staticmethod
+    def _flip(a,cl,cd,cm):
         """
         Data given from -90 deg to 90 deg.
         Expand to -180 to 180 using symmetry considerations.
@@ -406,8 +1218,7 @@ class DiscGolfDisc(_Projectile):
         :rtype: float
         """
         
-        # NB! The stored data uses degrees for the angle
-        return self.Cd_func(degrees(self._normalize_angle(alpha)))
+        return self.coefficients(alpha)[1]
 
     def Cl(self, alpha): 
         """
@@ -418,8 +1229,7 @@ class DiscGolfDisc(_Projectile):
         :rtype: float
         """
         
-        # NB! The stored data uses degrees for the angle
-        return self.Cl_func(degrees(self._normalize_angle(alpha)))
+        return self.coefficients(alpha)[0]
 
     def Cm(self, alpha): 
         """
@@ -430,8 +1240,7 @@ class DiscGolfDisc(_Projectile):
         :rtype: float
         """
     
-        # NB! The stored data uses degrees for the angle
-        return self.Cm_func(degrees(self._normalize_angle(alpha)))
+        return self.coefficients(alpha)[2]
 
 
     def plot_coeffs(self, color='k'):
@@ -440,6 +1249,8 @@ class DiscGolfDisc(_Projectile):
 
         :param string color: Matplotlib color key. Default value is k, i.e. black.
         """
+        import matplotlib.pyplot as pl
+        
         pl.plot(self._alpha, self._Cl, 'C0-o',label='$C_L$')
         pl.plot(self._alpha, self._Cd, 'C1-o',label='$C_D$')
         pl.plot(self._alpha, 3*self._Cm, 'C2-o',label='$C_M$')
@@ -518,72 +1329,220 @@ class DiscGolfDisc(_Projectile):
             
     def shoot(self, **kwargs):
 
+        start = perf_counter()
         y0, omega = self.initialize_shot(**kwargs)
+        env = _environment(kwargs)
                
-        shot = self._shoot(self.advance, y0, omega)
+        shot = self._shoot(self.advance, y0, omega, env, **self._shot_options(kwargs, start))
         
         return shot
     
-    def post_process(self, s, omega):
-        n = len(s.time)
-        alphas = zeros(n)
-        betas = zeros(n)
-        lifts = zeros(n)
-        drags = zeros(n)
-        moms = zeros(n)
-        rolls = zeros(n)
-        for i in range(n):
-            x = s.position[:,i]
-            u = s.velocity[:,i]
-            a = s.attitude[:,i]
-            
-            alpha, beta, Fd, Fl, M, g4 = self.forces(x, u, a, omega)
-            
-            alphas[i] = alpha
-            betas[i] = beta
-            lifts[i] = Fl
-            drags[i] = Fd
-            moms[i] = M
-            rolls[i] = -M/(omega*(self.I_xy - self.I_z))
+    def initialize_shot_batch(self, **kwargs):
+        kwargs.setdefault('yaw', 0.0) 
+        
+        U, pitch, yaw, omega, roll_angle, nose_angle = _batch_arrays(
+            kwargs, kwargs["speed"], radians(kwargs["pitch"]), radians(kwargs["yaw"]),
+            kwargs["omega"], radians(kwargs["roll_angle"]), 
+            radians(kwargs["nose_angle"]))
+        n = len(U)
+        
+        x,y,z = _batch_position(kwargs, n)
+        
+        xy = cos(pitch)
+        u = U*xy*cos(yaw)
+        v = U*xy*sin(-yaw)
+        w = U*sin(pitch)
+        
+        # Account for the launch angle in the initial orientation,
+        # as for a single shot
+        attitude = array([roll_angle, nose_angle, zeros(n)])
+        launch = array([zeros(n), pitch, zeros(n)])
+        attitude += einsum('ijn,jn->in', T_12(attitude), launch)
+        
+        phi, theta, psi = attitude
+        y0 = array((x,y,z,u,v,w,phi,theta,psi))
+        return y0, omega.copy()
+    
+    def shoot_batch(self, **kwargs):
+        """
+        Shoot several discs at once, integrating all members in a
+        single vectorized ensemble. Launch parameters are given as for
+        shoot, either as scalars or as arrays with one value per member.
+        The position may be a single (3,) position or an (n, 3) array,
+        and env a single Environment or a sequence of one per member.
+        With output='summary', a ShotSummary is returned per member.
+
+        :return: One shot per member
+        :rtype: list
+        """
+        start = perf_counter()
+        y0, omega = self.initialize_shot_batch(**kwargs)
+        env = _batch_environment(kwargs, len(omega))
+        
+        shots = self._shoot_batch(self.advance, y0, omega, env, **self._shot_options(kwargs, start))
+
+        return shots
+
+    def predict(self, speed, pitch, roll_angle, nose_angle=0.0, omega=None,
+                position=None, table=None):
+        """
+        Outcome of throws interpolated from a surrogate flight table, in
+        microseconds rather than the milliseconds of a shot, see
+        shotshaper.surrogate. The table covers still air and a fixed
+        release height, and its interpolation error against direct
+        shots is reported as the error of the prediction. Launch
+        parameters are scalars or arrays of the same shape.
+
+        :param float speed: Launch speed (m/s)
+        :param float pitch: Launch angle (degrees)
+        :param float roll_angle: Roll angle (degrees)
+        :param float nose_angle: Nose angle (degrees)
+        :param float omega: Spin rate (rad/s), by default empirical_spin
+        :param array position: Release position, at the height of the table
+        :param table: Table or path of a table without suffix, by
+                      default the table of this disc, see
+                      shotshaper.surrogate.default_path
+        :raises ValueError: If a throw is outside the table, or the table
+                            was built from another disc definition
+        :raises FileNotFoundError: If the table has not been built, see
+                                   shotshaper.surrogate
+        :return: Landing point, apex, flight time and coarse path
+        :rtype: Prediction
+        """
+        from . import surrogate
+
+        if table is None:
+            table = surrogate.default_path(self.name)
+        if isinstance(table, str):
+            table = surrogate.load(table)
+        if table.digest != self._definition.digest:
+            raise ValueError("the surrogate table of %s was built from another "
+                             "definition of the disc" % table.name)
+
+        spin_factor = 1.0 if omega is None else omega/self.empirical_spin(speed)
+        return table(self.mass, speed, pitch, roll_angle, nose_angle,
+                     spin_factor, position)
+
+    def aim(self, target, free=('pitch', 'roll_angle'), bounds=None, tol=0.5,
+            table=None, **launch):
+        """
+        Launch that lands at a target, searching over the free launch
+        parameters with the others fixed, see shotshaper.targeting.aim.
+        For example, the pitch and roll for a 90 m hole with a finish
+        5 m to the left: aim((90, 5), speed=26, omega=135, nose_angle=0,
+        position=(0, 0, 1.5)).
+
+        With a surrogate table, see predict, the coarse grid of the search
+        is evaluated in the table instead of being shot, as long as the
+        launch is one the table covers. The free parameters are then
+        searched within the table unless bounds are given.
+
+        :param array target: Target, (x, y) on the ground (m)
+        :param tuple free: Names of the free launch parameters
+        :param dict bounds: Range of each free parameter, (lower, upper)
+        :param float tol: Allowed distance from the target (m)
+        :param table: Surrogate table or path of one, None for no table
+        :return: The launch and where it lands
+        :rtype: Aim
+        """
+        from . import surrogate, targeting
+
+        warm = None
+        if table is not None:
+            if isinstance(table, str):
+                table = surrogate.load(table)
+            predicted = ('speed', 'pitch', 'roll_angle', 'nose_angle', 'omega',
+                         'position')
+            if set(launch) | set(free) <= set(predicted) | {'solver'}:
+                # Search within the table, unless told otherwise
+                bounds = dict({a: (table.grid[a][0], table.grid[a][-1]) 
+                               for a in free if a in table.grid}, 
+                              **(bounds or {}))
+                
+                def warm(params):
+                    p = dict(launch, **params)
+                    p.pop('solver', None)
+                    try:
+                        return self.predict(table=table, **p).landing[:2]
+                    except ValueError:
+                        # Outside the table, the grid is shot instead
+                        return None
+
+        return targeting.aim(self, target, free, launch, bounds, tol, warm=warm)
+
+    def post_process(self, s, omega, env=None):
+        """
+        Evaluate angles, forces and roll rate along a disc trajectory,
+        for all samples of the shot at once.
+
+        :param Shot s: Shot from this disc
+        :param float omega: Spin rate used for the shot (rad/s)
+        :param Environment env: Environment of the shot, defaults if None
+        :return: Arc length, angle of attack (deg), side slip angle (deg),
+                 lift, drag, moment and roll rate (deg/s), which may also
+                 be unpacked as a tuple in this order
+        :rtype: FlightData
+        """
+        alpha, beta, Fd, Fl, M, g4 = self.forces(s.position, s.velocity, s.attitude, omega, env, s.time)
+        rolls = -M/(omega*(self.I_xy - self.I_z))
         
         arc_length = norm(s.position, axis=0)
-        return arc_length,degrees(alphas),degrees(betas),lifts,drags,moms,degrees(rolls)
+        return FlightData(arc_length,degrees(alpha),degrees(beta),Fl,Fd,M,degrees(rolls))
             
-    def forces(self, x, u, a, omega):
+    def forces(self, x, u, a, omega, env=None, t=None):
+        """
+        Angle of attack, side slip angle, aerodynamic forces and moment,
+        and gravity in wind axes. Accepts a single state or states stored
+        column-wise, in the default environment unless env is given. 
+        The time is only needed for wind fields varying in time.
+        """
+        if env is None:
+            env = Environment()
+        alpha, beta, Fd, Fl, M, g4, T13, T14 = self._forces(x, u, a, env, t)
+        
+        return alpha, beta, Fd, Fl, M, g4
+    
+    def _forces(self, x, u, a, env, t=None):
         # Velocity in body axes
-        urel = u - environment.wind_abl(x[2])
-        u2 = matmul(T_12(a), urel)
+        urel = u - env.wind_velocity(x, t)
+        T12 = T_12(a)
+        u2 = apply(T12, urel)
         # Side slip angle is the angle between the x and y velocity
         beta = -arctan2(u2[1], u2[0])
         # Velocity in zero side slip axes
-        u3 = matmul(T_23(beta), u2)
+        T13 = rotate_z(T12, beta)
+        u3 = apply(T13, urel)
         # Angle of attack is the angle between 
         # vertical and horizontal velocity
         alpha = -arctan2(u3[2], u3[0])
         # Velocity in wind system, where forces are to be calculated
-        u4 = matmul(T_34(alpha), u3)
+        T14 = rotate_y(T13, alpha)
+        u4 = apply(T14, urel)
         
-        # Convert gravitational force from Earth to Wind axes
-        g = array((0, 0, self.mass*environment.g))
-        g4 = T_14(g, a, beta, alpha)
+        # Convert gravitational force from Earth to Wind axes,
+        # gravity acts along the Earth z-axis
+        g4 = self.mass*env.g*T14[:,2]
         
         # Aerodynamic forces
-        q = 0.5*environment.rho*u4[0]**2
+        q = 0.5*env.rho*u4[0]**2
         S = self.area
         D = self.diameter
         
-        Fd = q*S*self.Cd(alpha)
-        Fl = q*S*self.Cl(alpha)
-        M  = q*S*D*self.Cm(alpha)
+        Cl, Cd, Cm = self.coefficients(alpha)
+        Fd = q*S*Cd
+        Fl = q*S*Cl
+        M  = q*S*D*Cm
         
-        return alpha, beta, Fd, Fl, M, g4
+        return alpha, beta, Fd, Fl, M, g4, T13, T14
         
-    def advance(self, t, vec, omega):
+    def advance(self, t, vec, omega, env=None):
         x = vec[0:3]
         u = vec[3:6]
         a = vec[6:9]
         
-        alpha, beta, Fd, Fl, M, g4 = self.forces(x, u, a, omega)
+        if env is None:
+            env = Environment()
+        alpha, beta, Fd, Fl, M, g4, T13, T14 = self._forces(x, u, a, env, t)
         
         m = self.mass
         # Calculate accelerations
@@ -593,11 +1552,11 @@ class DiscGolfDisc(_Projectile):
         acc4 = array((dudt,dvdt,dwdt))
         # Roll rate acts around x-axis (in axes 3: zero side slip axes)
         dphidt = -M/(omega*(self.I_xy - self.I_z))
-        # Other angular rotations are ignored, assume zero wobble
-        angvel3 = array((dphidt, 0, 0))
+        # Other angular rotations are ignored, assume zero wobble, 
+        # so only the first row of T_13 contributes
+        angvel1 = dphidt*T13[0]
         
-        acc1 = T_41(acc4, a, beta, alpha)
-        angvel1 = T_31(angvel3, a, beta)
+        acc1 = apply_inverse(T14, acc4)
         
         return concatenate((u,acc1,angvel1)) 
 
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Parameter sweeps over many shots, spread over a pool of worker processes.
+
+The projectile is created once per worker by calling a factory, so disc
+definitions are only read once per process. Each chunk of launch
+parameters is simulated with shoot_batch where possible, and the results
+are collected into preallocated arrays::
+
+    from functools import partial
+    from shotshaper.projectile import DiscGolfDisc
+    from shotshaper import sweep
+
+    grid = dict(speed=np.linspace(18, 30, 13),
+                pitch=np.linspace(0, 20, 11),
+                roll_angle=np.linspace(-30, 30, 13),
+                nose_angle=[0.0],
+                omega=[100.0, 120.0])
+    res = sweep.run(partial(DiscGolfDisc, 'dd2'), grid,
+                    fixed=dict(position=(0, 0, 1.5), solver='interactive'))
+    distance = res.landing[:,0].reshape(res.shape)
+
+The solver diagnostics of each shot are kept as well, so that slow
+regions of the parameter space show up in e.g.
+res.nfev.reshape(res.shape), and res.totals() sums them over the sweep.
+"""
+
+import os
+from collections import deque
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+import numpy as np
+
+from .projectile import N_STEP, ENDINGS
+from .cache import ShotCache
+
+# State of a worker process, set up once by _initialize
+_projectile = None
+_grid = None
+_fixed = None
+_cache = None
+
+
+class SweepResult:
+    """
+    Results of a sweep, one row per set of launch parameters. For a grid
+    the rows follow the C order of the grid, see shape.
+
+    :param tuple shape: Shape of the grid, or (n,) for a list of launches
+    :param array landing: Landing position, shape (n, 3)
+    :param array apex: Position at the highest point, shape (n, 3)
+    :param array flight_time: Time of flight, shape (n,)
+    :param array trajectory: Sampled positions, shape (n, 3, N_STEP), or None
+    :param array nfev: Right hand side evaluations, shape (n,)
+    :param array naccept: Accepted steps, shape (n,)
+    :param array nreject: Rejected steps, shape (n,)
+    :param array ending: What ended each flight, an index into ENDINGS
+    :param array time: Integration time of each shot, the time of its
+                       batch divided by the batch size (s)
+
+    The diagnostics are -1, and the time 0, for shots taken from a
+    cache, and nreject is -1 where the method does not tell.
+    """
+    def __init__(self, shape, trajectories=False):
+        n = int(np.prod(shape))
+        self.shape = tuple(shape)
+        self.landing = np.empty((n, 3))
+        self.apex = np.empty((n, 3))
+        self.flight_time = np.empty(n)
+        self.trajectory = np.empty((n, 3, N_STEP)) if trajectories else None
+        self.nfev = np.empty(n, dtype=int)
+        self.naccept = np.empty(n, dtype=int)
+        self.nreject = np.empty(n, dtype=int)
+        self.ending = np.empty(n, dtype=int)
+        self.time = np.empty(n)
+
+    def _store(self, start, stop, landing, apex, flight_time, trajectory, stats):
+        self.landing[start:stop] = landing
+        self.apex[start:stop] = apex
+        self.flight_time[start:stop] = flight_time
+        if self.trajectory is not None:
+            self.trajectory[start:stop] = trajectory
+        for name, value in stats.items():
+            getattr(self, name)[start:stop] = value
+
+    def totals(self):
+        """
+        Solver diagnostics summed over the sweep, leaving out shots
+        without them.
+
+        :return: Number of shots with diagnostics, evaluations, accepted
+                 and rejected steps, integration time (s) and the number
+                 of flights per ending
+        :rtype: dict
+        """
+        known = self.nfev >= 0
+        return dict(shots=int(known.sum()), nfev=int(self.nfev[known].sum()),
+                    naccept=int(self.naccept[known].sum()),
+                    nreject=int(self.nreject[self.nreject >= 0].sum()),
+                    time=float(self.time.sum()),
+                    endings={name: int((self.ending == i).sum())
+                             for i, name in enumerate(ENDINGS)})
+
+
+def _initialize(factory, grid, fixed, cache=None):
+    global _projectile, _grid, _fixed, _cache
+    _projectile = factory()
+    _grid = grid
+    _fixed = fixed
+    _cache = None if cache is None else ShotCache(directory=cache)
+
+
+def _grid_kwargs(start, stop):
+    names = list(_grid)
+    shape = [len(_grid[name]) for name in names]
+    idx = np.unravel_index(np.arange(start, stop), shape)
+    kwargs = {name: np.asarray(_grid[name])[i] for name, i in zip(names, idx)}
+    kwargs.update(_fixed)
+    return kwargs
+
+
+def _stack_kwargs(launches):
+    """
+    Turn a list of launch kwargs into one kwargs dict of arrays, or None
+    if the launches do not share the same keys.
+    """
+    keys = set(launches[0])
+    if any(set(kw) != keys for kw in launches):
+        return None
+    kwargs = {key: np.array([kw[key] for kw in launches]) for key in keys}
+    for key, value in _fixed.items():
+        kwargs.setdefault(key, value)
+    return kwargs
+
+
+def _shots(kwargs, launches, output):
+    if _cache is not None:
+        if kwargs is not None:
+            return _cache.shoot_batch(_projectile, output=output, **kwargs)
+        return [_cache.shoot(_projectile, output=output, **dict(_fixed, **kw))
+                for kw in launches]
+    
+    if kwargs is not None:
+        return _projectile.shoot_batch(output=output, **kwargs)
+    # Launches with differing parameters are shot one by one
+    return [_projectile.shoot(output=output, **dict(_fixed, **kw))
+            for kw in launches]
+
+
+def _simulate(start, stop, launches, trajectories):
+    """
+    Simulate one chunk in a worker and reduce each shot to a summary.
+    """
+    # Without trajectories, summaries avoid the dense output altogether
+    output = 'trajectory' if trajectories else 'summary'
+    if launches is None:
+        shots = _shots(_grid_kwargs(start, stop), None, output)
+    else:
+        shots = _shots(_stack_kwargs(launches), launches, output)
+
+    n = len(shots)
+    landing = np.empty((n, 3))
+    apex = np.empty((n, 3))
+    flight_time = np.empty(n)
+    trajectory = np.empty((n, 3, N_STEP)) if trajectories else None
+    for i, s in enumerate(shots):
+        if trajectories:
+            landing[i] = s.position[:,-1]
+            apex[i] = s.position[:,np.argmax(s.position[2])]
+            flight_time[i] = s.time[-1]
+            trajectory[i] = s.position
+        else:
+            landing[i] = s.landing
+            apex[i] = s.apex
+            flight_time[i] = s.flight_time
+
+    return start, stop, landing, apex, flight_time, trajectory, _stats(shots)
+
+
+def _stats(shots):
+    """
+    Solver diagnostics of a chunk of shots, as arrays for SweepResult.
+    """
+    n = len(shots)
+    stats = dict(nfev=np.full(n, -1), naccept=np.full(n, -1),
+                 nreject=np.full(n, -1), ending=np.full(n, -1),
+                 time=np.zeros(n))
+    for i, s in enumerate(shots):
+        st = s.stats
+        if st is None:
+            continue
+        stats['nfev'][i] = st.nfev
+        stats['naccept'][i] = st.naccept
+        if st.nreject is not None:
+            stats['nreject'][i] = st.nreject
+        stats['ending'][i] = ENDINGS.index(st.ending)
+        stats['time'][i] = st.integration_time/st.batch
+    return stats
+
+
+def _chunks(params, chunksize):
+    """
+    Split the launches into chunks, returning the overall shape and an
+    iterator over (start, stop, launches). Grids are split by index only,
+    the launch parameters are then generated in the workers. Iterables
+    other than sequences are consumed chunk by chunk, so they may be
+    generators of any length, with the shape (None,).
+    """
+    if isinstance(params, Mapping):
+        shape = tuple(len(v) for v in params.values())
+        n = int(np.prod(shape))
+        specs = ((i, min(i + chunksize, n), None)
+                 for i in range(0, n, chunksize))
+        return shape, specs
+
+    if not isinstance(params, Sequence):
+        def specs(launches=iter(params)):
+            start = 0
+            while True:
+                chunk = list(islice(launches, chunksize))
+                if not chunk:
+                    return
+                yield start, start + len(chunk), chunk
+                start += len(chunk)
+        return (None,), specs()
+
+    n = len(params)
+    specs = ((i, min(i + chunksize, n), params[i:i + chunksize])
+             for i in range(0, n, chunksize))
+    return (n,), specs
+
+
+def stream(factory, params, fixed=None, workers=None, chunksize=256,
+           trajectories=False, ordered=True, cache=None):
+    """
+    Simulate launches in parallel and yield the results chunk by chunk.
+
+    :param callable factory: Picklable callable returning a projectile,
+                             e.g. functools.partial(DiscGolfDisc, 'dd2')
+    :param params: Either a mapping from launch parameter name to the
+                   values to sweep, combined into a full grid, or an
+                   iterable of kwargs for shoot. A generator is consumed
+                   as the chunks are submitted.
+    :param dict fixed: Launch parameters common to all shots
+    :param int workers: Number of worker processes, default is the number
+                        of CPUs. With 1, everything runs in this process.
+    :param int chunksize: Number of shots per task
+    :param bool trajectories: Also return the sampled positions
+    :param bool ordered: Yield chunks in order rather than as completed
+    :param string cache: Directory of a ShotCache disk store shared by
+                         the workers, so that repeated sweeps only
+                         simulate new launches
+    :return: Tuples (start, stop, landing, apex, flight_time, trajectory,
+             stats) covering the rows start:stop, where stats holds the
+             solver diagnostics as in SweepResult
+    :rtype: generator
+    """
+    fixed = dict(fixed or {})
+    grid = dict(params) if isinstance(params, Mapping) else None
+    shape, specs = _chunks(params, chunksize)
+    workers = workers or os.cpu_count()
+
+    if workers == 1:
+        _initialize(factory, grid, fixed, cache)
+        for start, stop, launches in specs:
+            yield _simulate(start, stop, launches, trajectories)
+        return
+
+    # Keep a bounded number of tasks in flight, so that large sweeps
+    # neither hold all launch parameters nor all results at once
+    window = 2*workers
+    with ProcessPoolExecutor(workers, initializer=_initialize,
+                             initargs=(factory, grid, fixed, cache)) as executor:
+        def submit(spec):
+            return executor.submit(_simulate, *spec, trajectories)
+
+        if ordered:
+            pending = deque(submit(spec) for spec in islice(specs, window))
+            while pending:
+                result = pending.popleft().result()
+                for spec in islice(specs, 1):
+                    pending.append(submit(spec))
+                yield result
+        else:
+            pending = {submit(spec) for spec in islice(specs, window)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for spec in islice(specs, len(done)):
+                    pending.add(submit(spec))
+                for future in done:
+                    yield future.result()
+
+
+def run(factory, params, fixed=None, workers=None, chunksize=256,
+        trajectories=False, cache=None):
+    """
+    Simulate launches in parallel and collect the results. Arguments are
+    as for stream.
+
+    :return: Landing points, apex, flight times, solver diagnostics and
+             optionally trajectories
+    :rtype: SweepResult
+    """
+    if not isinstance(params, Mapping):
+        params = list(params)
+    shape = _chunks(params, chunksize)[0]
+
+    res = SweepResult(shape, trajectories)
+    for chunk in stream(factory, params, fixed, workers, chunksize,
+                        trajectories, ordered=False, cache=cache):
+        res._store(*chunk)
+
+    return res
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Inverse problems on shots: the launch that lands at a target, and the
+launch angle that gives the longest shot. Candidates are shot together
+with shoot_batch, starting from a coarse grid of candidates, or from a
+surrogate table where one is available, see DiscGolfDisc.aim.
+"""
+
+from collections import namedtuple
+import numpy as np
+
+from .projectile import SOLVER_OPTIONS
+
+# Range searched for each launch parameter, unless given
+BOUNDS = dict(speed=(5.0, 35.0), pitch=(-10.0, 40.0), yaw=(-45.0, 45.0),
+              roll_angle=(-60.0, 60.0), nose_angle=(-15.0, 15.0),
+              omega=(0.0, 300.0))
+
+# Number of candidates of the coarse grid, in total over the free
+# parameters
+N_GRID = 64
+
+Aim = namedtuple('Aim', ['launch', 'landing', 'miss', 'converged', 'shots'])
+Aim.__doc__ = """
+Launch found for a target.
+
+:param dict launch: Launch parameters, for shoot
+:param array landing: Landing point of the launch
+:param float miss: Horizontal distance from the landing point to the target
+:param bool converged: True if the miss is within the tolerance
+:param int shots: Number of shots used by the search
+"""
+
+Longest = namedtuple('Longest', ['launch', 'landing', 'distance', 'shots'])
+Longest.__doc__ = """
+Launch giving the longest shot.
+
+:param dict launch: Launch parameters, for shoot
+:param array landing: Landing point of the launch
+:param float distance: Horizontal distance from launch to landing
+:param int shots: Number of shots used by the search
+"""
+
+
+def _bounds(free, bounds):
+    bounds = dict(BOUNDS, **(bounds or {}))
+    missing = [name for name in free if name not in bounds]
+    if missing:
+        raise ValueError("no bounds given for %s" % ", ".join(missing))
+    return np.array([bounds[name] for name in free], dtype=float).T
+
+
+class _Search:
+    """
+    Shoots candidate values of the free parameters in batches, keeping
+    the best candidate so far.
+    """
+    def __init__(self, projectile, target, free, launch):
+        self.projectile = projectile
+        self.target = np.asarray(target, dtype=float)[:2]
+        self.free = free
+        self.launch = launch
+        self.shots = 0
+        self.best = None
+
+    def __call__(self, X):
+        """
+        Landing points of the candidates X, shape (k, m), as (2, m).
+        """
+        params = dict(self.launch, **dict(zip(self.free, X)))
+        shots = self.projectile.shoot_batch(output='summary', **params)
+        self.shots += len(shots)
+
+        landing = np.array([s.landing for s in shots]).T
+        miss = np.linalg.norm(landing[:2] - self.target[:,None], axis=0)
+        i = np.argmin(miss)
+        if self.best is None or miss[i] < self.best[2]:
+            self.best = (X[:,i].copy(), landing[:,i], miss[i])
+        return landing[:2]
+
+
+def _stages(projectile, launch):
+    """
+    Launch parameters of each stage of a search. The search starts with
+    the interactive solver preset and is refined with the solver of the
+    projectile, by default the standard preset, unless solver settings
+    are given in the launch or set on the projectile, which are then
+    used throughout.
+    """
+    if projectile._solver or any(k in launch for k in SOLVER_OPTIONS + ('solver',)):
+        return [launch]
+    return [dict(launch, solver='interactive'), launch]
+
+
+def _grid(lower, upper, n):
+    """
+    Candidates on a grid with n points along each axis, shape (k, n**k).
+    """
+    axes = [np.linspace(lo, hi, n) for lo, hi in zip(lower, upper)]
+    return np.array([a.ravel() for a in np.meshgrid(*axes, indexing='ij')])
+
+
+def _gauss_newton(search, lower, upper, tol, max_iter):
+    """
+    Damped Gauss-Newton steps from the best candidate of a search, see aim.
+    """
+    k = len(lower)
+    scale = upper - lower
+    h = 1e-3*scale
+    damping = 1e-3
+    stalled = 0
+    for it in range(max_iter):
+        x, landing, miss = search.best
+        if miss <= tol:
+            break
+
+        # Forward differences, stepping inwards at the upper bounds
+        step = np.where(x + h > upper, -h, h)
+        y = search(np.column_stack([x] + [x + step[j]*np.eye(k)[j]
+                                          for j in range(k)]))
+        if search.best[2] <= tol:
+            break
+        r = y[:,0] - search.target
+        J = (y[:,1:] - y[:,:1])/step
+
+        # Damped least squares step in scaled parameters, tried at a few
+        # lengths at once
+        Js = J*scale
+        A = Js.T @ Js
+        dx = -np.linalg.solve(A + damping*np.diag(np.diag(A) + 1e-12),
+                              Js.T @ r)*scale
+        before = search.best[2]
+        lengths = np.array((1.0, 0.5, 0.25, 0.125))
+        search(np.clip(x[:,None] + dx[:,None]*lengths, lower[:,None],
+                       upper[:,None]))
+        if search.best[2] < before - 0.01*tol:
+            damping = max(damping/10, 1e-9)
+        else:
+            # No progress, the target is out of reach or the search is
+            # stuck, so give up after a few tries with more damping
+            damping *= 10
+            stalled += 1
+            if stalled == 3:
+                break
+
+
+def aim(projectile, target, free, launch, bounds=None, tol=0.5,
+        max_iter=20, warm=None):
+    """
+    Find values of the free launch parameters that land at a target,
+    with the other launch parameters fixed.
+
+    The search starts from the best of a coarse grid of candidates,
+    shot as one batch, or evaluated with warm if given. It then takes
+    damped Gauss-Newton steps, with the Jacobian from forward
+    differences and a few step lengths along each step shot as one
+    batch each. It stops as soon as a shot lands within tol of the
+    target, or when a few steps in a row make no progress. For targets
+    out of reach, the closest landing point found is returned. The
+    search runs with the interactive solver preset, and the launch found
+    is then refined in the same way with the solver of the projectile,
+    unless other solver settings are given, see _stages.
+
+    :param projectile: Disc or ball to shoot
+    :param array target: Target, (x, y) on the ground (m)
+    :param tuple free: Names of the free launch parameters
+    :param dict launch: Fixed launch parameters, keyword arguments for
+                        shoot. Values of the free parameters are ignored.
+    :param dict bounds: Range of each free parameter, (lower, upper),
+                        defaults from BOUNDS
+    :param float tol: Allowed distance from the target (m)
+    :param int max_iter: Largest number of Gauss-Newton steps
+    :param callable warm: Approximate landing points for the coarse grid,
+                          taking a dict of free parameter arrays and
+                          returning (2, m) landing points, or None
+                          where it cannot. Otherwise the grid is shot.
+    :return: The launch and where it lands
+    :rtype: Aim
+    """
+    free = tuple(free)
+    lower, upper = _bounds(free, bounds)
+    shots = 0
+    x = None
+    for launch in _stages(projectile, {k: v for k, v in launch.items()
+                                       if k not in free}):
+        search = _Search(projectile, target, free, launch)
+        if x is None:
+            # Start from the best of the coarse grid. An approximation is
+            # checked with a shot, which then is the starting point
+            k = len(free)
+            X = _grid(lower, upper, max(3, int(round(N_GRID**(1.0/k)))))
+            landing = None if warm is None else warm(dict(zip(free, X)))
+            if landing is not None:
+                i = np.argmin(np.linalg.norm(landing - search.target[:,None], axis=0))
+                X = X[:,i:i+1]
+            search(X)
+        else:
+            # Continue from where the previous stage ended
+            search(x[:,None])
+        _gauss_newton(search, lower, upper, tol, max_iter)
+        shots += search.shots
+        x = search.best[0]
+
+    x, landing, miss = search.best
+    params = dict(launch, **dict(zip(free, x.tolist())))
+    return Aim(params, landing, float(miss), bool(miss <= tol), shots)
+
+
+def longest(projectile, name, launch, bounds=None, tol=0.01, n=17):
+    """
+    Value of one launch parameter that gives the longest shot, with the
+    other launch parameters fixed. The range is narrowed around the
+    longest of n candidates, shot as one batch, until it is within tol.
+    The distance is assumed to have a single maximum in the range.
+    The range is narrowed with the interactive solver preset, and then
+    once more with the solver of the projectile, unless other solver
+    settings are given, see _stages.
+
+    :param projectile: Disc or ball to shoot
+    :param string name: Name of the launch parameter, e.g. 'pitch'
+    :param dict launch: Fixed launch parameters, keyword arguments for shoot
+    :param tuple bounds: Range of the parameter, defaults from BOUNDS
+    :param float tol: Resolution of the parameter
+    :param int n: Number of candidates per batch
+    :return: The launch and where it lands
+    :rtype: Longest
+    """
+    lo, hi = BOUNDS[name] if bounds is None else bounds
+    shots = 0
+    for launch in _stages(projectile, {k: v for k, v in launch.items()
+                                       if k != name}):
+        # A later stage starts from the range left by the previous one
+        while True:
+            values = np.linspace(lo, hi, n)
+            res = projectile.shoot_batch(output='summary', **dict(launch, **{name: values}))
+            shots += n
+
+            distance = np.array([np.hypot(s.distance, s.drift) for s in res])
+            i = int(np.argmax(distance))
+            lo, hi = values[max(i - 1, 0)], values[min(i + 1, n - 1)]
+            if hi - lo <= tol:
+                break
+
+    return Longest(dict(launch, **{name: float(values[i])}),
+                   res[i].landing, float(distance[i]), shots)
@@ -15,13 +15,17 @@ from numpy import cos,sin,matmul
 
 def T_12(attitude):
     """
-    Transform from Earth axes to Body axes
+    Transform from Earth axes to Body axes.
+    Also accepts stacked angles of shape (3, N), returning (3, 3, N).
     """
     phi, theta, psi = attitude
+    cphi, sphi = cos(phi), sin(phi)
+    cth, sth = cos(theta), sin(theta)
+    cpsi, spsi = cos(psi), sin(psi)
                                                                     
-    return np.array([[cos(theta)*cos(psi), sin(phi)*sin(theta)*cos(psi) - cos(phi)*sin(psi), cos(phi)*sin(theta)*cos(psi) + sin(phi)*sin(psi)],
-                     [cos(theta)*sin(psi), sin(phi)*sin(theta)*sin(psi) + cos(phi)*cos(psi), cos(phi)*sin(theta)*sin(psi) - sin(phi)*cos(psi)],
-                     [-sin(theta),         sin(phi)*cos(theta),                              cos(phi)*cos(theta)                             ]])
+    return np.array([[cth*cpsi, sphi*sth*cpsi - cphi*spsi, cphi*sth*cpsi + sphi*spsi],
+                     [cth*spsi, sphi*sth*spsi + cphi*cpsi, cphi*sth*spsi - sphi*cpsi],
+                     [-sth,     sphi*cth,                  cphi*cth                 ]])
 
 def T_23(beta):
     """
@@ -65,4 +69,48 @@ def T_31(vec, attitude, beta):
     return matmul(T_21(attitude), matmul(T_32(beta), vec))
 
 
-                   
+# Fused transforms. The rotations around z and y are applied directly to
+# the rows of an existing transform, so that the combined transforms
+# from Earth axes can be built once per step from a single T_12 and
+# reused for any number of vectors. All functions accept either a single
+# transform (3, 3) and vector (3,), or stacks of shape (3, 3, N) and (3, N).
+# A single transform is multiplied by the rotation matrix instead, which
+# costs less than operating on its rows.
+
+def rotate_z(T, beta):
+    """
+    Premultiply a transform by T_23(beta), e.g. T_13 = rotate_z(T_12, beta)
+    """
+    if T.ndim == 2:
+        return matmul(T_23(beta), T)
+    c, s = cos(beta), sin(beta)
+    return np.array([c*T[0] - s*T[1],
+                     s*T[0] + c*T[1],
+                     T[2]])
+
+def rotate_y(T, alpha):
+    """
+    Premultiply a transform by T_34(alpha), e.g. T_14 = rotate_y(T_13, alpha)
+    """
+    if T.ndim == 2:
+        return matmul(T_34(alpha), T)
+    c, s = cos(alpha), sin(alpha)
+    return np.array([c*T[0] - s*T[2],
+                     T[1],
+                     s*T[0] + c*T[2]])
+
+def apply(T, vec):
+    """
+    Transform vectors, i.e. T @ vec
+    """
+    if T.ndim == 2:
+        return matmul(T, vec)
+    return np.einsum('ij...,j...->i...', T, vec)
+
+def apply_inverse(T, vec):
+    """
+    Transform vectors back, i.e. T^T @ vec
+    """
+    if T.ndim == 2:
+        return matmul(vec, T)
+    return np.einsum('ji...,j...->i...', T, vec)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Wind models that are cheap to evaluate along a trajectory.
+
+The default wind of an Environment is the log law of the atmospheric
+boundary layer, with its constants computed once per environment. A
+WindProfile tabulates the wind against height, typically from a measured
+profile, so that any profile costs the same to look up. A WindField
+holds the wind on a regular grid in x, y, z and optionally time, read
+from an .npz file, for gusty or course specific conditions::
+
+    from shotshaper.environment import Environment
+    from shotshaper.wind import WindField
+
+    env = Environment(wind=WindField.load('course.npz'))
+    s = d.shoot(speed=24, omega=116.8, pitch=15.5, position=(0, 0, 1.3),
+                nose_angle=0, roll_angle=14.7, env=env)
+
+Both are called with positions, stored column-wise for several points,
+and times, and return the wind velocity in the same layout. Each model
+also has a _key, a digest of its values that is the same in every
+process, by which cached shots are stored.
+"""
+
+import hashlib
+import numpy as np
+
+from .interpolate import RegularGrid
+
+
+def _digest(model, *values):
+    """
+    Digest of the class and values of a wind model.
+    """
+    digest = hashlib.sha1(type(model).__name__.encode())
+    for v in values:
+        a = np.ascontiguousarray(v, dtype=float)
+        digest.update(repr(a.shape).encode())
+        digest.update(a.tobytes())
+    return digest.hexdigest()
+
+
+class WindProfile:
+    """
+    Wind velocity against height, resampled to a uniform table so that a
+    lookup is a single index computation. Heights outside the table are
+    clamped to its ends.
+
+    :param array z: Heights of the profile (m), increasing
+    :param array velocity: Wind velocity at the heights, shape (3, len(z))
+    :param float dz: Step of the table (m)
+    """
+    def __init__(self, z, velocity, dz=0.01):
+        z = np.asarray(z, dtype=float)
+        velocity = np.asarray(velocity, dtype=float)
+
+        n = max(int(np.ceil((z[-1] - z[0])/dz)), 1)
+        self.z_min = z[0]
+        self.z_max = z[0] + n*dz
+        self.dz = dz
+        grid = self.z_min + dz*np.arange(n + 1)
+        table = np.array([np.interp(grid, z, v) for v in velocity])
+        # One extra node guards the upper index
+        self._table = np.concatenate((table, table[:, -1:]), axis=1)
+        self._digest = _digest(self, self.z_min, self.dz, self._table)
+
+    @classmethod
+    def log_law(cls, Uref, zref, z0, kappa=0.41, winddir=(1, 0, 0),
+                height=200.0, dz=0.01):
+        """
+        Logarithmic profile of the atmospheric boundary layer, passing
+        through the speed Uref at the height zref. Close to the ground,
+        where the profile is steepest, the table deviates from the log
+        law by less than 2.5e-3*Uref.
+
+        :param float Uref: Wind speed at the reference height (m/s)
+        :param float zref: Reference height (m)
+        :param float z0: Roughness length of the ground (m)
+        :param float kappa: von Karman constant
+        :param array winddir: Direction of the wind
+        :param float height: Top of the table (m)
+        :param float dz: Step of the table (m)
+        :return: Tabulated profile
+        :rtype: WindProfile
+        """
+        z = np.linspace(0, height, int(np.ceil(height/dz)) + 1)
+        ustar = Uref*kappa/np.log((zref + z0)/z0)
+        u = ustar/kappa*np.log((z + z0)/z0)
+        return cls(z, np.multiply.outer(np.asarray(winddir, dtype=float), u),
+                   dz)
+
+    def _key(self):
+        return self._digest
+
+    def at_height(self, z):
+        """
+        Wind velocity at given heights.
+
+        :param z: Height, a single height or an array of heights
+        :return: Wind velocity, column-wise for an array of heights
+        :rtype: array
+        """
+        x = (np.minimum(np.maximum(z, self.z_min), self.z_max) - self.z_min)/self.dz
+        i = x.astype(int)
+        w = x - i
+
+        u = self._table[:, i]
+        return u + w*(self._table[:, i + 1] - u)
+
+    def __call__(self, x, t=None):
+        return self.at_height(x[2])
+
+
+class LogLaw:
+    """
+    Logarithmic profile of the atmospheric boundary layer, with the
+    constants of the profile computed once. The values may also be
+    arrays with one value per column of the positions.
+
+    :param float Uref: Wind speed at the reference height (m/s)
+    :param float zref: Reference height (m)
+    :param float z0: Roughness length of the ground (m)
+    :param array winddir: Direction of the wind, shape (3,) or (3, n)
+    """
+    def __init__(self, Uref, zref, z0, winddir):
+        self.z0 = z0
+        self.winddir = np.asarray(winddir, dtype=float)
+        # Friction velocity over the von Karman constant
+        self.scale = Uref/np.log((zref + z0)/z0)
+
+    def _key(self):
+        return _digest(self, self.z0, self.winddir, self.scale)
+
+    def __call__(self, x, t=None):
+        z = np.maximum(x[2], 0.0)
+        u = self.scale*np.log((z + self.z0)/self.z0)
+        if self.winddir.ndim > 1:
+            return self.winddir*u
+        return np.multiply.outer(self.winddir, u)
+
+
+class Calm:
+    """
+    No wind.
+    """
+    def _key(self):
+        return _digest(self)
+
+    def __call__(self, x, t=None):
+        return np.zeros(np.shape(x))
+
+
+class WindField:
+    """
+    Wind velocity on a regular grid, interpolated linearly in each
+    direction. The grid lines need not be equidistant. Points outside the
+    grid get the wind at the nearest boundary.
+
+    :param array x: Grid lines along x (m), increasing
+    :param array y: Grid lines along y (m), increasing
+    :param array z: Grid lines along z (m), increasing
+    :param array velocity: Wind velocity, shape (3, nx, ny, nz), or
+                           (3, nx, ny, nz, nt) for a field varying in time
+    :param array t: Times of a field varying in time (s)
+    """
+    def __init__(self, x, y, z, velocity, t=None):
+        self.axes = [np.asarray(a, dtype=float) for a in (x, y, z)]
+        if t is not None:
+            self.axes.append(np.asarray(t, dtype=float))
+        self.velocity = np.asarray(velocity, dtype=float)
+
+        shape = (3,) + tuple(len(a) for a in self.axes)
+        if self.velocity.shape != shape:
+            raise ValueError("velocity must have shape %s, got %s"
+                             % (shape, self.velocity.shape))
+        self._grid = RegularGrid(self.axes, np.moveaxis(self.velocity, 0, -1))
+
+        self._digest = _digest(self, *(self.axes + [self.velocity]))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a wind field from an .npz file with the arrays x, y, z and
+        velocity, and t for a field varying in time.
+
+        :param string path: Path of the file
+        :return: Wind field
+        :rtype: WindField
+        """
+        with np.load(path) as data:
+            t = data['t'] if 't' in data else None
+            return cls(data['x'], data['y'], data['z'], data['velocity'], t)
+
+    def save(self, path):
+        """
+        Write the wind field to an .npz file, see load.
+
+        :param string path: Path of the file
+        """
+        names = ('x', 'y', 'z', 't')
+        np.savez(path, velocity=self.velocity,
+                 **dict(zip(names, self.axes)))
+
+    def _key(self):
+        return self._digest
+
+    def __call__(self, x, t=None):
+        """
+        Wind velocity at given positions and times.
+
+        :param array x: Position, shape (3,) or (3, n)
+        :param t: Time, a single time or one per position. Ignored unless
+                  the field varies in time, where None means t = 0.
+        :return: Wind velocity in the layout of x
+        :rtype: array
+        """
+        x = np.asarray(x, dtype=float)
+        if len(self.axes) == 3:
+            return self._grid(x)
+        t = np.broadcast_to(0.0 if t is None else t, np.shape(x[0]))
+        return self._grid(np.concatenate((x, t[None])))
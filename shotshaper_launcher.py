@@ -3,6 +3,10 @@ Basic GUI for launching the Shotshaper script with selected files
 This launcher uses a new script called disc_comp.py, which is a combination of two origional scripts
 and modified to allow multiple disc throws to be overlaid and compare the results.
 
+The scripts run in worker processes, so the launcher stays responsive while 
+they are open. A worker is started ahead of each launch, importing the modules
+the scripts need, so that a launch does not wait for Python to start up.
+
 This launcher developed by Chris Egan in support of Trash Panda Disc Golf
 chris.egan@ceganconsulting.com
 """
@@ -11,8 +15,73 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog
 from tkinter import messagebox
+import importlib
+import json
 import os
+import queue
+import runpy
 import subprocess
+import sys
+import threading
+
+# The scripts are next to the launcher
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules imported by a worker while it waits for a script to run
+PRELOAD = ('numpy', 'scipy.integrate', 'scipy.interpolate', 'matplotlib.pyplot',
+           'shotshaper.projectile', 'shotshaper.cache')
+
+# Line a worker prints once the script has been handed to it
+RUNNING = "shotshaper-worker: running"
+
+def run_worker():
+    """
+    Entry point of a worker process. Imports PRELOAD, then runs the one
+    script given on stdin as a JSON list of the script and its arguments,
+    and exits with the exit status of the script.
+    """
+    for name in PRELOAD:
+        importlib.import_module(name)
+    line = sys.stdin.readline()
+    if not line:
+        # The launcher closed without using the worker
+        return
+    sys.argv = json.loads(line)
+    print(RUNNING, flush=True)
+    # Output of the script goes to the console, as the launcher may be
+    # closed before the script
+    sys.stdout = sys.stderr
+    runpy.run_path(sys.argv[0], run_name="__main__")
+
+class Worker:
+    """
+    A Python process that runs one script, started before it is needed. 
+    Its status lines are read by a thread and queued for the launcher.
+    """
+    def __init__(self):
+        self.process = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, "shotshaper_launcher.py"), "--worker"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self.status = queue.Queue()
+        threading.Thread(target=self.read_output, daemon=True).start()
+
+    def read_output(self):
+        for line in self.process.stdout:
+            if line.rstrip("\n") == RUNNING:
+                self.status.put(RUNNING)
+            else:
+                sys.stdout.write(line)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, argv):
+        self.process.stdin.write(json.dumps(argv) + "\n")
+        self.process.stdin.close()
+
+    def close(self):
+        # An unused worker exits when its stdin is closed
+        if not self.process.stdin.closed:
+            self.process.stdin.close()
 
 class ShotshaperGUI(tk.Tk):
     def __init__(self):
@@ -23,10 +92,18 @@ class ShotshaperGUI(tk.Tk):
         # Define the initial directory
         self.initial_directory = os.path.join(os.getcwd(), "shotshaper", "discs")
         
+        # Workers of the scripts that are open, and the one kept ready for the next launch
+        self.running = []
+        self.standby = None
+
         self.create_notebook()
         #self.create_widgets()
         self.populate_file_listbox(self.initial_directory)  # Populate listbox with files from the initial directory
 
+        self.toggle_warm()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(100, self.poll_workers)
+
     def create_notebook(self):
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(expand=True, fill="both", pady=(10, 5))
@@ -57,6 +134,11 @@ class ShotshaperGUI(tk.Tk):
         # File Listbox (common for all tabs)
         self.file_listbox = tk.Listbox(self, selectmode='multiple', exportselection=0)
         self.file_listbox.pack(pady=(5, 10), fill=tk.BOTH, expand=True)
+
+        # Status of the launched scripts
+        self.status_var = tk.StringVar(value="Ready")
+        self.status_label = tk.Label(self, textvariable=self.status_var, anchor="w")
+        self.status_label.pack(fill=tk.X, padx=5, pady=(0, 5))
         
     def create_setup_tab_widgets(self):
         # Select Folder Button
@@ -67,6 +149,11 @@ class ShotshaperGUI(tk.Tk):
         self.unit_var = tk.BooleanVar()
         self.unit_checkbox = tk.Checkbutton(self.setup_tab, text="Use Metric Units", variable=self.unit_var)
         self.unit_checkbox.pack(pady=5)
+
+        # Worker kept ready checkbox
+        self.warm_var = tk.BooleanVar(value=True)
+        self.warm_checkbox = tk.Checkbutton(self.setup_tab, text="Keep Python ready for faster launches", variable=self.warm_var, command=self.toggle_warm)
+        self.warm_checkbox.pack(pady=5)
         
         self.notes_text = tk.Text(self.setup_tab, height=5)
         self.notes_text.pack(pady=10)
@@ -81,7 +168,7 @@ class ShotshaperGUI(tk.Tk):
         # Text notes (example)
         self.notes_text = tk.Text(self.comparison_tab, height=5)
         self.notes_text.pack(pady=10)
-        self.notes_text.insert("1.0", "This script allows you to compare up to 6 discs at once\n")
+        self.notes_text.insert("1.0", "This script allows you to compare any number of discs at once\n")
         self.notes_text.insert("2.0", "Select the discs from the list and click the button to launch the script\n")
         #self.notes_text.insert("3.0", "Up to 6 discs may be selected at once\n")
 
@@ -102,16 +189,16 @@ class ShotshaperGUI(tk.Tk):
         
         self.notes_text = tk.Text(self.coefficient_tab, height=5)
         self.notes_text.pack(pady=10)
-        self.notes_text.insert("1.0", "This script allows you to explore the coefficients of up to 6 discs\n")
+        self.notes_text.insert("1.0", "This script allows you to explore the coefficients of any number of discs\n")
         self.notes_text.insert("2.0", "Select discs from the list and launch the script\n")
     
 
     def launch_disc_comp(self):
         selected_indices = self.file_listbox.curselection()
         
-        # Check if exactly one disc is selected
-        if len(selected_indices) > 6:
-            messagebox.showwarning("Warning", "Please select no more than 6 discs.")
+        # Check if at least one disc is selected
+        if len(selected_indices) == 0:
+            messagebox.showwarning("Warning", "Please select at least one disc.")
             return
         
         # Strip the .yaml extension from each selected file
@@ -120,15 +207,8 @@ class ShotshaperGUI(tk.Tk):
         # Determine the unit option based on the checkbox state
         unit_option = "metric" if self.unit_var.get() else "imperial"
 
-        # Construct the command to run the script with selected files without their extensions
-        command = ["python", "disc_comp.py", "--units", unit_option] + selected_files
-
-        try:
-            # Execute the command
-            subprocess.run(command, check=True)
-            messagebox.showinfo("Success", "Shotshaper closed")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to launch Shotshaper: {e}")
+        # Run the script with selected files without their extensions
+        self.launch("disc_comp.py", ["--units", unit_option] + selected_files)
     
     def launch_disc_gui2d(self):
         selected_indices = self.file_listbox.curselection()
@@ -144,22 +224,15 @@ class ShotshaperGUI(tk.Tk):
         # Determine the unit option based on the checkbox state
         unit_option = "metric" if self.unit_var.get() else "imperial"
 
-        # Construct the command to run the script with selected files without their extensions
-        command = ["python", "disc_gui2d.py", "--units", unit_option, selected_file]
-
-        try:
-            # Execute the command
-            subprocess.run(command, check=True)
-            messagebox.showinfo("Success", "Shotshaper closed")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to launch Shotshaper: {e}")
+        # Run the script with the selected file without its extension
+        self.launch("disc_gui2d.py", ["--units", unit_option, selected_file])
     
     def launch_coeffs(self):
         selected_indices = self.file_listbox.curselection()
         
-        # Check if exactly one disc is selected
-        if len(selected_indices) > 6:
-            messagebox.showwarning("Warning", "Please select no more than 6 discs.")
+        # Check if at least one disc is selected
+        if len(selected_indices) == 0:
+            messagebox.showwarning("Warning", "Please select at least one disc.")
             return
         
         # Strip the .yaml extension from each selected file
@@ -168,15 +241,54 @@ class ShotshaperGUI(tk.Tk):
         # Determine the unit option based on the checkbox state
         unit_option = "metric" if self.unit_var.get() else "imperial"
 
-        # Construct the command to run the script with selected files without their extensions
-        command = ["python", "coeffs.py", "--units", unit_option] + selected_files
+        # Run the script with selected files without their extensions
+        self.launch("coeffs.py", ["--units", unit_option] + selected_files)
 
+    def launch(self, script, args):
+        # Hand the script to the worker kept ready, or a new one, without 
+        # waiting for it. A new worker is then made ready for the next launch
+        worker = self.standby if self.standby is not None and self.standby.alive() else Worker()
+        self.standby = None
         try:
-            # Execute the command
-            subprocess.run(command, check=True)
-            messagebox.showinfo("Success", "Shotshaper closed")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to launch Shotshaper: {e}")
+            worker.run([os.path.join(SCRIPT_DIR, script)] + args)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to launch {script}: {e}")
+            return
+        finally:
+            self.toggle_warm()
+        self.running.append((script, worker))
+        self.status_var.set(f"Starting {script}")
+
+    def poll_workers(self):
+        # Report the status of the launched scripts, from the Tk event loop
+        for script, worker in list(self.running):
+            while not worker.status.empty():
+                worker.status.get()
+                self.status_var.set(f"{script} running")
+            code = worker.process.poll()
+            if code is not None:
+                self.running.remove((script, worker))
+                if code == 0:
+                    self.status_var.set(f"{script} closed")
+                else:
+                    self.status_var.set(f"{script} failed")
+                    messagebox.showerror("Error", f"{script} failed with exit status {code}, see the console for details")
+        self.after(100, self.poll_workers)
+
+    def toggle_warm(self):
+        # Start or stop the worker kept ready for the next launch
+        if self.warm_var.get():
+            if self.standby is None or not self.standby.alive():
+                self.standby = Worker()
+        elif self.standby is not None:
+            self.standby.close()
+            self.standby = None
+
+    def on_close(self):
+        # Open scripts stay open, the worker kept ready exits
+        if self.standby is not None:
+            self.standby.close()
+        self.destroy()
     
 
     def select_folder(self):
@@ -194,5 +306,8 @@ class ShotshaperGUI(tk.Tk):
                 self.file_listbox.insert(tk.END, file)
 
 if __name__ == "__main__":
-    app = ShotshaperGUI()
-    app.mainloop()
+    if sys.argv[1:] == ["--worker"]:
+        run_worker()
+    else:
+        app = ShotshaperGUI()
+        app.mainloop()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+A batch of shots takes its number of members from any launch parameter
+or from a list of environments, broadcasting the others, and each member
+follows the steps of the same shot on its own.
+"""
+
+import pytest
+
+from shotshaper.environment import Environment
+from shotshaper.projectile import DiscGolfDisc, ShotPutBall, SoccerBall
+
+LAUNCH = dict(speed=24, omega=116.8, pitch=15.5, position=(0, 0, 1.3),
+              nose_angle=0, roll_angle=14.7, solver='interactive')
+
+
+def test_scalar_launch_with_environments():
+    disc = DiscGolfDisc('dd2')
+    envs = [Environment(Uref=u) for u in (0.0, 3.0, 6.0)]
+    shots = disc.shoot_batch(**LAUNCH, env=envs, output='summary')
+    assert len(shots) == 3
+    for s, env in zip(shots, envs):
+        single = disc.shoot(**LAUNCH, env=env, output='summary')
+        assert s.landing == pytest.approx(single.landing)
+    assert shots[0].landing[0] != shots[2].landing[0]
+
+
+def test_mismatched_members():
+    disc = DiscGolfDisc('dd2')
+    envs = [Environment(Uref=u) for u in (0.0, 3.0, 6.0)]
+    with pytest.raises(ValueError):
+        disc.shoot_batch(**dict(LAUNCH, speed=[20, 24]), env=envs)
+
+
+MEMBERS = [
+    (DiscGolfDisc('dd2'),
+     dict(speed=[18.0, 24.0, 28.0], omega=[90.0, 116.8, 140.0],
+          pitch=[8.0, 15.5, 20.0], roll_angle=[-20.0, 14.7, 30.0],
+          nose_angle=[0.0, 1.0, -1.0],
+          position=[(0, 0, 1.0), (0, 0, 1.3), (2, -1, 1.8)])),
+    (ShotPutBall('M'),
+     dict(speed=[10.0, 13.0, 14.0], pitch=[30.0, 38.0, 45.0],
+          position=[(0, 0, 1.8), (0, 0, 2.1), (0, 0, 2.4)])),
+    (SoccerBall(),
+     dict(speed=[15.0, 25.0, 30.0], pitch=[10.0, 20.0, 35.0],
+          spin=[(0, -10, 0), (0, 0, 5), (3, -5, 2)],
+          position=[(0, 0, 0.1), (0, 0, 0.2), (1, 1, 0.3)])),
+]
+
+
+@pytest.mark.parametrize('method', ['RK45', 'RK23', 'RK4'])
+@pytest.mark.parametrize('projectile, launch', MEMBERS,
+                         ids=['disc', 'shot_put', 'soccer_ball'])
+def test_batch_follows_single_shots(method, projectile, launch):
+    # Members take the same steps as single shots, and end at their own time
+    shots = projectile.shoot_batch(**launch, method=method)
+    times = []
+    for i, s in enumerate(shots):
+        single = projectile.shoot(**{k: v[i] for k, v in launch.items()},
+                                  method=method)
+        assert s.time[-1] == pytest.approx(single.time[-1], abs=1e-10)
+        assert s.position == pytest.approx(single.position, abs=1e-8)
+        assert s.velocity == pytest.approx(single.velocity, abs=1e-8)
+        assert s.stats.nfev == single.stats.nfev
+        assert s.stats.naccept == single.stats.naccept
+        times.append(s.time[-1])
+    assert len(set(times)) == len(times)
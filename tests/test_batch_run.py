@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+An interrupted batch run continues with --resume from its checkpoint,
+dropping a partly written chunk, and gives the same results as a run
+that was never interrupted.
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+import pytest
+
+from shotshaper import batch, sweep
+
+N = 10
+CHUNKSIZE = 3
+
+
+@pytest.fixture
+def throws(tmp_path):
+    path = tmp_path / 'throws.csv'
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['disc', 'speed', 'pitch', 'roll', 'wind'])
+        for i in range(N):
+            w.writerow(['dd2' if i % 2 else 'cd1', 18 + i, 8 + i, i - 5, i % 3])
+    return str(path)
+
+
+def _run(throws, output, *options):
+    batch.main([throws, output, '--workers', '1', '--chunksize', str(CHUNKSIZE),
+                '--solver', 'interactive', '-q'] + list(options))
+
+
+def _interrupt(monkeypatch):
+    # Stop the run as the second chunk comes in, before it is written
+    stream = sweep.stream
+
+    def interrupted(*args, **kwargs):
+        for i, chunk in enumerate(stream(*args, **kwargs)):
+            if i == 1:
+                raise KeyboardInterrupt
+            yield chunk
+    monkeypatch.setattr(sweep, 'stream', interrupted)
+
+
+def _read(output):
+    if output.endswith('.npz'):
+        with np.load(output) as data:
+            return {name: data[name] for name, _ in batch.RESULTS}
+    if output.endswith('.jsonl'):
+        with open(output) as f:
+            rows = [json.loads(line) for line in f]
+        return {name: [row[name] for row in rows] for name, _ in batch.RESULTS}
+    with open(output, newline='') as f:
+        rows = list(csv.reader(f))
+    return {name: [row[i] for row in rows[1:]] for i, name in enumerate(rows[0])}
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.jsonl', '.npz'])
+def test_resume(tmp_path, monkeypatch, throws, suffix):
+    complete = str(tmp_path / ('complete' + suffix))
+    _run(throws, complete)
+
+    output = str(tmp_path / ('results' + suffix))
+    with monkeypatch.context() as m:
+        _interrupt(m)
+        with pytest.raises(KeyboardInterrupt):
+            _run(throws, output)
+    checkpoint = batch._checkpoint_path(output)
+    with open(checkpoint) as f:
+        assert '"done": %d' % CHUNKSIZE in f.read()
+
+    # Part of a chunk written after the checkpoint is cut off on resume
+    partial = output + '.parts/speed' if suffix == '.npz' else output
+    with open(partial, 'ab') as f:
+        f.write(b'\x00garbage')
+    before = open(partial, 'rb').read()
+
+    # A fresh run does not overwrite the interrupted one
+    with pytest.raises(SystemExit):
+        _run(throws, output)
+    assert open(partial, 'rb').read() == before
+
+    _run(throws, output, '--resume')
+    assert not os.path.exists(checkpoint)
+
+    results, expected = _read(output), _read(complete)
+    assert len(results['row']) == N
+    assert [int(r) for r in results['row']] == list(range(N))
+    for name, _ in batch.RESULTS:
+        assert np.array_equal(results[name], expected[name]), name
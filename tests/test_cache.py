@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Shots stored on disk by ShotCache are found again by a later process,
+and only for the same wind.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, sys
+from shotshaper.cache import ShotCache
+from shotshaper.environment import Environment
+from shotshaper.projectile import DiscGolfDisc
+from shotshaper.wind import LogLaw, WindProfile
+
+winds = dict(profile=lambda u: WindProfile.log_law(u, 1.5, 0.1),
+             log_law=lambda u: LogLaw(u, 1.5, 0.1, (1, 0, 0)))
+disc = DiscGolfDisc('dd2')
+cache = ShotCache(directory=sys.argv[1])
+out = {}
+for name, wind in winds.items():
+    for u in (3.0, 4.0):
+        launch = dict(speed=24, omega=116.8, pitch=15.5, position=(0, 0, 1.3),
+                      nose_angle=0, roll_angle=14.7, env=Environment(wind=wind(u)),
+                      solver='interactive')
+        digest, _ = cache._key(disc, launch)
+        s = cache.shoot(disc, **launch)
+        out['%s/%g' % (name, u)] = dict(digest=digest,
+                                        landing=s.position[:,-1].tolist())
+out['disk_hits'] = cache.disk_hits
+print(json.dumps(out))
+"""
+
+
+def _run(directory):
+    res = subprocess.run([sys.executable, '-c', SCRIPT, str(directory)],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(res.stdout)
+
+
+def test_disk_keys_across_processes(tmp_path):
+    first = _run(tmp_path)
+    second = _run(tmp_path)
+    assert first['disk_hits'] == 0
+    assert second['disk_hits'] == 4
+
+    for name in ('profile', 'log_law'):
+        # Equal winds in another process have the same key
+        for u in ('3', '4'):
+            key = '%s/%s' % (name, u)
+            assert first[key]['digest'] == second[key]['digest']
+            assert first[key]['landing'] == second[key]['landing']
+        # Different winds do not
+        assert first[name + '/3']['digest'] != first[name + '/4']['digest']
+        assert first[name + '/3']['landing'] != first[name + '/4']['landing']
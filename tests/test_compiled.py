@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+A compiled disc definition gives the same disc as its YAML, is made
+again when the YAML changes, and is ignored when it cannot be read.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from shotshaper import compiled, projectile
+from shotshaper.projectile import DiscGolfDisc
+
+ARRAYS = ['_alpha', '_Cl', '_Cd', '_Cm', '_table']
+
+
+@pytest.fixture
+def from_yaml(monkeypatch):
+    # The disc as read from its YAML, compiling nothing
+    with monkeypatch.context() as m:
+        m.setattr(compiled, 'DIRECTORY', None)
+        DiscGolfDisc.clear_cache()
+        disc = DiscGolfDisc('dd2')
+    DiscGolfDisc.clear_cache()
+    return disc
+
+
+@pytest.fixture
+def definition(tmp_path, monkeypatch, from_yaml):
+    # A copy of the definition read by the discs, compiled to tmp_path
+    discs = tmp_path / 'shotshaper' / 'discs'
+    discs.mkdir(parents=True)
+    yaml = discs / 'dd2.yaml'
+    shutil.copy(os.path.join(os.path.dirname(projectile.__file__), 'discs',
+                             'dd2.yaml'), yaml)
+    monkeypatch.setattr(projectile, '__file__',
+                        str(tmp_path / 'shotshaper' / 'projectile.py'))
+    monkeypatch.setattr(compiled, 'DIRECTORY', str(tmp_path / 'compiled'))
+    yield yaml
+    DiscGolfDisc.clear_cache()
+
+
+def _loads(monkeypatch):
+    # Count the compiled definitions found
+    found = []
+    load = compiled.load
+
+    def counted(filename, digest):
+        stored = load(filename, digest)
+        found.append(stored is not None)
+        return stored
+    monkeypatch.setattr(compiled, 'load', counted)
+    return found
+
+
+def _compiled(tmp_path):
+    return sorted(os.listdir(tmp_path / 'compiled'))
+
+
+def _landing(disc):
+    return disc.shoot(speed=24, omega=116.8, pitch=15.5, roll_angle=14.7,
+                      nose_angle=0, position=(0, 0, 1.5),
+                      output='summary').landing
+
+
+def _assert_same(disc, expected):
+    assert disc.diameter == expected.diameter
+    assert disc.table_error == expected.table_error
+    for name in ARRAYS:
+        assert np.array_equal(getattr(disc, name), getattr(expected, name)), name
+
+
+def test_load(tmp_path, monkeypatch, definition, from_yaml):
+    DiscGolfDisc('dd2')
+    files = _compiled(tmp_path)
+    assert len(files) == 1 and files[0].startswith('dd2.')
+
+    found = _loads(monkeypatch)
+    DiscGolfDisc.clear_cache()
+    disc = DiscGolfDisc('dd2')
+    assert found == [True]
+    assert not disc._table.flags.writeable
+    _assert_same(disc, from_yaml)
+    assert np.array_equal(_landing(disc), _landing(from_yaml))
+
+
+def test_edited(tmp_path, monkeypatch, definition):
+    DiscGolfDisc('dd2')
+    before = _compiled(tmp_path)
+
+    text = definition.read_text().replace('diameter: 0.211', 'diameter: 0.25')
+    definition.write_text(text)
+    found = _loads(monkeypatch)
+    DiscGolfDisc.clear_cache()
+    assert DiscGolfDisc('dd2').diameter == 0.25
+    assert found == [False]
+
+    after = _compiled(tmp_path)
+    assert len(after) == 2 and set(before) < set(after)
+    DiscGolfDisc.clear_cache()
+    assert DiscGolfDisc('dd2').diameter == 0.25
+    assert found == [False, True]
+
+
+@pytest.mark.parametrize('content', [b'', b'not a zip file', 'truncated'])
+def test_corrupt(tmp_path, monkeypatch, definition, from_yaml, content):
+    DiscGolfDisc('dd2')
+    filename = tmp_path / 'compiled' / _compiled(tmp_path)[0]
+    if content == 'truncated':
+        content = filename.read_bytes()[:-100]
+    filename.write_bytes(content)
+
+    found = _loads(monkeypatch)
+    DiscGolfDisc.clear_cache()
+    _assert_same(DiscGolfDisc('dd2'), from_yaml)
+    assert found == [False]
+
+    # It is replaced by a good one
+    DiscGolfDisc.clear_cache()
+    _assert_same(DiscGolfDisc('dd2'), from_yaml)
+    assert found == [False, True]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Landing statistics merged chunk by chunk equal those of all points at
+once, and the same seed gives the same statistics for any chunk size.
+"""
+
+import numpy as np
+import pytest
+
+from shotshaper import dispersion
+from shotshaper.projectile import ShotPutBall
+
+RANGE = ((14.0, 24.0), (-4.0, 4.0))
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100, 1000])
+def test_merge(chunksize):
+    rng = np.random.default_rng(0)
+    points = rng.multivariate_normal((19.0, 0.5), ((1.5, 0.4), (0.4, 0.8)), 1000)
+    stats = dispersion.LandingStats(bins=20, range=RANGE)
+    for start in range(0, len(points), chunksize):
+        stats.update(points[start:start + chunksize])
+
+    assert stats.n == len(points)
+    assert stats.mean == pytest.approx(points.mean(axis=0), rel=1e-12)
+    assert stats.cov == pytest.approx(np.cov(points.T), rel=1e-10)
+    h, _, _ = np.histogram2d(points[:, 0], points[:, 1], bins=20, range=RANGE)
+    assert np.array_equal(stats.histogram, h)
+    assert stats.outside == len(points) - h.sum()
+
+
+def test_seed():
+    launch = dict(speed=13, pitch=38, yaw=0, position=(0, 0, 2.1))
+    spread = dict(speed=0.5, pitch=3.0, yaw=dispersion.Uniform(5.0))
+    runs = [dispersion.run(ShotPutBall('M'), launch, spread, n=300, seed=1,
+                           chunksize=chunksize, bins=20, range=RANGE)
+            for chunksize in (64, 100, 300)]
+
+    first = runs[0]
+    for stats in runs[1:]:
+        assert stats.n == first.n
+        assert stats.mean == pytest.approx(first.mean, rel=1e-12)
+        assert stats.cov == pytest.approx(first.cov, rel=1e-10)
+        assert np.array_equal(stats.histogram, first.histogram)
+
+    other = dispersion.run(ShotPutBall('M'), launch, spread, n=300, seed=2,
+                           bins=20, range=RANGE)
+    assert not np.allclose(other.mean, first.mean)
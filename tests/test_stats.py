@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+The step counts of SolverStats agree with the number of right hand side
+evaluations, whether the trajectory or only a summary is kept.
+"""
+
+import pytest
+
+from shotshaper.projectile import _RK_STAGES, DiscGolfDisc, SoccerBall
+
+SHOTS = [(DiscGolfDisc('dd2'), dict(speed=24, omega=116.8, pitch=15.5,
+                                    position=(0, 0, 1.3), nose_angle=0,
+                                    roll_angle=14.7)),
+         (SoccerBall(), dict(speed=25, pitch=20, spin=(0, -10, 0)))]
+
+
+@pytest.mark.parametrize('method', ['RK23', 'RK45', 'DOP853', 'RK4'])
+@pytest.mark.parametrize('rtol', [1e-3, 1e-8])
+def test_step_counts(method, rtol):
+    for projectile, launch in SHOTS:
+        trajectory = projectile.shoot(**launch, method=method, rtol=rtol).stats
+        summary = projectile.shoot(**launch, method=method, rtol=rtol,
+                                   output='summary').stats
+        # The steps do not depend on what is kept
+        assert summary.naccept == trajectory.naccept
+        assert summary.nreject == trajectory.nreject
+        assert trajectory.nreject >= 0
+        assert summary.nfev <= trajectory.nfev
+
+        if method in _RK_STAGES:
+            stages, extra = _RK_STAGES[method]
+            steps = trajectory.naccept + trajectory.nreject
+            assert trajectory.nfev == 2 + stages*steps + extra*trajectory.naccept
+            # Only the steps with events build an interpolant
+            ninterp, rest = divmod(summary.nfev - 2 - stages*steps, extra or 1)
+            assert rest == 0
+            assert 0 <= ninterp <= (summary.naccept if extra else 0)
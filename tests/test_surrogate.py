@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+A surrogate table reproduces the throws at its grid nodes, and refuses
+throws outside its grid or from another definition of the disc.
+"""
+
+import numpy as np
+import pytest
+
+from shotshaper import surrogate
+from shotshaper.projectile import DiscGolfDisc
+
+GRID = dict(mass=(0.170, 0.175), speed=(20.0, 24.0), pitch=(10.0, 15.0),
+            roll_angle=(0.0, 10.0), nose_angle=(0.0, 1.0),
+            spin_factor=(0.9, 1.0))
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('surrogate') / 'dd2')
+    return surrogate.build('dd2', path, grid=GRID, workers=1, n_check=0)
+
+
+def test_default_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(surrogate, 'DIRECTORY', str(tmp_path))
+    assert surrogate.default_path('dd2') == str(tmp_path / 'dd2')
+    with pytest.raises(FileNotFoundError, match='python -m shotshaper.surrogate dd2'):
+        DiscGolfDisc('dd2').predict(speed=20, pitch=10, roll_angle=0)
+
+
+def test_nodes(table):
+    disc = DiscGolfDisc('dd2')
+    for mass, speed, pitch, roll, nose, spin in [(0.170, 20.0, 10.0, 0.0, 0.0, 0.9),
+                                                 (0.175, 24.0, 15.0, 10.0, 1.0, 1.0),
+                                                 (0.175, 20.0, 15.0, 0.0, 1.0, 0.9)]:
+        d = disc.with_mass(mass)
+        omega = spin*d.empirical_spin(speed)
+        p = d.predict(speed=speed, pitch=pitch, roll_angle=roll, nose_angle=nose,
+                      omega=omega, position=(0, 0, table.height), table=table)
+        s = d.shoot(speed=speed, pitch=pitch, roll_angle=roll, nose_angle=nose,
+                    omega=omega, position=(0, 0, table.height),
+                    solver=table.solver)
+        assert p.landing == pytest.approx(s.position[:,-1], abs=1e-9)
+        assert p.flight_time == pytest.approx(s.time[-1], abs=1e-9)
+        assert p.apex == pytest.approx(s.position[:,np.argmax(s.position[2])],
+                                       abs=1e-9)
+
+
+def test_outside_grid(table):
+    disc = DiscGolfDisc('dd2', mass=0.175)
+    with pytest.raises(ValueError, match='speed'):
+        disc.predict(speed=30, pitch=12, roll_angle=5, position=(0, 0, 1.5),
+                     table=table)
+    with pytest.raises(ValueError, match='release'):
+        disc.predict(speed=22, pitch=12, roll_angle=5, position=(0, 0, 1.0),
+                     table=table)
+
+
+def test_other_definition(table):
+    with pytest.raises(ValueError, match='another definition'):
+        DiscGolfDisc('cd1', mass=0.175).predict(speed=22, pitch=12, roll_angle=5,
+                                                position=(0, 0, 1.5), table=table)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Aiming lands within the tolerance of reachable targets, gives up
+quickly on unreachable ones, and the longest shot put is found at the
+known angle.
+"""
+
+import numpy as np
+import pytest
+
+from shotshaper.projectile import DiscGolfDisc, ShotPutBall
+
+LAUNCH = dict(speed=24, omega=116.8, nose_angle=0, position=(0, 0, 1.5))
+
+
+def test_reachable():
+    disc = DiscGolfDisc('dd2')
+    a = disc.aim((80, 5), tol=0.5, **LAUNCH)
+    assert a.converged
+    assert a.miss <= 0.5
+    assert 'solver' not in a.launch
+    # The launch found lands there when shot on its own
+    landing = disc.shoot(**a.launch, output='summary').landing
+    assert np.hypot(landing[0] - 80, landing[1] - 5) == pytest.approx(a.miss, abs=1e-9)
+
+
+def test_unreachable():
+    a = DiscGolfDisc('dd2').aim((400, 0), tol=0.5, **LAUNCH)
+    assert not a.converged
+    assert a.miss > 100
+    assert a.shots < 300
+
+
+def test_shot_put_angle():
+    put = ShotPutBall('M').optimal_angle(13, position=(0, 0, 2.1))
+    assert put.launch['pitch'] == pytest.approx(41.8, abs=0.1)
+    assert put.distance == pytest.approx(19.13, abs=0.01)